@@ -0,0 +1,235 @@
+# Usage example
+# python audit_voice_pack.py --voice_name Luis --queue_regeneration
+#
+# Re-scores every .wav file of an existing voice pack with the xtts-integrity model, ie a
+# pack built with an older threshold or --simple_validity_check, and writes the scores to
+# a CSV file sorted from the least to the most likely to be valid. With
+# --queue_regeneration, the files scoring below --xtts_integrity_threshold are marked as
+# outdated in the build manifest, so the next run of generate_voice_pack.py with the same
+# --voice_name regenerates exactly those files.
+
+import argparse
+import csv
+import glob
+import logging
+import os
+from typing import Dict, List, Optional
+
+import torch
+import torchaudio
+from torch.utils.data import DataLoader
+from xtts_integrity.infer import AudioInferenceDataset, load_model, run_inference
+from xtts_integrity.transform import InferenceAudioTransform
+
+from build_manifest import BuildManifest
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-score all the .wav files of an existing voice pack with the xtts-integrity model, writing a CSV index of the scores and optionally queueing the files scoring below the threshold for regeneration by generate_voice_pack.py."
+    )
+    parser.add_argument(
+        "--voice_name",
+        type=lambda x: x.replace(" ", ""),
+        required=True,
+        help="Name of the voice pack to audit, as given to generate_voice_pack.py.",
+    )
+    parser.add_argument(
+        "--output_audio_dir",
+        type=str,
+        default="./output",
+        help="Path to the directory containing the voice pack folder, as given to generate_voice_pack.py.",
+    )
+    parser.add_argument(
+        "--audit_index",
+        type=str,
+        default=None,
+        help="Path to the CSV file where the path, score, duration and subtitle of every audited file are saved, least likely to be valid first. Defaults to '<voice_name>_audit.csv' next to the voice pack folder.",
+    )
+    parser.add_argument(
+        "--xtts_integrity_threshold",
+        type=float,
+        default=0.9,
+        help="Files scoring below this value are reported as invalid (and queued for regeneration with --queue_regeneration). Same meaning as in generate_voice_pack.py.",
+    )
+    parser.add_argument(
+        "--queue_regeneration",
+        action="store_true",
+        help="Mark the files scoring below --xtts_integrity_threshold as outdated in the voice pack's build manifest, so they are regenerated by the next run of generate_voice_pack.py with the same --voice_name and --output_audio_dir. The files themselves are left in place until then.",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=64,
+        help="Number of .wav files scored together by the xtts-integrity model. Larger batches are faster on a GPU, lower this if it runs out of memory.",
+    )
+    parser.add_argument(
+        "--loader_workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Number of processes loading and transforming .wav files for the model in parallel, so the model is never left waiting for the disk.",
+    )
+    parser.add_argument(
+        "--cpu_only",
+        action="store_true",
+        help="Run the xtts-integrity model on the CPU, even if a GPU is available.",
+    )
+    parser.add_argument(
+        "--xtts_integrity_model",
+        type=str,
+        default="/app/xtts-integrity/checkpoints/xtts-integrity-20241112.pth",
+        help="Path to the xtts-integrity model checkpoint.",
+    )
+    return parser.parse_args()
+
+
+def find_wav_files(voicepack_base_dir: str) -> List[str]:
+    """All the generated .wav files of a voice pack, skipping kept invalid attempts."""
+    return sorted(
+        wav_file
+        for wav_file in glob.glob(f"{voicepack_base_dir}/**/*.wav", recursive=True)
+        if ".invalid-" not in os.path.basename(wav_file)
+        and not wav_file.endswith(".raw.wav")
+    )
+
+
+def load_folder_subtitles(folder: str) -> Dict[str, str]:
+    """The subtitle of each .wav file of a folder, from its subtitles.csv file."""
+    try:
+        with open(f"{folder}/subtitles.csv", newline="", encoding="utf-8") as f:
+            return {row[0]: row[1] for row in csv.reader(f) if len(row) >= 2}
+    except FileNotFoundError:
+        return {}
+
+
+def score_wav_files(wav_files: List[str], args: argparse.Namespace) -> Dict[str, tuple]:
+    """
+    Run the xtts-integrity model over the files in batches, returning the
+    (score, is_valid) of each file.
+    """
+    device = torch.device(
+        "cuda" if torch.cuda.is_available() and not args.cpu_only else "cpu"
+    )
+    logging.info(f"xtts_integrity - Loading model on {device}...")
+    model = load_model(args.xtts_integrity_model, device)
+
+    inference_dataset = AudioInferenceDataset(
+        wav_files, transform=InferenceAudioTransform()
+    )
+    inference_loader = DataLoader(
+        inference_dataset,
+        batch_size=args.batch_size,
+        shuffle=False,
+        num_workers=args.loader_workers,
+        pin_memory=device.type == "cuda",
+    )
+
+    logging.info(
+        f"Scoring {len(wav_files)} .wav files in batches of {args.batch_size}..."
+    )
+    with torch.inference_mode():
+        valid_files, invalid_files = run_inference(
+            model,
+            inference_loader,
+            device,
+            threshold=args.xtts_integrity_threshold,
+        )
+
+    scores = {wav_file: (score, True) for wav_file, score in valid_files}
+    scores.update({wav_file: (score, False) for wav_file, score in invalid_files})
+    return scores
+
+
+def output_kind(output_key: str) -> str:
+    """
+    The manifest kind of a file of the voice pack, for files not recorded in the
+    manifest yet (recorded files keep theirs, see BuildManifest.queue_regeneration).
+    """
+    if output_key.startswith("/radio_check_"):
+        return "radio_check"
+    if output_key.startswith("/driver_names/"):
+        return "driver_name"
+    return "phrase"
+
+
+def audio_duration(wav_file: str) -> Optional[float]:
+    try:
+        audio_info = torchaudio.info(wav_file)
+    except RuntimeError:
+        return None
+    return audio_info.num_frames / audio_info.sample_rate
+
+
+def write_audit_index(audit_index: str, records: List[tuple]) -> None:
+    with open(audit_index, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path", "score", "is_valid", "duration", "subtitle"])
+        writer.writerows(records)
+
+
+def main():
+    args = parse_arguments()
+    voicepack_base_dir = f"{args.output_audio_dir}/{args.voice_name}"
+    audit_index = args.audit_index or os.path.join(
+        args.output_audio_dir, f"{args.voice_name}_audit.csv"
+    )
+
+    wav_files = find_wav_files(voicepack_base_dir)
+    if not wav_files:
+        logging.error(f"No .wav files found in {voicepack_base_dir}. Exiting.")
+        return
+
+    scores = score_wav_files(wav_files, args)
+
+    records = []
+    folder_subtitles: Dict[str, Dict[str, str]] = {}
+    for wav_file in wav_files:
+        if wav_file not in scores:
+            logging.warning(f"No score returned for {wav_file}, skipping it.")
+            continue
+        score, is_valid = scores[wav_file]
+        folder, filename = os.path.split(wav_file)
+        if folder not in folder_subtitles:
+            folder_subtitles[folder] = load_folder_subtitles(folder)
+        duration = audio_duration(wav_file)
+        records.append(
+            (
+                wav_file,
+                f"{score:.4f}",
+                is_valid,
+                "" if duration is None else f"{duration:.2f}",
+                folder_subtitles[folder].get(filename, ""),
+            )
+        )
+    records.sort(key=lambda record: float(record[1]))
+    write_audit_index(audit_index, records)
+
+    invalid_files = [record[0] for record in records if not record[2]]
+    logging.info(
+        f"{len(invalid_files)} of {len(records)} files scored below {args.xtts_integrity_threshold}, see {audit_index}"
+    )
+
+    if args.queue_regeneration and invalid_files:
+        # the build manifest of generate_voice_pack.py, kept next to the voice pack folder
+        manifest = BuildManifest(
+            f"{args.output_audio_dir}/.{args.voice_name}.manifest.sqlite"
+        )
+        try:
+            for wav_file in invalid_files:
+                output_key = wav_file[len(voicepack_base_dir) :]
+                manifest.queue_regeneration(output_key, output_kind(output_key))
+        finally:
+            manifest.close()
+        logging.info(
+            f"Queued {len(invalid_files)} files for regeneration, run generate_voice_pack.py with --voice_name {args.voice_name} to regenerate them."
+        )
+
+
+if __name__ == "__main__":
+    main()
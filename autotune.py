@@ -0,0 +1,220 @@
+import datetime
+import importlib.metadata
+import importlib.util
+import json
+import logging
+import os
+import platform
+import subprocess
+from dataclasses import asdict, dataclass
+from typing import Callable, List, Optional, Tuple
+
+from build_manifest import fingerprint
+
+# the stream counts tried for each backend, in order, stopping at the first one which
+# isn't at least MIN_SPEEDUP times faster than the best so far. The streams take turns
+# running the model and only overlap their post-processing, so more streams gain
+# little past the first few and add next to no GPU memory: running out of memory is
+# only caught as a safety net, not what normally ends the search.
+GPU_STREAM_COUNTS = [1, 2, 3, 4, 6, 8]
+CPU_STREAM_COUNTS = [1, 2]
+MIN_SPEEDUP = 1.05
+
+
+@dataclass
+class TunedSettings:
+    """One configuration tried by the autotuner, and how fast it generated phrases."""
+
+    generation_streams: int
+    use_deepspeed: bool
+    # None leaves torch's own default, one thread per CPU core
+    cpu_threads: Optional[int]
+    phrases_per_minute: float = 0.0
+
+    def describe(self) -> str:
+        return (
+            f"{self.generation_streams} streams, "
+            f"deepspeed {'on' if self.use_deepspeed else 'off'}, "
+            f"{self.cpu_threads or 'default'} CPU threads"
+        )
+
+
+def available_cpu_count() -> int:
+    """The CPU cores this process may run on, which a container may limit."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def cpu_model_name() -> str:
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def gpu_descriptions() -> List[str]:
+    """
+    The name and memory of each NVIDIA GPU, as reported by nvidia-smi, which is much
+    quicker than importing torch to ask CUDA. Empty without any GPU or driver.
+    """
+    try:
+        result = subprocess.run(
+            [
+                "nvidia-smi",
+                "--query-gpu=name,memory.total",
+                "--format=csv,noheader,nounits",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return []
+
+    descriptions = []
+    for line in result.stdout.splitlines():
+        name, _, memory_mib = line.rpartition(",")
+        if name.strip() and memory_mib.strip().isdigit():
+            descriptions.append(f"{name.strip()} {int(memory_mib) / 1024:.0f}GB")
+    return descriptions
+
+
+def package_version(package: str) -> str:
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return "not installed"
+
+
+def describe_host(cpu_only: bool) -> str:
+    """
+    The hardware and software which decide how fast the voice pack is generated, ie
+    'AMD Ryzen 9 5950X, 32 cores, 64GB RAM, torch 2.4.1, NVIDIA GeForce RTX 3090 24GB'.
+    Deliberately leaves out the host name, which is random for each container, and
+    avoids importing torch, since it is called on startup by commands which may never
+    generate any audio.
+    """
+    memory_bytes = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    parts = [
+        cpu_model_name(),
+        f"{available_cpu_count()} cores",
+        f"{memory_bytes / 1024**3:.0f}GB RAM",
+        f"torch {package_version('torch')}",
+    ]
+    gpus = [] if cpu_only else gpu_descriptions()
+    parts.extend(gpus or ["CPU only"])
+    return ", ".join(parts)
+
+
+def host_key(host_description: str) -> str:
+    """The key the tuned settings of a host are saved under, see describe_host."""
+    return fingerprint(host_description)
+
+
+def candidate_backends(cpu_only: bool) -> List[Tuple[bool, Optional[int]]]:
+    """
+    The (use_deepspeed, cpu_threads) combinations worth trying on this host. DeepSpeed
+    needs a GPU, and on the CPU the number of threads torch uses matters instead.
+    """
+    if cpu_only:
+        cpu_count = available_cpu_count()
+        return [
+            (False, cpu_threads)
+            for cpu_threads in sorted({cpu_count, max(1, cpu_count // 2)}, reverse=True)
+        ]
+    if importlib.util.find_spec("deepspeed") is None:
+        return [(False, None)]
+    return [(True, None), (False, None)]
+
+
+def tune(
+    backends: List[Tuple[bool, Optional[int]]],
+    stream_counts: List[int],
+    prepare_backend: Callable[[bool, Optional[int]], None],
+    benchmark: Callable[[TunedSettings], Optional[float]],
+) -> Optional[TunedSettings]:
+    """
+    Find the fastest of the configurations, trying increasing stream counts for each
+    backend. `prepare_backend` is called before the first configuration of each
+    backend, ie to load the model with or without DeepSpeed. `benchmark` returns the
+    phrases per minute generated with a configuration, or None if it would run out of
+    memory. Returns None if no configuration worked at all.
+    """
+    best_settings = None
+    for use_deepspeed, cpu_threads in backends:
+        backend_best = None
+        try:
+            prepare_backend(use_deepspeed, cpu_threads)
+            for generation_streams in stream_counts:
+                candidate = TunedSettings(
+                    generation_streams, use_deepspeed, cpu_threads
+                )
+                phrases_per_minute = benchmark(candidate)
+                if phrases_per_minute is None:
+                    logging.info(
+                        f"Autotune - {candidate.describe()}: out of memory, not trying more streams"
+                    )
+                    break
+                candidate.phrases_per_minute = phrases_per_minute
+                logging.info(
+                    f"Autotune - {candidate.describe()}: {phrases_per_minute:.1f} phrases per minute"
+                )
+                if (
+                    backend_best is not None
+                    and phrases_per_minute
+                    < backend_best.phrases_per_minute * MIN_SPEEDUP
+                ):
+                    break
+                backend_best = candidate
+        except Exception as e:
+            # ie DeepSpeed failing to build its kernels, which rules out just this backend
+            logging.warning(
+                f"Autotune - deepspeed {'on' if use_deepspeed else 'off'}, "
+                f"{cpu_threads or 'default'} CPU threads failed, skipping it: {e}"
+            )
+
+        if backend_best is not None and (
+            best_settings is None
+            or backend_best.phrases_per_minute > best_settings.phrases_per_minute
+        ):
+            best_settings = backend_best
+    return best_settings
+
+
+def load_tuned_settings(tuning_file: str, key: str) -> Optional[TunedSettings]:
+    """Return the settings saved for the host, or None if it was never tuned."""
+    try:
+        with open(tuning_file, encoding="utf-8") as f:
+            record = json.load(f).get(key)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return TunedSettings(**record["settings"]) if record else None
+
+
+def save_tuned_settings(
+    tuning_file: str, key: str, host_description: str, settings: TunedSettings
+) -> None:
+    """Save the settings of the host, alongside those of any other hosts."""
+    try:
+        with open(tuning_file, encoding="utf-8") as f:
+            records = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        records = {}
+    records[key] = {
+        "host": host_description,
+        "tuned_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "settings": asdict(settings),
+    }
+
+    # written aside and swapped in, so a container reading it never sees half a file
+    os.makedirs(os.path.dirname(tuning_file) or ".", exist_ok=True)
+    temporary_file = f"{tuning_file}.{os.getpid()}.part"
+    with open(temporary_file, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2)
+    os.replace(temporary_file, tuning_file)
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+
+def fingerprint(*inputs: Any) -> str:
+    """Stable hash of the (JSON serializable) inputs used to generate an output file."""
+    serialized = json.dumps(inputs, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:32]
+
+
+def hash_files(file_paths: List[str]) -> str:
+    """Hash of the names and contents of the given files, ie the baseline recordings."""
+    hasher = hashlib.sha256()
+    for file_path in sorted(file_paths):
+        hasher.update(os.path.basename(file_path).encode("utf-8") + b"\0")
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+    return hasher.hexdigest()[:32]
+
+
+def hash_text_file(file_path: str) -> Optional[str]:
+    """Hash of a small text file's contents, or None if it does not exist."""
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:32]
+    except FileNotFoundError:
+        return None
+
+
+@dataclass
+class PhraseHistory:
+    """How generating a phrase went in earlier runs, see BuildManifest.phrase_history."""
+
+    attempts: int
+    failures: int
+    best_score: Optional[float]
+    # relative to the temperature and speed the run was started with, so the history
+    # still applies after changing the base temperature or --xtts_speed
+    passing_temperature_offset: Optional[float]
+    passing_speed_offset: Optional[float]
+
+
+class BuildManifest:
+    """
+    Records the fingerprint of the inputs each generated file was made from (the
+    filtered text, baseline recordings, speed, audio effects and model), in a small
+    SQLite database kept next to the voice pack folder.
+
+    This lets a rerun of generate_voice_pack.py regenerate only the files whose inputs
+    changed, for example after editing some `text_for_tts` cells, and delete the files
+    which are no longer in the phrase inventory. Files are keyed by their path relative
+    to the voice pack folder, and grouped by `kind` (ie 'phrase', 'radio_check' or
+    'subtitles') so orphans are only looked for among files of the same kind.
+
+    It also keeps the generation history of each phrase (keyed by its normalized
+    text), ie how many attempts failed the validity check and how far the temperature
+    and speed which finally passed were from those the run started with, so later runs
+    can go easier on the known-hard phrases.
+
+    SQLite's own locking keeps the manifest consistent when several containers share
+    the output folder, and the instance is safe to share between threads.
+    """
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+        self._lock = threading.Lock()
+        # the default rollback journal (rather than WAL) works on the bind mounted and
+        # network folders the output directory often lives on
+        self._connection = sqlite3.connect(
+            database_path, timeout=60, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            " output_path TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        history_columns = [
+            row[1]
+            for row in self._connection.execute("PRAGMA table_info(phrase_history)")
+        ]
+        if "passing_temperature" in history_columns:
+            # recorded absolute settings, which don't carry over to another base speed;
+            # the history is only a hint, so it is simply started afresh
+            self._connection.execute("DROP TABLE phrase_history")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS phrase_history ("
+            " text_key TEXT PRIMARY KEY,"
+            " attempts INTEGER NOT NULL,"
+            " failures INTEGER NOT NULL,"
+            " best_score REAL,"
+            " passing_temperature_offset REAL,"
+            " passing_speed_offset REAL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get(self, output_path: str) -> Optional[str]:
+        """Return the recorded fingerprint of an output, or None if it is not recorded."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fingerprint FROM outputs WHERE output_path = ?", (output_path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, output_path: str, kind: str, output_fingerprint: str) -> None:
+        """Record the fingerprint of a newly generated (or adopted) output."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?)",
+                (output_path, kind, output_fingerprint, time.time()),
+            )
+            self._connection.commit()
+
+    def queue_regeneration(self, output_path: str, kind: str) -> None:
+        """
+        Record an output as made from unknown inputs, so the next run regenerates it
+        even though it exists, ie after audit_voice_pack.py found it to be invalid.
+        An output already recorded keeps its kind, `kind` only applies to new records.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO outputs VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(output_path) DO UPDATE SET"
+                " fingerprint = excluded.fingerprint,"
+                " created_at = excluded.created_at",
+                (output_path, kind, "queued-for-regeneration", time.time()),
+            )
+            self._connection.commit()
+
+    def outputs(self, kind: str) -> List[str]:
+        """Return the paths of all recorded outputs of the given kind."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT output_path FROM outputs WHERE kind = ?", (kind,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def remove(self, output_paths: List[str]) -> None:
+        """Forget the given outputs."""
+        with self._lock:
+            self._connection.executemany(
+                "DELETE FROM outputs WHERE output_path = ?",
+                [(output_path,) for output_path in output_paths],
+            )
+            self._connection.commit()
+
+    def phrase_history(self, text_key: str) -> Optional[PhraseHistory]:
+        """Return the generation history of a phrase, or None if it has none."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT attempts, failures, best_score,"
+                " passing_temperature_offset, passing_speed_offset FROM phrase_history WHERE text_key = ?",
+                (text_key,),
+            ).fetchone()
+        return PhraseHistory(*row) if row else None
+
+    def record_phrase_attempts(
+        self,
+        text_key: str,
+        attempts: int,
+        failures: int,
+        scores: List[float],
+        passing_offsets: Optional[Tuple[float, float]] = None,
+    ) -> None:
+        """
+        Add the attempts made at generating a phrase to its history, along with the
+        validity check scores and the (temperature, speed) offsets from the base
+        settings of the attempt which passed.
+        """
+        best_score = max(scores) if scores else None
+        passing_temperature_offset, passing_speed_offset = passing_offsets or (
+            None,
+            None,
+        )
+        with self._lock:
+            # a single statement, so containers sharing the manifest don't lose counts
+            self._connection.execute(
+                "INSERT INTO phrase_history VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(text_key) DO UPDATE SET"
+                " attempts = attempts + excluded.attempts,"
+                " failures = failures + excluded.failures,"
+                " best_score = max(coalesce(best_score, excluded.best_score),"
+                " coalesce(excluded.best_score, best_score)),"
+                " passing_temperature_offset ="
+                " coalesce(excluded.passing_temperature_offset, passing_temperature_offset),"
+                " passing_speed_offset ="
+                " coalesce(excluded.passing_speed_offset, passing_speed_offset),"
+                " updated_at = excluded.updated_at",
+                (
+                    text_key,
+                    attempts,
+                    failures,
+                    best_score,
+                    passing_temperature_offset,
+                    passing_speed_offset,
+                    time.time(),
+                ),
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def remove_orphaned_outputs(
+    manifest: BuildManifest,
+    base_dir: str,
+    kind: str,
+    expected_outputs: set,
+    dry_run: bool = False,
+) -> int:
+    """
+    Delete the files of the given kind recorded in the manifest which are no longer
+    expected (ie their phrase was removed from the inventory), along with any folders
+    left empty. Files never recorded in the manifest are left alone. Each file is
+    logged before anything is deleted, and with `dry_run` only logged, keeping its
+    record so a later run can still delete it.
+    Returns the number of orphaned files.
+    """
+    orphaned_outputs = sorted(
+        output_path
+        for output_path in manifest.outputs(kind)
+        if output_path not in expected_outputs
+    )
+    for output_path in orphaned_outputs:
+        logging.info(
+            f"{'Keeping' if dry_run else 'Deleting'} orphaned {kind} file: {base_dir}{output_path}"
+        )
+    if dry_run:
+        return len(orphaned_outputs)
+
+    deleted_count = 0
+    for output_path in orphaned_outputs:
+        file_path = f"{base_dir}{output_path}"
+        try:
+            os.remove(file_path)
+            deleted_count += 1
+        except FileNotFoundError:
+            pass
+
+        # tidy up the folder if nothing else is left in it
+        folder = os.path.dirname(file_path)
+        try:
+            if not os.listdir(folder):
+                os.rmdir(folder)
+        except OSError:
+            # already removed, or just refilled, by another container
+            pass
+
+    manifest.remove(orphaned_outputs)
+    return deleted_count
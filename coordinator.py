@@ -0,0 +1,357 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+
+@dataclass
+class WorkUnit:
+    """One audio file for a worker to generate, saved at `output_key` by the coordinator."""
+
+    unit_id: int
+    output_key: str
+    kind: str
+    text: str
+    attempts: int = 0
+
+
+class WorkCoordinator:
+    """
+    Hands out the audio files of a voice pack to workers on other machines, and saves
+    the audio they send back into the local voice pack folder, so that several machines
+    can build one voice pack without sharing storage.
+
+    Each work unit is leased to one worker at a time. A lease which is not completed
+    within `lease_seconds` (ie the worker crashed or lost its network connection) is
+    given to the next worker asking for work, as is a unit the worker failed to
+    generate, until it has been tried `max_attempts` times. A unit completed by a
+    worker whose lease had already expired is still accepted if nobody beat it to it.
+
+    Safe to share between the threads of the HTTP server.
+    """
+
+    def __init__(
+        self,
+        units: List[WorkUnit],
+        output_dir: str,
+        settings: dict,
+        baseline_paths: List[str],
+        on_complete: Callable[[WorkUnit], None],
+        lease_seconds: float = 600.0,
+        max_attempts: int = 5,
+    ):
+        self.output_dir = output_dir
+        self.settings = settings
+        self.baseline_paths = {
+            os.path.basename(baseline_path): baseline_path
+            for baseline_path in baseline_paths
+        }
+        self.on_complete = on_complete
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._units: Dict[int, WorkUnit] = {unit.unit_id: unit for unit in units}
+        self._pending = deque(unit.unit_id for unit in units)
+        # unit_id -> (worker name, lease expiry time)
+        self._leases: Dict[int, tuple] = {}
+        self.completed_count = 0
+        self.abandoned_count = 0
+        self.finished = threading.Event()
+        if not units:
+            self.finished.set()
+
+    def lease(self, worker: str) -> Optional[WorkUnit]:
+        """Return the next unit for the worker, or None if none is available right now."""
+        with self._lock:
+            now = time.time()
+            for unit_id, (lease_worker, expires_at) in list(self._leases.items()):
+                if expires_at <= now:
+                    logging.warning(
+                        f"Lease of {self._units[unit_id].output_key} by {lease_worker} expired, reassigning it."
+                    )
+                    del self._leases[unit_id]
+                    self._retry_locked(unit_id)
+
+            if not self._pending:
+                return None
+            unit = self._units[self._pending.popleft()]
+            unit.attempts += 1
+            self._leases[unit.unit_id] = (worker, now + self.lease_seconds)
+            return unit
+
+    def complete(self, unit_id: int, audio: bytes) -> bool:
+        """
+        Save the audio generated for a unit. Returns False if the unit is unknown or
+        was already completed by another worker.
+        """
+        with self._lock:
+            unit = self._units.get(unit_id)
+            if unit is None:
+                return False
+            # claim it, so a second worker completing it at the same time is ignored
+            del self._units[unit_id]
+            self._leases.pop(unit_id, None)
+            if unit_id in self._pending:
+                self._pending.remove(unit_id)
+
+        file_path = f"{self.output_dir}{unit.output_key}"
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            temporary_path = f"{file_path}.part"
+            with open(temporary_path, "wb") as f:
+                f.write(audio)
+            os.replace(temporary_path, file_path)
+        except OSError:
+            # ie the disk is full, so hand the unit out again once it is sorted out
+            with self._lock:
+                self._units[unit_id] = unit
+                self._pending.append(unit_id)
+            raise
+        self.on_complete(unit)
+        logging.info(f"Audio file received: {file_path}")
+
+        with self._lock:
+            self.completed_count += 1
+            self._check_finished_locked()
+        return True
+
+    def fail(self, unit_id: int) -> None:
+        """Put back a unit the worker could not generate a valid audio file for."""
+        with self._lock:
+            if unit_id in self._leases:
+                del self._leases[unit_id]
+                self._retry_locked(unit_id)
+
+    def _retry_locked(self, unit_id: int) -> None:
+        unit = self._units[unit_id]
+        if unit.attempts < self.max_attempts:
+            self._pending.append(unit_id)
+            return
+
+        logging.error(
+            f"Giving up on {unit.output_key} after {unit.attempts} attempts by workers."
+        )
+        del self._units[unit_id]
+        self.abandoned_count += 1
+        self._check_finished_locked()
+
+    def _check_finished_locked(self) -> None:
+        if not self._units:
+            self.finished.set()
+
+    def progress(self) -> str:
+        with self._lock:
+            return (
+                f"{self.completed_count} audio files received, {len(self._pending)} waiting, "
+                f"{len(self._leases)} being generated by workers, {self.abandoned_count} abandoned"
+            )
+
+    def serve(self, port: int, progress_interval: float = 30.0) -> None:
+        """Serve work to workers on the given TCP port until all units are done."""
+        server = ThreadingHTTPServer(("0.0.0.0", port), CoordinatorRequestHandler)
+        server.daemon_threads = True
+        server.coordinator = self  # type: ignore[attr-defined]
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        logging.info(
+            f"Coordinator listening on port {port}, waiting for workers to connect..."
+        )
+
+        try:
+            while not self.finished.wait(progress_interval):
+                logging.info(f"Coordinator progress: {self.progress()}")
+            # keep answering for a moment so polling workers learn that the work is done
+            time.sleep(CoordinatorClient.poll_seconds * 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+        logging.info(f"Coordinator finished: {self.progress()}")
+
+
+class CoordinatorRequestHandler(BaseHTTPRequestHandler):
+    """
+    The coordinator's HTTP API:
+      - GET /settings: generation settings and the names of the baseline recordings
+      - GET /baseline/NAME: the contents of one baseline recording
+      - POST /lease: the next work unit for the worker named in the JSON body
+      - PUT /units/ID: the generated .wav file of a unit, as the request body
+      - POST /units/ID/failed: give up a unit the worker could not generate
+    """
+
+    server_version = "crew-chief-autovoicepack"
+
+    @property
+    def coordinator(self) -> WorkCoordinator:
+        return self.server.coordinator  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, record: dict, status: int = 200) -> None:
+        self._send(status, json.dumps(record).encode("utf-8"), "application/json")
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _unit_id(self) -> Optional[int]:
+        parts = self.path.strip("/").split("/")
+        try:
+            return int(parts[1]) if len(parts) >= 2 and parts[0] == "units" else None
+        except ValueError:
+            return None
+
+    def do_GET(self) -> None:
+        if self.path == "/settings":
+            self._send_json(
+                {
+                    **self.coordinator.settings,
+                    "baseline_files": sorted(self.coordinator.baseline_paths),
+                }
+            )
+        elif self.path.startswith("/baseline/"):
+            # only the known baseline files can be requested, never arbitrary paths
+            baseline_path = self.coordinator.baseline_paths.get(
+                self.path[len("/baseline/") :]
+            )
+            if baseline_path is None:
+                self._send_json({"error": "unknown baseline file"}, status=404)
+                return
+            with open(baseline_path, "rb") as f:
+                self._send(200, f.read(), "audio/wav")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:
+        if self.path == "/lease":
+            worker = json.loads(self._read_body() or b"{}").get("worker", "unknown")
+            unit = self.coordinator.lease(worker)
+            if unit is not None:
+                self._send_json(
+                    {
+                        "status": "work",
+                        "unit_id": unit.unit_id,
+                        "output_key": unit.output_key,
+                        "text": unit.text,
+                    }
+                )
+            elif self.coordinator.finished.is_set():
+                self._send_json({"status": "finished"})
+            else:
+                self._send_json({"status": "wait"})
+        elif self.path.endswith("/failed") and self._unit_id() is not None:
+            self.coordinator.fail(self._unit_id())
+            self._send_json({"status": "ok"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_PUT(self) -> None:
+        unit_id = self._unit_id()
+        if unit_id is None:
+            self._send_json({"error": "not found"}, status=404)
+            return
+        try:
+            is_saved = self.coordinator.complete(unit_id, self._read_body())
+        except OSError as e:
+            logging.error(f"Unable to save the audio file of unit {unit_id}: {e}")
+            self._send_json({"error": str(e)}, status=500)
+            return
+        self._send_json({"status": "saved" if is_saved else "duplicate"})
+
+
+class CoordinatorClient:
+    """
+    A worker's connection to the coordinator. Requests are retried while the
+    coordinator is unreachable for up to `max_unreachable_seconds`, ie while it restarts.
+    """
+
+    # how long to wait before asking again when all remaining work is leased to others
+    poll_seconds = 2.0
+
+    def __init__(
+        self,
+        coordinator_url: str,
+        worker_name: str,
+        max_unreachable_seconds: float = 120.0,
+    ):
+        self.coordinator_url = coordinator_url.rstrip("/")
+        self.worker_name = worker_name
+        self.max_unreachable_seconds = max_unreachable_seconds
+        self.session = requests.Session()
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        unreachable_since = None
+        while True:
+            try:
+                response = self.session.request(
+                    method, f"{self.coordinator_url}{path}", timeout=60, **kwargs
+                )
+                response.raise_for_status()
+                return response
+            except requests.exceptions.ConnectionError as e:
+                unreachable_since = unreachable_since or time.time()
+                if time.time() - unreachable_since > self.max_unreachable_seconds:
+                    raise
+                logging.warning(
+                    f"Unable to reach the coordinator at {self.coordinator_url}, retrying: {e}"
+                )
+                time.sleep(self.poll_seconds)
+
+    def settings(self) -> dict:
+        return self._request("GET", "/settings").json()
+
+    def download_baseline(
+        self, baseline_files: List[str], target_dir: str
+    ) -> List[str]:
+        """Save the coordinator's baseline recordings locally, returning their paths."""
+        os.makedirs(target_dir, exist_ok=True)
+        baseline_paths = []
+        for baseline_file in baseline_files:
+            baseline_path = os.path.join(target_dir, os.path.basename(baseline_file))
+            with open(baseline_path, "wb") as f:
+                f.write(self._request("GET", f"/baseline/{baseline_file}").content)
+            baseline_paths.append(baseline_path)
+        return baseline_paths
+
+    def lease(self) -> Optional[dict]:
+        """
+        Wait for the next work unit, returned as a dict with unit_id, output_key and
+        text, or None once all the work is done.
+        """
+        while True:
+            record = self._request(
+                "POST", "/lease", json={"worker": self.worker_name}
+            ).json()
+            if record["status"] == "work":
+                return record
+            if record["status"] == "finished":
+                return None
+            time.sleep(self.poll_seconds)
+
+    def complete(self, unit_id: int, audio: bytes) -> None:
+        self._request(
+            "PUT",
+            f"/units/{unit_id}",
+            data=audio,
+            headers={"Content-Type": "audio/wav"},
+        )
+
+    def fail(self, unit_id: int) -> None:
+        self._request("POST", f"/units/{unit_id}/failed")
+
+    def close(self) -> None:
+        self.session.close()
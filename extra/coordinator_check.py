@@ -0,0 +1,138 @@
+import logging
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+# use the coordinator of the scripts in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from coordinator import CoordinatorClient, WorkCoordinator, WorkUnit  # noqa: E402
+
+# Example usage:
+# python3 extra/coordinator_check.py
+#
+# utility script to check how the coordinator (see --coordinator_port and
+# --coordinator_url of generate_voice_pack.py) deals with unreliable workers, without
+# any GPU or TTS model: it serves a few work units on localhost to simulated workers
+# which crash holding a lease, complete after their lease expired, fail units or
+# start before the coordinator is up, and checks that every unit still ends up
+# completed (or abandoned) exactly once.
+# Exits with an error if any check fails.
+
+LEASE_SECONDS = 1.0
+MAX_ATTEMPTS = 3
+# how long the simulated workers wait between polls, instead of the default 2s
+POLL_SECONDS = 0.2
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+failed_checks = []
+
+
+def check(description: str, passed: bool) -> None:
+    print(f"{'OK  ' if passed else 'FAIL'}  {description}")
+    if not passed:
+        failed_checks.append(description)
+
+
+logging.basicConfig(level=logging.ERROR)
+CoordinatorClient.poll_seconds = POLL_SECONDS
+port = unused_port()
+coordinator_url = f"http://127.0.0.1:{port}"
+output_dir = tempfile.mkdtemp()
+completed_units = []
+coordinator = WorkCoordinator(
+    [
+        WorkUnit(unit_id, f"/voice/check/{unit_id}.wav", "phrase", f"phrase {unit_id}")
+        for unit_id in range(4)
+    ],
+    output_dir,
+    settings={"check": True},
+    baseline_paths=[],
+    on_complete=completed_units.append,
+    lease_seconds=LEASE_SECONDS,
+    max_attempts=MAX_ATTEMPTS,
+)
+
+# a worker started before the coordinator keeps retrying until it is reachable
+early_client = CoordinatorClient(coordinator_url, "early", max_unreachable_seconds=10)
+early_settings = []
+early_thread = threading.Thread(
+    target=lambda: early_settings.append(early_client.settings()), daemon=True
+)
+early_thread.start()
+time.sleep(POLL_SECONDS * 3)
+coordinator_thread = threading.Thread(
+    target=coordinator.serve, args=(port, 60.0), daemon=True
+)
+coordinator_thread.start()
+early_thread.join(10)
+check(
+    "worker started before the coordinator connects once it is up",
+    early_settings == [{"check": True, "baseline_files": []}],
+)
+early_client.close()
+
+crashed = CoordinatorClient(coordinator_url, "crashed")
+late = CoordinatorClient(coordinator_url, "late")
+steady = CoordinatorClient(coordinator_url, "steady")
+
+# leased by a worker which crashes, so it is reassigned once its lease expires
+crashed_unit = crashed.lease()
+# leased by a worker which is slow, and completes it after its lease expired
+late_unit = late.lease()
+steady_unit = steady.lease()
+steady.complete(steady_unit["unit_id"], b"steady")
+failing_unit = steady.lease()
+for _ in range(MAX_ATTEMPTS - 1):
+    steady.fail(failing_unit["unit_id"])
+    check(
+        "failed unit is handed out again",
+        steady.lease()["unit_id"] == failing_unit["unit_id"],
+    )
+steady.fail(failing_unit["unit_id"])
+
+time.sleep(LEASE_SECONDS + 0.2)
+reassigned_units = {steady.lease()["unit_id"], steady.lease()["unit_id"]}
+check(
+    "expired leases are reassigned to the next worker",
+    reassigned_units == {crashed_unit["unit_id"], late_unit["unit_id"]},
+)
+steady.complete(crashed_unit["unit_id"], b"reassigned")
+late.complete(late_unit["unit_id"], b"late")
+# the steady worker finishes it too, but the late worker beat it to it
+duplicate_status = requests.put(
+    f"{coordinator_url}/units/{late_unit['unit_id']}", data=b"steady", timeout=10
+).json()["status"]
+check("completing a unit twice keeps the first audio", duplicate_status == "duplicate")
+with open(f"{output_dir}{late_unit['output_key']}", "rb") as f:
+    check("unit completed after its lease expired is accepted", f.read() == b"late")
+
+check("workers are told when all the work is done", steady.lease() is None)
+coordinator_thread.join(10)
+check("coordinator stops once all units are done", not coordinator_thread.is_alive())
+check(
+    "every unit completed exactly once, except the one abandoned",
+    sorted(unit.unit_id for unit in completed_units)
+    == sorted(unit["unit_id"] for unit in (crashed_unit, late_unit, steady_unit))
+    and coordinator.completed_count == 3
+    and coordinator.abandoned_count == 1,
+)
+for client in (crashed, late, steady):
+    client.close()
+shutil.rmtree(output_dir, ignore_errors=True)
+
+if failed_checks:
+    print(f"Error: {len(failed_checks)} checks failed")
+    sys.exit(1)
+print("OK: all checks passed")
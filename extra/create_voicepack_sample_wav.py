@@ -1,9 +1,13 @@
-import csv
 import random
 import subprocess
 import os
+import sys
 
-# self-contained utility script to create a sample .wav audio and .mp4 video
+# share the phrase inventory loading and lookups with the main scripts in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from inventory import PhraseInventory  # noqa: E402
+
+# utility script to create a sample .wav audio and .mp4 video
 # file for each official voicepack name in the crew-chief-autovoicepack repository
 
 # All 14 lists of phrases
@@ -174,27 +178,20 @@ def convert_windows_to_unix_path(windows_path):
     return windows_path.replace("\\", "/")
 
 
-def get_matching_audio_files(phrases_to_match, name, random_choice=False):
+def get_matching_audio_files(inventory, phrases_to_match, name, random_choice=False):
     matching_audio_files = []
 
-    with open(csv_file_path, mode="r", newline="") as file:
-        reader = csv.DictReader(file)
-        rows = list(reader)
-
-        for phrase in phrases_to_match:
-            matching_rows = [
-                convert_windows_to_unix_path(
-                    f"output/{name}/{row['audio_path']}/{os.path.splitext(row['audio_filename'])[0]}-a.wav"
-                )
-                for row in rows
-                if phrase.strip().lower() == row["subtitle"].strip().lower()
-            ]
-            if matching_rows:
-                if random_choice:
-                    selected_audio = random.choice(matching_rows)
-                else:
-                    selected_audio = matching_rows[0]
-                matching_audio_files.append(selected_audio)
+    for phrase in phrases_to_match:
+        matching_rows = [
+            f"output/{name}/{entry.audio_path}/{entry.audio_filename}-a.wav"
+            for entry in inventory.matching_text(phrase)
+        ]
+        if matching_rows:
+            if random_choice:
+                selected_audio = random.choice(matching_rows)
+            else:
+                selected_audio = matching_rows[0]
+            matching_audio_files.append(selected_audio)
 
     return matching_audio_files
 
@@ -391,9 +388,12 @@ if not os.path.exists("silence.wav"):
         stderr=subprocess.DEVNULL,
     )
 
+# parsed once and shared by all voices
+inventory = PhraseInventory.load(csv_file_path)
+
 for i, (phrases_to_match, name) in enumerate(zip(phrases_to_match_list, names)):
     matching_audio_files = get_matching_audio_files(
-        phrases_to_match, name, random_choice=True
+        inventory, phrases_to_match, name, random_choice=True
     )
 
     if matching_audio_files:
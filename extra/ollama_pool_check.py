@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# use the backend pool of the scripts in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from translation_backends import OllamaBackendPool, OllamaEndpoint  # noqa: E402
+
+# Example usage:
+# python3 extra/ollama_pool_check.py
+#
+# utility script to check the failover of OllamaBackendPool (see --ollama_endpoints of
+# translate_phrases.py) without any Ollama server or GPU: it starts stub servers on
+# localhost which answer, fail with server errors, never answer in time, don't have the
+# model or answer with something other than JSON, and checks that the pool ejects the broken ones, sends the requests to the
+# others, and tries an ejected endpoint again once its ejection is over.
+# Exits with an error if any check fails.
+
+# the request timeout given to the pool, well below STALL_SECONDS
+TIMEOUT_SECONDS = 0.5
+STALL_SECONDS = 3.0
+EJECT_SECONDS = 1.0
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate according to the `behavior` of its server."""
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1  # type: ignore[attr-defined]
+        behavior = self.server.behavior  # type: ignore[attr-defined]
+        if behavior == "stall":
+            time.sleep(STALL_SECONDS)
+            return
+        if behavior == "bad_json":
+            body = b"<html>not json</html>"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        status, record = {
+            "ok": (200, {"response": "ok", "eval_count": 10, "eval_duration": 1e8}),
+            "error": (503, {"error": "overloaded"}),
+            "no_model": (404, {"error": "model not found"}),
+            "bad_request": (400, {"error": "invalid options"}),
+        }[behavior]
+        body = json.dumps(record).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub(behavior: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    server.daemon_threads = True
+    server.behavior = behavior  # type: ignore[attr-defined]
+    server.requests = 0  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def unused_port() -> int:
+    """A local port nothing listens on, so connections to it are refused."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def endpoint_of(server: ThreadingHTTPServer, weight: float = 1.0) -> OllamaEndpoint:
+    return OllamaEndpoint(
+        host=f"127.0.0.1:{server.server_address[1]}", model="stub", weight=weight
+    )
+
+
+failed_checks = []
+
+
+def check(description: str, passed: bool) -> None:
+    print(f"{'OK  ' if passed else 'FAIL'}  {description}")
+    if not passed:
+        failed_checks.append(description)
+
+
+logging.basicConfig(level=logging.ERROR)
+healthy = start_stub("ok")
+
+# the broken endpoints are given the higher weight, so the pool tries them first while
+# they are not ejected
+for broken_behavior in ("error", "stall", "refused", "no_model"):
+    broken_endpoint = (
+        OllamaEndpoint(host=f"127.0.0.1:{unused_port()}", model="stub", weight=2.0)
+        if broken_behavior == "refused"
+        else endpoint_of(start_stub(broken_behavior), weight=2.0)
+    )
+    healthy_requests = healthy.requests  # type: ignore[attr-defined]
+    pool = OllamaBackendPool(
+        [broken_endpoint, endpoint_of(healthy)], eject_seconds=EJECT_SECONDS
+    )
+    responses = [pool.generate("prompt", {}, timeout=TIMEOUT_SECONDS) for _ in range(4)]
+    check(
+        f"{broken_behavior}: every request answered by the healthy endpoint",
+        responses == ["ok"] * 4
+        and healthy.requests - healthy_requests == 4,  # type: ignore[attr-defined]
+    )
+    check(
+        f"{broken_behavior}: broken endpoint tried once, then ejected",
+        broken_endpoint.requests == 1
+        and broken_endpoint.ejections == 1
+        and broken_endpoint.ejected_until > time.time(),
+    )
+    pool.close()
+
+# an ejected endpoint is tried again once its ejection is over, and ejected for twice
+# as long if it still fails
+failing_endpoint = endpoint_of(start_stub("error"), weight=2.0)
+pool = OllamaBackendPool(
+    [failing_endpoint, endpoint_of(healthy)], eject_seconds=EJECT_SECONDS
+)
+pool.generate("prompt", {}, timeout=TIMEOUT_SECONDS)
+time.sleep(EJECT_SECONDS + 0.1)
+start_time = time.time()
+for _ in range(4):
+    pool.generate("prompt", {}, timeout=TIMEOUT_SECONDS)
+check(
+    "ejected endpoint tried again after its ejection, then ejected for twice as long",
+    failing_endpoint.requests == 2
+    and failing_endpoint.ejected_until - start_time > EJECT_SECONDS * 1.5,
+)
+pool.close()
+
+# with every endpoint broken, the requests still go to the one due back first, and
+# give up after the transport retries
+broken_pool = OllamaBackendPool(
+    [endpoint_of(start_stub("error")), endpoint_of(start_stub("error"))],
+    eject_seconds=EJECT_SECONDS,
+)
+response = broken_pool.generate(
+    "prompt", {}, timeout=TIMEOUT_SECONDS, max_transport_retries=2
+)
+check(
+    "all endpoints broken: gives up after the transport retries",
+    response is None
+    and sum(endpoint.requests for endpoint in broken_pool.endpoints) == 3,
+)
+broken_pool.close()
+
+# a client error is the request's fault, and an unreadable answer still shows the
+# endpoint is up, so neither is retried nor held against the endpoint
+for behavior, description in (
+    ("bad_request", "client error"),
+    ("bad_json", "response which isn't JSON"),
+):
+    answering_endpoint = endpoint_of(start_stub(behavior), weight=2.0)
+    pool = OllamaBackendPool(
+        [answering_endpoint, endpoint_of(healthy)], eject_seconds=EJECT_SECONDS
+    )
+    response = pool.generate("prompt", {}, timeout=TIMEOUT_SECONDS)
+    check(
+        f"{description}: not retried and the endpoint not ejected",
+        response is None
+        and answering_endpoint.requests == 1
+        and answering_endpoint.ejections == 0,
+    )
+    pool.close()
+
+if failed_checks:
+    print(f"Error: {len(failed_checks)} checks failed")
+    sys.exit(1)
+print("OK: all checks passed")
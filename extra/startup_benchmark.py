@@ -0,0 +1,53 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Example usage:
+# python3 extra/startup_benchmark.py generate_voice_pack.py --help
+# python3 extra/startup_benchmark.py translate_phrases.py --help
+#
+# utility script to measure how long a command of the repo's scripts takes to start,
+# running it with `python -X importtime` and listing the imports taking the most time,
+# ie to check that the ML stack (torch, TTS, ...) is not imported by a command that
+# doesn't generate any audio
+
+# number of slowest imports to list
+TOP_IMPORTS = 15
+
+if len(sys.argv) < 2:
+    print("Usage: python startup_benchmark.py <script.py> [script arguments...]")
+    sys.exit(1)
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+start_time = time.perf_counter()
+result = subprocess.run(
+    [sys.executable, "-X", "importtime", *sys.argv[1:]],
+    cwd=repo_dir,
+    stdout=subprocess.DEVNULL,
+    stderr=subprocess.PIPE,
+    text=True,
+)
+elapsed = time.perf_counter() - start_time
+
+# lines look like "import time:       609 |      88901 | requests", the cumulative time
+# (in microseconds) of a top-level import including everything it imports in turn
+import_times = []
+for line in result.stderr.splitlines():
+    match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+    if match is not None:
+        import_times.append(
+            (int(match.group(2)), len(match.group(3)) // 2, match.group(4))
+        )
+
+top_level_total = sum(cumulative for cumulative, depth, _ in import_times if depth == 0)
+print(f"Command finished in {elapsed:.2f}s (exit code {result.returncode})")
+print(f"Imports took {top_level_total / 1e6:.2f}s in total, the slowest being:")
+for cumulative, depth, module in sorted(import_times, reverse=True)[:TOP_IMPORTS]:
+    print(f"  {cumulative / 1e6:7.3f}s  {'  ' * depth}{module}")
+
+for heavy_module in ("torch", "torchaudio", "TTS", "xtts_integrity"):
+    if any(module == heavy_module for _, _, module in import_times):
+        print(f"Note: {heavy_module} was imported")
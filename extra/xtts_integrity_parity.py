@@ -0,0 +1,111 @@
+import glob
+import os
+import sys
+import time
+
+# share the xtts-integrity model loading with the main script in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from generate_voice_pack import (  # noqa: E402
+    XTTS_INTEGRITY_MODEL_PATH,
+    load_xtts_integrity_cpu_model,
+    run_xtts_integrity_inference,
+)
+
+# Example usage:
+# python3 extra/xtts_integrity_parity.py output/Luis/voice/acknowledge output/Luis/voice/frozen_order
+#
+# utility script to check that the int8-quantized xtts-integrity model, which runs the
+# validity check on the CPU (see --xtts_integrity_cpu_threads), scores a fixed set of
+# clips like the original PyTorch model, so --xtts_integrity_threshold keeps its meaning.
+# Exits with an error if any clip's score differs by more than MAX_SCORE_DIFFERENCE.
+
+# the threshold at which to compare the valid/invalid decisions of both models
+THRESHOLD = 0.9
+MAX_SCORE_DIFFERENCE = 0.02
+# the first clips (in sorted order) of the given folders, so reruns score the same set
+MAX_CLIPS = 500
+# number of the largest differences to list
+TOP_DIFFERENCES = 10
+
+if len(sys.argv) < 2:
+    print("Usage: python xtts_integrity_parity.py <folder or .wav file> [...]")
+    sys.exit(1)
+
+import torch  # noqa: E402
+from xtts_integrity.infer import load_model  # noqa: E402
+
+clip_paths = []
+for path in sys.argv[1:]:
+    if os.path.isdir(path):
+        clip_paths.extend(glob.glob(f"{path}/**/*.wav", recursive=True))
+    else:
+        clip_paths.append(path)
+clip_paths = sorted(
+    clip_path
+    for clip_path in clip_paths
+    if ".invalid-" not in clip_path and not clip_path.endswith(".raw.wav")
+)[:MAX_CLIPS]
+if not clip_paths:
+    print("No .wav files found.")
+    sys.exit(1)
+
+device = torch.device("cpu")
+models = {
+    "original": load_model(XTTS_INTEGRITY_MODEL_PATH, device),
+    "quantized": load_xtts_integrity_cpu_model(),
+}
+scores = {}
+for model_name, model in models.items():
+    start_time = time.perf_counter()
+    with torch.inference_mode():
+        valid_files, invalid_files = run_xtts_integrity_inference(
+            model, clip_paths, device, THRESHOLD
+        )
+    elapsed = time.perf_counter() - start_time
+    scores[model_name] = {
+        clip_path: (float(score), is_valid)
+        for is_valid, files in ((True, valid_files), (False, invalid_files))
+        for clip_path, score in files
+    }
+    print(
+        f"{model_name} model: scored {len(clip_paths)} clips in {elapsed:.2f}s "
+        f"with {torch.get_num_threads()} threads"
+    )
+
+differences = sorted(
+    (
+        abs(scores["original"][clip_path][0] - scores["quantized"][clip_path][0]),
+        clip_path,
+    )
+    for clip_path in clip_paths
+    if clip_path in scores["original"] and clip_path in scores["quantized"]
+)
+flipped = [
+    clip_path
+    for _, clip_path in differences
+    if scores["original"][clip_path][1] != scores["quantized"][clip_path][1]
+]
+max_difference = differences[-1][0] if differences else 0.0
+
+print(f"Largest score differences of {len(differences)} clips:")
+for difference, clip_path in reversed(differences[-TOP_DIFFERENCES:]):
+    original_score = scores["original"][clip_path][0]
+    quantized_score = scores["quantized"][clip_path][0]
+    print(
+        f"  {difference:.4f}  {original_score:.4f} -> {quantized_score:.4f}  {clip_path}"
+    )
+print(f"{len(flipped)} clips judged differently at the threshold of {THRESHOLD}")
+for clip_path in flipped:
+    print(f"  {clip_path}")
+
+if len(differences) < len(clip_paths):
+    print(
+        f"Error: {len(clip_paths) - len(differences)} clips were not scored by both models"
+    )
+    sys.exit(1)
+if max_difference > MAX_SCORE_DIFFERENCE:
+    print(
+        f"Error: scores differ by up to {max_difference:.4f}, over {MAX_SCORE_DIFFERENCE}"
+    )
+    sys.exit(1)
+print(f"OK: scores differ by at most {max_difference:.4f}")
@@ -1,31 +1,104 @@
 import logging
 import argparse
+import csv
 import datetime
+import fnmatch
+import gc
 import glob
+import json
+import math
+import multiprocessing
 import os
 import random
 import subprocess
+import sys
+import threading
 import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import re
-import torch
-import torchaudio
-from torch.utils.data import DataLoader
-from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import Xtts
-from xtts_integrity.transform import InferenceAudioTransform
-from xtts_integrity.infer import AudioInferenceDataset, load_model, run_inference
-
+import socket
+import tempfile
+import requests
+
+# The ML stack (torch, torchaudio, TTS and xtts_integrity) takes seconds to import, so it
+# is only imported by the functions generating or validating audio. Commands which
+# never do, like --help, the coordinator, or a rerun with nothing left to generate,
+# start right away. `python -X importtime generate_voice_pack.py --help` shows the
+# remaining import time of each module.
+
+from autotune import (
+    CPU_STREAM_COUNTS,
+    GPU_STREAM_COUNTS,
+    TunedSettings,
+    candidate_backends,
+    describe_host,
+    host_key,
+    load_tuned_settings,
+    save_tuned_settings,
+    tune,
+)
+from coordinator import CoordinatorClient, WorkCoordinator, WorkUnit
+from build_manifest import (
+    BuildManifest,
+    PhraseHistory,
+    fingerprint,
+    hash_files,
+    hash_text_file,
+    remove_orphaned_outputs,
+)
+from inventory import PhraseInventory, normalize_text
 from utils import (
     CrewChiefAudioFile,
-    parse_phrase_inventory,
     progress_string,
     count_wav_files_in_tree,
     log_progress_string,
 )
 
+# this model path is based on the Docker container's filesystem, so there should
+# be no need to change this unless the corresponding Dockerfile section changes
+XTTS_MODEL_PATH = (
+    "/root/.local/share/tts/tts_models--multilingual--multi-dataset--xtts_v2"
+)
+XTTS_INTEGRITY_MODEL_PATH = (
+    "/app/xtts-integrity/checkpoints/xtts-integrity-20241112.pth"
+)
+
+# the xtts GPT produces this many audio tokens per second of speech at speed 1.0
+# (22.05KHz mel frames with a hop length of 1024), used to cap runaway generations
+XTTS_AUDIO_TOKENS_PER_SECOND = 22050 / 1024
+
+# generated audio still has some silence at both ends, later trimmed by the audio effects
+UNTRIMMED_SILENCE_SECONDS = 0.5
+
+# temperature and speed offsets tried in turn by a phrase which keeps failing the
+# validity check, moving on to the next one every ATTEMPTS_PER_RETRY_STEP attempts
+# instead of repeating the same sampling settings
+RETRY_SETTINGS_STEPS = [(0.0, 0.0), (0.1, 0.0), (-0.1, -0.1), (0.2, -0.1), (0.0, -0.2)]
+ATTEMPTS_PER_RETRY_STEP = 3
+
+# long texts are split at clause boundaries into chunks of about this many characters
+# (see --max_chunk_length), never leaving a chunk shorter than MIN_CHUNK_LENGTH
+MIN_CHUNK_LENGTH = 20
+# pauses between the stitched chunks, after a sentence and after a clause
+SENTENCE_PAUSE_SECONDS = 0.35
+CLAUSE_PAUSE_SECONDS = 0.15
+# short fades in and out of each stitched chunk, so the joins don't click
+CHUNK_FADE_SECONDS = 0.02
+
+# the autotuner times this many inventory phrases, of evenly spread lengths, with each
+# configuration it tries
+AUTOTUNE_PHRASE_COUNT = 12
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -45,8 +118,8 @@ def parse_arguments():
         "--voice_name",
         # transform the value to strip out spaces
         type=lambda x: x.replace(" ", ""),
-        required=True,
-        help="Your custom name for this voice. Will be used as output directory name and appear in the CrewChief UI. Spaces will be removed, and probably avoid using UTF-8 and other characters.",
+        default=None,
+        help="Your custom name for this voice. Will be used as output directory name and appear in the CrewChief UI. Spaces will be removed, and probably avoid using UTF-8 and other characters. Required, except for workers started with --coordinator_url.",
     )
     parser.add_argument(
         "--voice_name_tts",
@@ -80,7 +153,19 @@ def parse_arguments():
     parser.add_argument(
         "--original_inventory_order",
         action="store_true",
-        help="Do not randomize the order of the audio files in the inventory. It's recommended to keep shuffling enabled (omit this option) when running multiple instances of the script in parallel.",
+        help="Do not randomize or prioritize the order of the audio files in the inventory. It's recommended to keep shuffling enabled (omit this option) when running multiple instances of the script in parallel.",
+    )
+    parser.add_argument(
+        "--priority_weights_file",
+        type=str,
+        default=None,
+        help="Path to a JSON file of inventory priorities to use instead of the built-in DEFAULT_PRIORITY_WEIGHTS in generate_voice_pack.py, as an object mapping patterns like '/voice/flags/*' (matched against each row's audio_path/audio_filename, the first matching pattern applies) to a weight. Higher weights are generated first, rows with equal weights in random order.",
+    )
+    parser.add_argument(
+        "--time_budget",
+        type=float,
+        default=None,
+        help="Stop starting new audio files after this many minutes of generating the phrase inventory. Since the most important folders and the first variant of every phrase are generated first, this leaves the most usable voice pack possible in the time available. Run again without it to complete the voice pack.",
     )
     parser.add_argument(
         "--phrase_inventory",
@@ -112,6 +197,8 @@ def parse_arguments():
     parser.add_argument(
         "--disable_deepspeed",
         action="store_true",
+        # None until resolved by prepare_arguments, see --generation_streams
+        default=None,
         help="Skip DeepSpeed during inference. Recommended to keep it enabled if possible as inference (TTS generation) is much faster, but it causes a longer startup time and noisy logs so may be helpful to disable during certain development steps.",
     )
     parser.add_argument(
@@ -141,6 +228,34 @@ def parse_arguments():
         default=30,
         help="Maximum number of attempts to generate a valid .wav file before giving up. This is used to prevent the script from getting stuck on a single problematic phrase, but keeping it high naturally encourages higher-quality audio output.",
     )
+    parser.add_argument(
+        "--disable_adaptive_retries",
+        action="store_true",
+        help="Retry invalid .wav files with the same temperature and speed every time. By default, a phrase which keeps failing the validity check is retried with gradually shifted temperature and speed, and phrases which were hard to generate in earlier runs of the same voice start with the settings that eventually worked for them (see the build manifest in the output folder).",
+    )
+    parser.add_argument(
+        "--generate_driver_names",
+        action="store_true",
+        help="Also generate the driver_names folder, with one clip for each name in --driver_names_file (or just --your_name), named after it exactly since that is how CrewChief finds it, so --variation_count does not apply. Short clips like these are generated and validated in batches. Combine with --skip_inventory and --skip_radio_check to only generate the driver names. Like the rest of the voice pack, clips already generated from the same inputs are skipped when run again.",
+    )
+    parser.add_argument(
+        "--driver_names_file",
+        type=str,
+        default=None,
+        help="Path to a text file listing one driver name per line, as named by CrewChief, for --generate_driver_names. Blank lines and lines starting with '#' are ignored. Defaults to just --your_name.",
+    )
+    parser.add_argument(
+        "--driver_name_pronunciations_file",
+        type=str,
+        default=None,
+        help='Path to a JSON file mapping driver names (case-insensitive) to the text to speak for them, ie {"Raikkonen": "Rye-konen"}, for names the model mispronounces.',
+    )
+    parser.add_argument(
+        "--driver_names_batch_size",
+        type=int,
+        default=64,
+        help="Number of driver name clips generated before validating them all at once, see --generate_driver_names. Invalid clips are regenerated together in the next round.",
+    )
     parser.add_argument(
         "--radio_check_tts_text",
         type=str,
@@ -170,7 +285,205 @@ def parse_arguments():
         default=30.0,
         help="Interval in seconds between progress updates (which may be expensive/slow to calculate since it scans the entire output directory).",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--remove_orphaned_files",
+        action="store_true",
+        help="Delete previously generated audio and subtitles.csv files whose phrases are no longer in the phrase inventory (or radio checks, or driver names) at the end of the run. By default they are only listed in the log. Only files recorded in the build manifest are ever deleted.",
+    )
+    parser.add_argument(
+        "--replacement_rules_file",
+        type=str,
+        default=None,
+        help="Path to a JSON file of text replacement rules to use instead of the built-in rules in generate_voice_pack.py, as a list of objects with 'regex', 'replacement' and optional 'probability' keys. A replacement of 'YOUR_NAME' is swapped for --your_name.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running after the voice pack is generated, watching the phrase inventory (and --replacement_rules_file) for changes and immediately regenerating the edited rows, ahead of any remaining work. Useful for tuning pronunciation without waiting for the model to load again. Stop with Ctrl+C.",
+    )
+    parser.add_argument(
+        "--watch_interval",
+        type=float,
+        default=0.5,
+        help="Interval in seconds between checks for changes to the watched files when idle in --watch mode.",
+    )
+    parser.add_argument(
+        "--coordinator_port",
+        type=int,
+        default=None,
+        help="Run as the coordinator of a build spread across several machines, listening on this TCP port. The coordinator works out which audio files need generating and hands them out to workers (started with --coordinator_url) over HTTP, saving the audio they send back into its own output folder, so the machines need no shared storage. The coordinator does not generate audio itself, so also start a worker on the same machine to use its GPU.",
+    )
+    parser.add_argument(
+        "--coordinator_url",
+        type=str,
+        default=None,
+        help="Run as a worker for the coordinator at this URL, ie 'http://192.168.1.10:8765'. Workers take the baseline recordings and generation settings from the coordinator, and only need their own hardware options such as --cpu_only.",
+    )
+    parser.add_argument(
+        "--lease_seconds",
+        type=float,
+        default=600.0,
+        help="For the coordinator, how long a worker has to return an audio file before it is given to another worker, in case the first worker crashed or lost its connection.",
+    )
+    parser.add_argument(
+        "--generation_streams",
+        type=int,
+        # None until resolved by prepare_arguments, so a configuration saved by
+        # --autotune can tell an explicit value from the default of 1
+        default=None,
+        help="Number of audio files in progress at once within this one process, all sharing a single copy of the model in GPU memory. Inference is not concurrent: the streams take turns running the xtts model, one at a time, and what runs in parallel is the post-processing, ie while one stream runs the model the others apply audio effects and validity checks. This keeps the GPU busier than a single stream without every replica holding its own copy of the weights. Extra streams need next to no extra GPU memory. The GPU memory used is reported at startup. Defaults to 1, or the configuration saved by --autotune for this machine.",
+    )
+    parser.add_argument(
+        "--cpu_threads",
+        type=int,
+        default=None,
+        help="Number of CPU threads torch uses for inference and the validity check. Defaults to one per CPU core, which is not always fastest, especially with several --generation_streams.",
+    )
+    parser.add_argument(
+        "--autotune",
+        action="store_true",
+        help="Before generating, benchmark a dozen phrases of the inventory with several configurations of --generation_streams, DeepSpeed on or off and (with --cpu_only) --cpu_threads, stopping at the first stream count which isn't faster than the one before. Since the streams take turns running the model and only overlap their post-processing (see --generation_streams), this finds how much of that overlap pays off on this machine; it does not tune any batch size or GPU memory use. The fastest configuration is used for this run, and saved to --autotune_file so later runs on the same hardware use it automatically. Takes a few minutes, best run once on each new machine with no other replicas running.",
+    )
+    parser.add_argument(
+        "--autotune_file",
+        type=str,
+        default=None,
+        help="Path to the JSON file where --autotune saves the fastest configuration of each machine (identified by its CPU, GPU, memory and torch version). Defaults to '.autotune.json' in --output_audio_dir.",
+    )
+    parser.add_argument(
+        "--disable_autotuned_settings",
+        action="store_true",
+        help="Ignore the configuration saved by an earlier --autotune run on this machine. Otherwise it is used for --generation_streams, --disable_deepspeed and --cpu_threads, unless they are given on the command line.",
+    )
+    parser.add_argument(
+        "--max_chunk_length",
+        type=int,
+        default=100,
+        help="Texts longer than this many characters are split at clause boundaries (commas, full stops, ...) into chunks which are generated and validated separately, then stitched together with matched loudness before the audio effects are applied. A garbled chunk then only costs regenerating that chunk, instead of the whole long sentence. Set to 0 to always generate texts in one go.",
+    )
+    parser.add_argument(
+        "--disable_streaming_inference",
+        action="store_true",
+        help="Generate each audio file in a single pass instead of with the model's streaming inference. Streaming inference stops a garbled generation as soon as it runs longer than its text could possibly take, rather than after the full clip has been generated, effected and validated.",
+    )
+    parser.add_argument(
+        "--xtts_integrity_on_cpu",
+        action="store_true",
+        help="Run the xtts-integrity validity check model on the CPU, leaving its share of GPU memory for generation.",
+    )
+    parser.add_argument(
+        "--xtts_integrity_cpu_threads",
+        type=int,
+        default=2,
+        help="When the xtts-integrity validity check runs on the CPU (with --xtts_integrity_on_cpu, or without a GPU), it runs in a separate process limited to this many CPU threads, using an int8-quantized copy of the model, so it doesn't take the CPU away from generating audio. Set to 0 to run the original model within the generating process, on all the CPU cores.",
+    )
+    args = parser.parse_args()
+    if args.generation_streams is not None and args.generation_streams < 1:
+        parser.error("--generation_streams must be at least 1")
+    if args.xtts_integrity_cpu_threads < 0:
+        parser.error("--xtts_integrity_cpu_threads can't be negative")
+    if args.cpu_threads is not None and args.cpu_threads < 1:
+        parser.error("--cpu_threads must be at least 1")
+    if args.autotune and (
+        args.coordinator_port is not None or args.coordinator_url is not None
+    ):
+        parser.error(
+            "--autotune can't be combined with --coordinator_port or --coordinator_url, tune each machine with a run of its own first"
+        )
+    if args.voice_name is None and args.coordinator_url is None:
+        parser.error("the following arguments are required: --voice_name")
+    if args.coordinator_port is not None and args.coordinator_url is not None:
+        parser.error("--coordinator_port can't be combined with --coordinator_url")
+    if args.time_budget is not None and args.coordinator_port is not None:
+        parser.error("--time_budget can't be combined with --coordinator_port")
+    if args.generate_driver_names and args.coordinator_port is not None:
+        parser.error(
+            "--generate_driver_names can't be combined with --coordinator_port"
+        )
+    if args.watch and (args.skip_inventory or args.coordinator_port is not None):
+        parser.error(
+            "--watch can't be combined with --skip_inventory or --coordinator_port"
+        )
+    return args
+
+
+# Relative priority of the phrase inventory folders, matched against each row's
+# audio_path/audio_filename (the first matching pattern applies). The callouts heard in
+# every session are generated before the rarely heard ones, so a voice pack which is only
+# partly generated is already usable. See --priority_weights_file.
+DEFAULT_PRIORITY_WEIGHTS: Dict[str, float] = {
+    # core race engineer callouts, and the numbers they are built from
+    "/voice/acknowledge/*": 3,
+    "/voice/flags/*": 3,
+    "/voice/position/*": 3,
+    "/voice/lap_times/*": 3,
+    "/voice/lap_counter/*": 3,
+    "/voice/fuel/*": 3,
+    "/voice/timings/*": 3,
+    "/voice/numbers/*": 3,
+    "/voice/spotter/*": 3,
+    "/voice/race_time/*": 3,
+    "/voice/penalties/*": 3,
+    "/voice/mandatory_pit_stops/*": 3,
+    # rally pacenotes, track specific corner names and occasional commentary
+    "/voice/codriver/*": 1,
+    "/voice/pace_notes/*": 1,
+    "/voice/corners/*": 1,
+    "/voice/rants/*": 1,
+    "/voice/pearls_of_wisdom/*": 1,
+}
+# weight of the rows not matching any pattern
+DEFAULT_PRIORITY_WEIGHT = 2
+
+# sox effects applied to every generated audio file, see apply_audio_effects. Changes
+# here are picked up by incremental rebuilds, which regenerate the affected files.
+AUDIO_EFFECTS: List[str] = [
+    # "gain",
+    # "-3",
+    "equalizer",
+    "100",
+    "0.5q",
+    "-12",
+    "equalizer",
+    "200",
+    "0.5q",
+    "-6",
+    "equalizer",
+    "300",
+    "0.5q",
+    "-3",
+    "equalizer",
+    "3000",
+    "0.5q",
+    "6",
+    "equalizer",
+    "6000",
+    "0.5q",
+    "4",
+    "equalizer",
+    "10000",
+    "0.5q",
+    "3",
+    "overdrive",
+    "7",
+    "12",
+    "silence",
+    "1",
+    "0.1",
+    "0.1%",
+    "reverse",
+    "silence",
+    "1",
+    "0.1",
+    "0.3%",
+    "reverse",
+    "norm",
+    "-1",
+    "channels",
+    "1",
+    "rate",
+    "22050",
+]
 
 
 def apply_audio_effects(input_file: str, output_file: str) -> None:
@@ -184,7 +497,7 @@ def apply_audio_effects(input_file: str, output_file: str) -> None:
     - ensure single channel
     Note that noise is not added since the CrewChief overlays background noise separately.
 
-    You are encouraged to modify these effects to suit your own preferences. Use `man sox`
+    You are encouraged to modify these effects (in AUDIO_EFFECTS) to suit your own preferences. Use `man sox`
     in a terminal to see full documentation.
     """
 
@@ -194,51 +507,7 @@ def apply_audio_effects(input_file: str, output_file: str) -> None:
         "-q",
         input_file,
         output_file,
-        # "gain",
-        # "-3",
-        "equalizer",
-        "100",
-        "0.5q",
-        "-12",
-        "equalizer",
-        "200",
-        "0.5q",
-        "-6",
-        "equalizer",
-        "300",
-        "0.5q",
-        "-3",
-        "equalizer",
-        "3000",
-        "0.5q",
-        "6",
-        "equalizer",
-        "6000",
-        "0.5q",
-        "4",
-        "equalizer",
-        "10000",
-        "0.5q",
-        "3",
-        "overdrive",
-        "7",
-        "12",
-        "silence",
-        "1",
-        "0.1",
-        "0.1%",
-        "reverse",
-        "silence",
-        "1",
-        "0.1",
-        "0.3%",
-        "reverse",
-        "norm",
-        "-1",
-        "channels",
-        "1",
-        "rate",
-        "22050",
+        *AUDIO_EFFECTS,
     ]
 
     try:
@@ -269,21 +538,86 @@ def is_invalid_wav_simple(file_path: str, tts_text: str) -> bool:
 
 
 def is_invalid_wav_xtts_integrity(
-    file_path: str, xtts_integrity_threshold: float = 0.9
-) -> bool:
+    file_path: str,
+    xtts_integrity_threshold: float = 0.9,
+    on_cpu: bool = False,
+    cpu_threads: int = 0,
+) -> Tuple[bool, Optional[float]]:
     """
     Use the xtts-integrity ML model to perform the .wav file validity check.
-    Return False if the caller should regenerate this file (ie, try again to make a clean file).
+    Return True if the caller should regenerate this file (ie, try again to make a clean
+    file), along with the model's score for the file.
+    """
+    results = check_wav_files_xtts_integrity(
+        [file_path], xtts_integrity_threshold, on_cpu, cpu_threads
+    )
+    if file_path not in results:
+        logging.error(
+            f"Error: Something unexpected went wrong when using xtts-integrity for file {file_path}"
+        )
+        return False, None
+    return results[file_path]
+
+
+def check_wav_files_xtts_integrity(
+    file_paths: List[str],
+    xtts_integrity_threshold: float = 0.9,
+    on_cpu: bool = False,
+    cpu_threads: int = 0,
+) -> Dict[str, Tuple[bool, float]]:
+    """
+    Run the xtts-integrity validity check on several .wav files in batches, returning
+    whether each file is invalid (should be regenerated), along with its score.
+
+    On the CPU, with `cpu_threads`, the files are scored by a separate process (see
+    xtts_integrity_cpu_process) rather than by this one.
+    """
+    device = xtts_integrity_device(on_cpu)
+    if device.type == "cpu" and cpu_threads > 0:
+        valid_files, invalid_files = (
+            xtts_integrity_cpu_process(cpu_threads)
+            .submit(
+                score_in_xtts_integrity_process, file_paths, xtts_integrity_threshold
+            )
+            .result()
+        )
+    else:
+        model = init_xtts_integrity_model(on_cpu)
+        valid_files, invalid_files = run_xtts_integrity_inference(
+            model, file_paths, device, xtts_integrity_threshold
+        )
+
+    results = {}
+    for file_path, score in invalid_files:
+        logging.warning(
+            f"Invalid .wav file detected: {file_path} with score {score:.2f}"
+        )
+        results[file_path] = (True, score)
+    for file_path, score in valid_files:
+        logging.info(
+            f"xtts_integrity validity check passed for {file_path} with score {score:.2f}"
+        )
+        results[file_path] = (False, score)
+    return results
+
+
+def run_xtts_integrity_inference(
+    model: Any, file_paths: List[str], device: Any, xtts_integrity_threshold: float
+) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Score the .wav files with the xtts-integrity model, returning the (path, score) of
+    the valid files and of the invalid files.
     """
-    model = init_xtts_integrity_model()
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    from torch.utils.data import DataLoader
+    from xtts_integrity.infer import AudioInferenceDataset, run_inference
+    from xtts_integrity.transform import InferenceAudioTransform
+
     transform = InferenceAudioTransform()
 
-    wav_files = [file_path]
-    inference_dataset = AudioInferenceDataset(wav_files, transform=transform)
+    inference_dataset = AudioInferenceDataset(file_paths, transform=transform)
     inference_loader = DataLoader(inference_dataset, batch_size=48, shuffle=False)
 
-    valid_files, invalid_files = run_inference(
+    return run_inference(
         # note that threshold here can be lowered to allow lower-confidence
         # files to be accepted, which will reduce the amount of regeneration
         # at the cost of more audio artifacts slipping through
@@ -293,27 +627,74 @@ def is_invalid_wav_xtts_integrity(
         threshold=xtts_integrity_threshold,
     )
 
-    is_invalid = len(invalid_files) > 0
 
-    if is_invalid:
-        if len(invalid_files) < 1:
-            logging.error(
-                f"Error: Something unexpected went wrong when using xtts-integrity for file {file_path}"
-            )
-            return False
+# On the CPU, the xtts-integrity check runs in a process of its own, limited to
+# --xtts_integrity_cpu_threads threads, instead of spreading over every core in between
+# the xtts inference of the generation streams. torch's thread count applies to the
+# whole process, so a separate process is the only way to give the check a budget of
+# its own. It scores with an int8-quantized copy of the model, see
+# load_xtts_integrity_cpu_model, and extra/xtts_integrity_parity.py to compare its
+# scores with the original model's.
+_xtts_integrity_cpu_model = None
 
-        score = invalid_files[0][1]
-        logging.warning(
-            f"Invalid .wav file detected: {file_path} with score {score:.2f}"
-        )
 
-    else:
-        score = valid_files[0][1]
-        logging.info(
-            f"xtts_integrity validity check passed for {file_path} with score {score:.2f}"
-        )
+@lru_cache(maxsize=None)
+def xtts_integrity_cpu_process(cpu_threads: int) -> ProcessPoolExecutor:
+    """The process running the xtts-integrity check on the CPU, started once."""
+    logging.info(
+        f"xtts_integrity - Starting the validity check process with {cpu_threads} CPU threads..."
+    )
+    return ProcessPoolExecutor(
+        max_workers=1,
+        # a forked process would inherit the generating process's CUDA state
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_xtts_integrity_process,
+        initargs=(cpu_threads,),
+    )
 
-    return is_invalid
+
+def init_xtts_integrity_process(cpu_threads: int) -> None:
+    """Set up the process started by xtts_integrity_cpu_process."""
+    global _xtts_integrity_cpu_model
+    import torch
+
+    torch.set_num_threads(cpu_threads)
+    torch.set_num_interop_threads(1)
+    _xtts_integrity_cpu_model = load_xtts_integrity_cpu_model()
+
+
+def score_in_xtts_integrity_process(
+    file_paths: List[str], xtts_integrity_threshold: float
+) -> Tuple[List[tuple], List[tuple]]:
+    """run_xtts_integrity_inference, within the process of xtts_integrity_cpu_process."""
+    import torch
+
+    valid_files, invalid_files = run_xtts_integrity_inference(
+        _xtts_integrity_cpu_model,
+        file_paths,
+        torch.device("cpu"),
+        xtts_integrity_threshold,
+    )
+    # plain floats rather than tensors, to be sent back to the generating process
+    return (
+        [(file_path, float(score)) for file_path, score in valid_files],
+        [(file_path, float(score)) for file_path, score in invalid_files],
+    )
+
+
+def load_xtts_integrity_cpu_model(model_path: str = XTTS_INTEGRITY_MODEL_PATH) -> Any:
+    """
+    Load the xtts-integrity model for the CPU, with its linear and recurrent layers
+    dynamically quantized to int8, which run several times faster than in float32.
+    """
+    import torch
+    from xtts_integrity.infer import load_model
+
+    logging.info("xtts_integrity - Loading model quantized for the CPU...")
+    model = load_model(model_path, torch.device("cpu"))
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear, torch.nn.LSTM, torch.nn.GRU}, dtype=torch.qint8
+    )
 
 
 def is_invalid_wav_file(
@@ -321,7 +702,9 @@ def is_invalid_wav_file(
     tts_text: str,
     use_xtts_integrity: bool = True,
     xtts_integrity_threshold: Optional[float] = None,
-) -> bool:
+    xtts_integrity_on_cpu: bool = False,
+    xtts_integrity_cpu_threads: int = 0,
+) -> Tuple[bool, Optional[float]]:
     """
     Acceptance criteria for a valid file:
     - no periods of silence longer than x seconds
@@ -331,17 +714,18 @@ def is_invalid_wav_file(
     - not materially longer than its other variants
     - no weird artifacts
 
-    Return False if the caller should regenerate this file (ie, try again to make a clean file)
+    Return True if the caller should regenerate this file (ie, try again to make a clean
+    file), along with the xtts-integrity score of the file (None for the simple check)
     """
-    is_invalid = (
-        is_invalid_wav_xtts_integrity(
-            file_path, xtts_integrity_threshold=xtts_integrity_threshold
+    if use_xtts_integrity and xtts_integrity_threshold is not None:
+        return is_invalid_wav_xtts_integrity(
+            file_path,
+            xtts_integrity_threshold=xtts_integrity_threshold,
+            on_cpu=xtts_integrity_on_cpu,
+            cpu_threads=xtts_integrity_cpu_threads,
         )
-        if (use_xtts_integrity and xtts_integrity_threshold is not None)
-        else is_invalid_wav_simple(file_path=file_path, tts_text=tts_text)
-    )
 
-    return is_invalid
+    return is_invalid_wav_simple(file_path=file_path, tts_text=tts_text), None
 
 
 def detect_invalid_audio_duration(file_path: str, tts_text: str) -> bool:
@@ -350,12 +734,9 @@ def detect_invalid_audio_duration(file_path: str, tts_text: str) -> bool:
     the number of characters in the text and a rough estimate of speaking rate.
     """
 
-    # generous estimate of speaking rate in characters per second
-    speaking_rate = 3
-    minimum_expected_duration = 1.0
+    expected_duration = max_expected_audio_duration(tts_text)
 
-    # calculate the expected duration based on the text
-    expected_duration = len(tts_text) / speaking_rate + minimum_expected_duration
+    import torchaudio
 
     # get the actual duration of the audio file
     audio_info = torchaudio.info(file_path)
@@ -370,6 +751,18 @@ def detect_invalid_audio_duration(file_path: str, tts_text: str) -> bool:
     return False
 
 
+def max_expected_audio_duration(tts_text: str) -> float:
+    """
+    The longest duration in seconds that speaking the text should take, based on the
+    number of characters in the text and a rough estimate of speaking rate.
+    """
+    # generous estimate of speaking rate in characters per second
+    speaking_rate = 3
+    minimum_expected_duration = 1.0
+
+    return len(tts_text) / speaking_rate + minimum_expected_duration
+
+
 def detect_invalid_filesize(file_path: str, max_valid_size: int = 1000000) -> bool:
     """
     Returns True if the input audio file is (arbitrarily) too large.
@@ -423,46 +816,117 @@ def detect_excess_silence(file_path: str, silence_threshold: float) -> bool:
 
 @lru_cache(maxsize=None)
 def init_xtts_model(
-    cpu_only: bool = False, use_deepspeed: bool = True, use_xtts_integrity: bool = True
+    cpu_only: bool = False,
+    use_deepspeed: bool = True,
+    use_xtts_integrity: bool = True,
+    xtts_integrity_on_cpu: bool = False,
 ) -> Any:
     """
     Initialize the xtts and xtts-integrity models. This function is cached, so it will only run
-    once, and the model will be reused for all subsequent calls.
+    once, and the model will be reused for all subsequent calls (and by all generation streams).
     """
     logging.info("xtts - Loading model...")
+    start_time = time.time()
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models import xtts as xtts_module
 
-    # this model path is based on the Docker container's filesystem, so there should
-    # be no need to change this unless the corresponding Dockerfile section changes
-    model_path = (
-        "/root/.local/share/tts/tts_models--multilingual--multi-dataset--xtts_v2"
-    )
     config = XttsConfig()
-    config.load_json(f"{model_path}/config.json")
-    xtts_model = Xtts.init_from_config(config)
-    xtts_model.load_checkpoint(
-        config,
-        checkpoint_dir=model_path,
-        use_deepspeed=use_deepspeed,
-    )
+    config.load_json(f"{XTTS_MODEL_PATH}/config.json")
+    xtts_model = xtts_module.Xtts.init_from_config(config)
+    with memory_mapped_checkpoint_loading(xtts_module):
+        xtts_model.load_checkpoint(
+            config,
+            checkpoint_dir=XTTS_MODEL_PATH,
+            use_deepspeed=use_deepspeed,
+        )
     xtts_model.cuda() if not cpu_only else xtts_model.cpu()
 
-    if use_xtts_integrity:
-        init_xtts_integrity_model()
+    peak_memory = peak_process_memory_gb()
+    logging.info(
+        f"xtts - Model loaded in {time.time() - start_time:.1f}s"
+        + ("" if peak_memory is None else f", peak process memory {peak_memory:.2f}GB")
+    )
+
+    # on the CPU, the model is loaded by the first validity check, possibly in a process
+    # of its own (see check_wav_files_xtts_integrity)
+    if (
+        use_xtts_integrity
+        and xtts_integrity_device(xtts_integrity_on_cpu).type == "cuda"
+    ):
+        init_xtts_integrity_model(xtts_integrity_on_cpu)
 
     return xtts_model
 
 
+@contextmanager
+def memory_mapped_checkpoint_loading(xtts_module: Any) -> Any:
+    """
+    Within this context, the xtts model checkpoint is memory-mapped rather than read into
+    the process's own memory. The file is then shared through the OS page cache by all
+    the containers on the host, so it is only read from disk once, and each container
+    avoids holding a second 1.5GB copy of the weights while loading them.
+
+    coqui-tts reads the checkpoint with the `load_fsspec` function of its xtts module,
+    which is swapped for the duration. Checkpoints torch can't memory-map (ie in its
+    legacy format) are read as usual.
+    """
+    original_load_fsspec = getattr(xtts_module, "load_fsspec", None)
+    if original_load_fsspec is None:
+        logging.debug("xtts - Unable to memory-map the checkpoint with this coqui-tts")
+        yield
+        return
+
+    def load_fsspec(path: str, map_location: Any = None, **kwargs) -> Any:
+        import torch
+
+        torch_load_kwargs = {
+            key: value for key, value in kwargs.items() if key != "cache"
+        }
+        try:
+            return torch.load(
+                path, map_location=map_location, mmap=True, **torch_load_kwargs
+            )
+        except (RuntimeError, TypeError, ValueError) as e:
+            logging.warning(
+                f"xtts - Unable to memory-map {path}, reading it instead: {e}"
+            )
+            return original_load_fsspec(path, map_location=map_location, **kwargs)
+
+    xtts_module.load_fsspec = load_fsspec
+    try:
+        yield
+    finally:
+        xtts_module.load_fsspec = original_load_fsspec
+
+
+def peak_process_memory_gb() -> Optional[float]:
+    """The peak resident memory of this process, where the OS reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024**2
+
+
+def xtts_integrity_device(on_cpu: bool = False) -> Any:
+    """The device to run the xtts-integrity model on."""
+    import torch
+
+    return torch.device("cuda" if torch.cuda.is_available() and not on_cpu else "cpu")
+
+
 @lru_cache(maxsize=None)
-def init_xtts_integrity_model() -> Any:
+def init_xtts_integrity_model(on_cpu: bool = False) -> Any:
     """
     Initialize the xtts-integrity model. This function is cached, so it will only run
     once, and the model will be reused for all subsequent calls.
     """
     logging.info("xtts_integrity - Loading model...")
+    from xtts_integrity.infer import load_model
 
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model_path = "/app/xtts-integrity/checkpoints/xtts-integrity-20241112.pth"
-    xtts_integrity_model = load_model(model_path, device)
+    device = xtts_integrity_device(on_cpu)
+    xtts_integrity_model = load_model(XTTS_INTEGRITY_MODEL_PATH, device)
 
     return xtts_integrity_model
 
@@ -486,54 +950,335 @@ def init_xtts_latents(
     return gpt_cond_latent, speaker_embedding
 
 
-def generate_speech(
+# The xtts model keeps some state between the steps of a single inference call, so the
+# threads generating audio (see --generation_streams) take turns running it. What runs
+# in parallel is their post-processing: while one thread runs the model, the others
+# apply audio effects, write files and run validity checks.
+_xtts_inference_lock = threading.Lock()
+
+
+def run_xtts_inference(
+    model: Any,
     text: str,
-    output_path: str,
-    output_filename: str,
-    reference_speaker_wav_paths: List[str],
-    temperature: float = 0.3,
-    speed: float = 1.2,
-    overwrite: bool = False,
-    cpu_only: bool = False,
-    use_deepspeed: bool = True,
-    enable_audio_effects: bool = True,
-    keep_invalid_files: bool = True,
-    max_invalid_attempts: int = 30,
-    use_xtts_integrity=True,
-    xtts_integrity_threshold: Optional[float] = None,
-):
+    gpt_cond_latent: Any,
+    speaker_embedding: Any,
+    temperature: float,
+    speed: float,
+    streaming: bool = True,
+) -> Optional[Any]:
     """
-    Create a .wav file based on the input text and the reference speaker's voice.
+    Run the xtts model on the text, returning the generated audio samples at 24KHz, or
+    None if the generation was abandoned for running longer than the text should take
+    (see max_expected_audio_duration), which is a sure sign of garbled output.
+
+    With `streaming`, the audio is generated in chunks and abandoned as soon as it
+    runs too long. Either way, the GPT is stopped at a token limit derived from the
+    text, slightly past that duration, so a runaway generation is always recognised
+    rather than being cut off to a plausible length.
     """
+    import torch
 
-    # until the output passes the is_invalid_wav_file check, keep trying up to this many times
-    for attempt_idx in range(max_invalid_attempts):
-        was_generated = generate_speech_coqui_xtts(
-            text=text,
-            output_path=output_path,
-            output_filename=output_filename,
-            reference_speaker_wav_paths=reference_speaker_wav_paths,
-            temperature=temperature,
-            speed=speed,
-            overwrite=overwrite,
-            cpu_only=cpu_only,
-            use_deepspeed=use_deepspeed,
-            enable_audio_effects=enable_audio_effects,
-        )
+    max_duration = max_expected_audio_duration(text) + UNTRIMMED_SILENCE_SECONDS
+    max_samples = int(max_duration * 24000)
+    max_new_tokens = math.ceil(
+        (max_duration + 1.0) * speed * XTTS_AUDIO_TOKENS_PER_SECOND
+    )
 
-        file_path = f"{output_path}/{output_filename}.wav"
+    # Most of these are xtts model-specific parameters, and while you are encouraged
+    # to experiment with these values, the values chosen below are known to work well for
+    # many input voices -- and changing them much may greatly increase the chances of garbled
+    # or corrupt output speech. Speed in particular is a tricky parameter to adjust.
+    inference_args = dict(
+        temperature=temperature,
+        top_k=50,
+        top_p=0.8,
+        speed=speed,
+        length_penalty=1.0,
+        repetition_penalty=4.0,
+        enable_text_splitting=False,
+        max_new_tokens=max_new_tokens,
+    )
 
-        if was_generated and is_invalid_wav_file(
-            file_path=file_path,
-            tts_text=text,
-            use_xtts_integrity=use_xtts_integrity,
-            xtts_integrity_threshold=xtts_integrity_threshold,
-        ):
-            # skip the invalid file check if the file already existed from a previous run
-            logging.info(f"Regenerating invalid .wav file: {output_filename}")
+    with _xtts_inference_lock:
+        if streaming:
+            wav_chunks = []
+            sample_count = 0
+            chunk_stream = model.inference_stream(
+                text, "en", gpt_cond_latent, speaker_embedding, **inference_args
+            )
+            try:
+                for wav_chunk in chunk_stream:
+                    sample_count += wav_chunk.shape[-1]
+                    if sample_count > max_samples:
+                        break
+                    wav_chunks.append(wav_chunk)
+            finally:
+                # stops the GPT if the generation is being abandoned
+                chunk_stream.close()
+            wav = torch.cat(wav_chunks, dim=0).cpu().numpy() if wav_chunks else None
+        else:
+            wav = model.inference(
+                text, "en", gpt_cond_latent, speaker_embedding, **inference_args
+            )["wav"]
+            sample_count = len(wav)
 
-            if keep_invalid_files:
-                # keep it around with a modified name
+    if sample_count > max_samples or wav is None:
+        logging.warning(
+            f"Abandoned a runaway generation for text '{text}' after {sample_count / 24000:.2f}s of audio, expected at most {max_duration:.2f}s"
+        )
+        return None
+    return wav
+
+
+def prepare_generation_streams(tts_args: dict, generation_streams: int) -> None:
+    """
+    Load the models and compute the speaker latents once, before the generation streams
+    start sharing them, and report how much GPU memory they use, measured with a short
+    warm-up generation.
+
+    The streams take turns running the xtts model (see _xtts_inference_lock), so the
+    peak is the shared weights plus a single inference, plus a validity check running
+    alongside it when xtts-integrity is on the GPU, whatever the number of streams.
+    """
+    memory_use = measure_generation_memory(tts_args)
+    if memory_use is None:
+        return
+    weights_bytes, inference_bytes, validity_check_bytes, device_properties = memory_use
+    total_bytes = weights_bytes + inference_bytes + validity_check_bytes
+
+    gigabyte = 1024**3
+    logging.info(
+        f"GPU memory: {weights_bytes / gigabyte:.2f}GB for the shared model weights"
+        f"{'' if validity_check_bytes == 0 else ' (including xtts-integrity)'}, "
+        f"up to {inference_bytes / gigabyte:.2f}GB for an inference"
+        f"{'' if validity_check_bytes == 0 else f' and {validity_check_bytes / gigabyte:.2f}GB for a validity check'}, "
+        f"{total_bytes / gigabyte:.2f}GB at the peak with the {generation_streams} "
+        f"streams taking turns running the model, on the {device_properties.total_memory / gigabyte:.1f}GB {device_properties.name}."
+    )
+
+
+def measure_generation_memory(
+    tts_args: dict,
+) -> Optional[Tuple[int, int, int, Any]]:
+    """
+    Load the models and compute the speaker latents, then measure the GPU memory used
+    by the model weights, by a short warm-up generation and by the xtts-integrity check
+    of its audio. Returns the bytes used by each of those (0 for the check when it is
+    not on the GPU) and the GPU's properties, or None when running on the CPU.
+    """
+    model = init_xtts_model(
+        cpu_only=tts_args["cpu_only"],
+        use_deepspeed=tts_args["use_deepspeed"],
+        xtts_integrity_on_cpu=tts_args["xtts_integrity_on_cpu"],
+    )
+    gpt_cond_latent, speaker_embedding = init_xtts_latents(
+        model, tuple(tts_args["reference_speaker_wav_paths"])
+    )
+    if model.device.type != "cuda":
+        return
+    import torch
+
+    torch.cuda.synchronize()
+    weights_bytes = torch.cuda.memory_allocated()
+    torch.cuda.reset_peak_memory_stats()
+    wav = run_xtts_inference(
+        model,
+        "Radio check, loud and clear.",
+        gpt_cond_latent,
+        speaker_embedding,
+        temperature=tts_args["temperature"],
+        speed=tts_args["speed"],
+        streaming=tts_args["streaming_inference"],
+    )
+    inference_bytes = torch.cuda.max_memory_allocated() - weights_bytes
+
+    validity_check_bytes = 0
+    if (
+        wav is not None
+        and tts_args["use_xtts_integrity"]
+        and xtts_integrity_device(tts_args["xtts_integrity_on_cpu"]).type == "cuda"
+    ):
+        import torchaudio
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            wav_path = f"{work_dir}/warm-up.wav"
+            torchaudio.save(wav_path, torch.tensor(wav).unsqueeze(0), 24000)
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+            check_wav_files_xtts_integrity([wav_path], on_cpu=False)
+            validity_check_bytes = torch.cuda.max_memory_allocated() - weights_bytes
+
+    device_properties = torch.cuda.get_device_properties(model.device)
+    return weights_bytes, inference_bytes, validity_check_bytes, device_properties
+
+
+def release_xtts_model() -> None:
+    """Drop the cached xtts model and speaker latents, ie to reload it with DeepSpeed."""
+    init_xtts_latents.cache_clear()
+    init_xtts_model.cache_clear()
+    gc.collect()
+    import torch
+
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def set_cpu_threads(cpu_threads: Optional[int]) -> None:
+    """
+    Set the number of CPU threads torch uses, or restore its default with None. Until
+    torch is imported, this is left to the OMP_NUM_THREADS variable it reads as it
+    starts, so that startup doesn't import it for nothing.
+    """
+    if "torch" not in sys.modules:
+        if cpu_threads is not None:
+            os.environ["OMP_NUM_THREADS"] = str(cpu_threads)
+        return
+    import torch
+
+    torch.set_num_threads(cpu_threads or os.cpu_count() or 1)
+
+
+def generate_speech(
+    text: str,
+    output_path: str,
+    output_filename: str,
+    reference_speaker_wav_paths: List[str],
+    temperature: float = 0.3,
+    speed: float = 1.2,
+    overwrite: bool = False,
+    cpu_only: bool = False,
+    use_deepspeed: bool = True,
+    enable_audio_effects: bool = True,
+    keep_invalid_files: bool = True,
+    max_invalid_attempts: int = 30,
+    adaptive_retries: bool = True,
+    use_xtts_integrity=True,
+    xtts_integrity_threshold: Optional[float] = None,
+    xtts_integrity_on_cpu: bool = False,
+    xtts_integrity_cpu_threads: int = 0,
+    streaming_inference: bool = True,
+    max_chunk_length: int = 0,
+    retry_history: Optional[BuildManifest] = None,
+) -> bool:
+    """
+    Create a .wav file based on the input text and the reference speaker's voice.
+    Returns True if a valid file is in place (newly generated or already existing),
+    False if no valid file could be generated.
+
+    With `adaptive_retries`, the temperature and speed shift after repeated invalid
+    attempts (see retry_settings). The attempts are recorded in `retry_history`, if
+    given, whose earlier records of the phrase decide the settings to start with.
+
+    Texts longer than `max_chunk_length` are generated in chunks, see
+    generate_chunked_speech.
+    """
+    chunks = split_text_into_chunks(text, max_chunk_length)
+    if len(chunks) > 1:
+        return generate_chunked_speech(
+            chunks,
+            output_path,
+            output_filename,
+            overwrite=overwrite,
+            enable_audio_effects=enable_audio_effects,
+            chunk_tts_args={
+                "reference_speaker_wav_paths": reference_speaker_wav_paths,
+                "temperature": temperature,
+                "speed": speed,
+                "cpu_only": cpu_only,
+                "use_deepspeed": use_deepspeed,
+                # the effects are applied once the chunks are stitched together
+                "enable_audio_effects": False,
+                "keep_invalid_files": False,
+                "max_invalid_attempts": max_invalid_attempts,
+                "adaptive_retries": adaptive_retries,
+                "use_xtts_integrity": use_xtts_integrity,
+                "xtts_integrity_threshold": xtts_integrity_threshold,
+                "xtts_integrity_on_cpu": xtts_integrity_on_cpu,
+                "xtts_integrity_cpu_threads": xtts_integrity_cpu_threads,
+                "streaming_inference": streaming_inference,
+            },
+            retry_history=retry_history,
+        )
+
+    text_key = normalize_text(text)
+    history = retry_history.phrase_history(text_key) if retry_history else None
+    failed_attempts = 0
+    scores = []
+    previous_settings = (temperature, speed)
+
+    def record_attempts(attempt_count: int, passing_settings=None) -> None:
+        if retry_history is not None:
+            retry_history.record_phrase_attempts(
+                text_key,
+                attempt_count,
+                failed_attempts,
+                scores,
+                # only phrases which needed retries are started with the settings that worked
+                (
+                    retry_offsets(passing_settings, temperature, speed)
+                    if passing_settings and failed_attempts
+                    else None
+                ),
+            )
+
+    # until the output passes the is_invalid_wav_file check, keep trying up to this many times
+    for attempt_idx in range(max_invalid_attempts):
+        attempt_temperature, attempt_speed = (
+            retry_settings(attempt_idx, temperature, speed, history)
+            if adaptive_retries
+            else (temperature, speed)
+        )
+        if (attempt_temperature, attempt_speed) != previous_settings:
+            logging.info(
+                f"Switching to temperature {attempt_temperature:.2f} and speed {attempt_speed:.2f} for attempt {attempt_idx + 1} at {output_filename}"
+            )
+            previous_settings = (attempt_temperature, attempt_speed)
+
+        was_generated = generate_speech_coqui_xtts(
+            text=text,
+            output_path=output_path,
+            output_filename=output_filename,
+            reference_speaker_wav_paths=reference_speaker_wav_paths,
+            temperature=attempt_temperature,
+            speed=attempt_speed,
+            overwrite=overwrite,
+            cpu_only=cpu_only,
+            use_deepspeed=use_deepspeed,
+            enable_audio_effects=enable_audio_effects,
+            xtts_integrity_on_cpu=xtts_integrity_on_cpu,
+            streaming_inference=streaming_inference,
+        )
+
+        if was_generated is None:
+            # the generation ran far too long and was abandoned, so try again
+            logging.info(f"Regenerating abandoned .wav file: {output_filename}")
+            failed_attempts += 1
+            overwrite = True
+            continue
+
+        if not was_generated:
+            # skip the invalid file check if the file already existed from a previous run
+            return True
+
+        file_path = f"{output_path}/{output_filename}.wav"
+
+        is_invalid, score = is_invalid_wav_file(
+            file_path=file_path,
+            tts_text=text,
+            use_xtts_integrity=use_xtts_integrity,
+            xtts_integrity_threshold=xtts_integrity_threshold,
+            xtts_integrity_on_cpu=xtts_integrity_on_cpu,
+            xtts_integrity_cpu_threads=xtts_integrity_cpu_threads,
+        )
+        if score is not None:
+            scores.append(score)
+
+        if is_invalid:
+            logging.info(f"Regenerating invalid .wav file: {output_filename}")
+            failed_attempts += 1
+
+            if keep_invalid_files:
+                # keep it around with a modified name
                 os.rename(
                     file_path,
                     f"{output_path}/{output_filename}.invalid-{attempt_idx}.wav",
@@ -545,12 +1290,178 @@ def generate_speech(
 
         else:
             # the audio file appears valid, so exit the regeneration loop
-            break
+            record_attempts(attempt_idx + 1, (attempt_temperature, attempt_speed))
+            return True
 
-    else:
-        logging.error(
-            f"Failed to generate a valid .wav file from the text '{text}' after {max_invalid_attempts} attempts: {output_filename}"
+    record_attempts(max_invalid_attempts)
+    logging.error(
+        f"Failed to generate a valid .wav file from the text '{text}' after {max_invalid_attempts} attempts: {output_filename}"
+    )
+    return False
+
+
+def split_text_into_chunks(text: str, max_chunk_length: int) -> List[str]:
+    """
+    Split a text longer than `max_chunk_length` characters at its clause boundaries
+    (after punctuation followed by a space), into chunks as long as possible without
+    exceeding it. Short texts, and long ones without any clause boundaries, are kept
+    whole. Disabled when `max_chunk_length` is 0.
+    """
+    if max_chunk_length <= 0 or len(text) <= max_chunk_length:
+        return [text]
+
+    chunks: List[str] = []
+    for clause in re.split(r"(?<=[.!?;:,])\s+", text.strip()):
+        if chunks and len(chunks[-1]) + 1 + len(clause) <= max_chunk_length:
+            chunks[-1] += f" {clause}"
+        else:
+            chunks.append(clause)
+
+    # a very short clip is more likely to come out garbled than a slightly long one
+    if len(chunks) > 1 and len(chunks[-1]) < MIN_CHUNK_LENGTH:
+        last_chunk = chunks.pop()
+        chunks[-1] += f" {last_chunk}"
+    return chunks
+
+
+def generate_chunked_speech(
+    chunks: List[str],
+    output_path: str,
+    output_filename: str,
+    overwrite: bool,
+    enable_audio_effects: bool,
+    chunk_tts_args: dict,
+    retry_history: Optional[BuildManifest] = None,
+) -> bool:
+    """
+    Create a .wav file from a long text split into chunks (see split_text_into_chunks).
+    The chunks are generated and validated as a batch (see generate_validated_batch),
+    so only the invalid chunks are regenerated, then stitched together and the audio
+    effects applied to the whole. Each chunk keeps its own generation history in
+    `retry_history`. Returns the same as generate_speech.
+    """
+    full_output_filename = f"{output_path}/{output_filename}.wav"
+    if os.path.isfile(full_output_filename) and not overwrite:
+        logging.info(f"File exists, skipping: {full_output_filename}")
+        return True
+
+    logging.info(f"Generating {output_filename} in {len(chunks)} chunks: {chunks}")
+    full_raw_filename = f"{output_path}/{output_filename}.raw.wav"
+    with tempfile.TemporaryDirectory() as chunk_dir:
+        chunk_items = [
+            (f"{chunk_dir}/chunk-{chunk_idx}.wav", chunk)
+            for chunk_idx, chunk in enumerate(chunks)
+        ]
+        failed_items = generate_validated_batch(
+            chunk_items, chunk_tts_args, retry_history=retry_history
         )
+        if failed_items:
+            logging.error(
+                f"Failed to generate a valid .wav file for the chunk '{failed_items[0][1]}' after {chunk_tts_args['max_invalid_attempts']} attempts: {output_filename}"
+            )
+            return False
+
+        os.makedirs(output_path, exist_ok=True)
+        stitch_audio_chunks(
+            [chunk_path for chunk_path, _ in chunk_items], chunks, full_raw_filename
+        )
+
+    if enable_audio_effects:
+        apply_audio_effects(full_raw_filename, full_output_filename)
+        os.remove(full_raw_filename)
+    else:
+        os.replace(full_raw_filename, full_output_filename)
+
+    logging.info(f"Audio file created: {full_output_filename}")
+    return True
+
+
+def stitch_audio_chunks(
+    chunk_paths: List[str], chunk_texts: List[str], output_file: str
+) -> None:
+    """
+    Join the audio of the chunks of a text into one .wav file: each chunk is trimmed of
+    the silence at its ends and brought to the median loudness of the chunks, then the
+    chunks are joined with a short fade and pause in between, longer after a sentence.
+    """
+    import torch
+    import torchaudio
+
+    chunk_wavs = []
+    for chunk_path in chunk_paths:
+        wav, sample_rate = torchaudio.load(chunk_path)
+        chunk_wavs.append(trim_silence(wav.mean(dim=0)))
+
+    levels = [wav.pow(2).mean().sqrt().clamp(min=1e-4) for wav in chunk_wavs]
+    target_level = torch.stack(levels).median()
+    fade_length = int(CHUNK_FADE_SECONDS * sample_rate)
+
+    pieces = []
+    for chunk_idx, (wav, level) in enumerate(zip(chunk_wavs, levels)):
+        wav = (wav * (target_level / level)).clamp(-1.0, 1.0)
+        fade = torch.linspace(0.0, 1.0, min(fade_length, wav.shape[0] // 2))
+        wav[: fade.shape[0]] *= fade
+        wav[wav.shape[0] - fade.shape[0] :] *= fade.flip(0)
+        pieces.append(wav)
+
+        if chunk_idx < len(chunk_wavs) - 1:
+            pause_seconds = (
+                SENTENCE_PAUSE_SECONDS
+                if chunk_texts[chunk_idx].rstrip().endswith((".", "!", "?"))
+                else CLAUSE_PAUSE_SECONDS
+            )
+            pieces.append(torch.zeros(int(pause_seconds * sample_rate)))
+
+    torchaudio.save(output_file, torch.cat(pieces).unsqueeze(0), sample_rate)
+
+
+def trim_silence(wav: Any, threshold: float = 0.02) -> Any:
+    """Trim the samples quieter than `threshold` (relative to the peak) from both ends."""
+    is_voiced = wav.abs() > threshold * wav.abs().max()
+    voiced_indices = is_voiced.nonzero()
+    if voiced_indices.numel() == 0:
+        return wav
+    return wav[voiced_indices[0].item() : voiced_indices[-1].item() + 1]
+
+
+def retry_settings(
+    attempt_idx: int,
+    temperature: float,
+    speed: float,
+    history: Optional[PhraseHistory] = None,
+) -> Tuple[float, float]:
+    """
+    The (temperature, speed) to use for the given attempt at generating a phrase,
+    stepping through RETRY_SETTINGS_STEPS as the attempts keep failing.
+
+    A phrase which needed retries in an earlier run starts from the settings that
+    eventually passed for it, as offsets from the given base settings. One which never
+    passed picks up the steps where it left off, rather than repeating the settings
+    which already failed it.
+    """
+    base_speed = speed
+    step_idx = attempt_idx // ATTEMPTS_PER_RETRY_STEP
+    if history is not None and history.passing_temperature_offset is not None:
+        temperature += history.passing_temperature_offset
+        speed += history.passing_speed_offset
+    elif history is not None:
+        step_idx += history.failures // ATTEMPTS_PER_RETRY_STEP
+
+    temperature_offset, speed_offset = RETRY_SETTINGS_STEPS[
+        step_idx % len(RETRY_SETTINGS_STEPS)
+    ]
+    # keep within the range known to produce clean speech with the xtts model
+    return (
+        min(max(temperature + temperature_offset, 0.1), 0.75),
+        min(max(speed + speed_offset, 0.9), base_speed),
+    )
+
+
+def retry_offsets(
+    settings: Tuple[float, float], temperature: float, speed: float
+) -> Tuple[float, float]:
+    """The (temperature, speed) offsets of retry settings from the base settings."""
+    return (settings[0] - temperature, settings[1] - speed)
 
 
 def generate_speech_coqui_xtts(
@@ -564,11 +1475,14 @@ def generate_speech_coqui_xtts(
     cpu_only: bool = False,
     use_deepspeed: bool = True,
     enable_audio_effects: bool = True,
-) -> bool:
+    xtts_integrity_on_cpu: bool = False,
+    streaming_inference: bool = True,
+) -> Optional[bool]:
     """
     Generate speech using the Coqui TTS framework and the multilingual xtts model.
     See README.md for more details on Coqui.
-    Returns True if the file was generated, False if it already existed and was skipped.
+    Returns True if the file was generated, False if it already existed and was skipped,
+    None if the generation ran too long and was abandoned (see run_xtts_inference).
     # TODO: refactor, the file existence check should not be in this function
     """
     full_raw_filename = f"{output_path}/{output_filename}.raw.wav"
@@ -587,31 +1501,31 @@ def generate_speech_coqui_xtts(
 
     # get a reference to the model and the speaker embeddings
     # these two calls are cached and only run the first time
-    model = init_xtts_model(cpu_only=cpu_only, use_deepspeed=use_deepspeed)
+    model = init_xtts_model(
+        cpu_only=cpu_only,
+        use_deepspeed=use_deepspeed,
+        xtts_integrity_on_cpu=xtts_integrity_on_cpu,
+    )
     gpt_cond_latent, speaker_embedding = init_xtts_latents(
         model, tuple(reference_speaker_wav_paths)
     )
 
-    # Most of these are xtts model-specific parameters, and while you are encouraged
-    # to experiment with these values, the values chosen below are known to work well for
-    # many input voices -- and changing them much may greatly increase the chances of garbled
-    # or corrupt output speech. Speed in particular is a tricky parameter to adjust.
-    out = model.inference(
+    wav = run_xtts_inference(
+        model,
         text,
-        "en",
         gpt_cond_latent,
         speaker_embedding,
         temperature=temperature,
-        top_k=50,
-        top_p=0.8,
         speed=speed,
-        length_penalty=1.0,
-        repetition_penalty=4.0,
-        enable_text_splitting=False,
+        streaming=streaming_inference,
     )
+    if wav is None:
+        return None
+    import torch
+    import torchaudio
 
     # save the audio as 24KHz 32-bit PCM wav file named xxx.raw.wav
-    torchaudio.save(full_raw_filename, torch.tensor(out["wav"]).unsqueeze(0), 24000)
+    torchaudio.save(full_raw_filename, torch.tensor(wav).unsqueeze(0), 24000)
 
     if enable_audio_effects:
         # apply audio effects to the generated audio file, creating a new file with
@@ -637,11 +1551,18 @@ class ReplacementRule:
 
 def prepare_replacement_rules(args: argparse.Namespace) -> None:
     """Prepare text replacement rules"""
-    args.replacement_rules = (
-        []
-        if args.disable_text_replacements
-        else generate_replacement_rules(args.your_name)
-    )
+    if args.disable_text_replacements:
+        args.replacement_rules = []
+    elif args.replacement_rules_file:
+        args.replacement_rules = load_replacement_rules(args.replacement_rules_file)
+    else:
+        args.replacement_rules = generate_replacement_rules(args.your_name)
+
+
+def load_replacement_rules(rules_file_path: str) -> List[ReplacementRule]:
+    """Read text replacement rules from a JSON file, see --replacement_rules_file."""
+    with open(rules_file_path, encoding="utf-8") as f:
+        return [ReplacementRule(**rule) for rule in json.load(f)]
 
 
 def generate_replacement_rules(your_name: str) -> List[ReplacementRule]:
@@ -679,7 +1600,9 @@ def generate_replacement_rules(your_name: str) -> List[ReplacementRule]:
     return replacement_rules
 
 
-def apply_replacements(text: str, rules: List[ReplacementRule]) -> str:
+def apply_replacements(
+    text: str, rules: List[ReplacementRule], rng: Optional[random.Random] = None
+) -> str:
     """
     Apply the replacement pattern specified by the list of ReplacementRule objects
     to the input text, producing modified output text. This is used for things like
@@ -689,9 +1612,12 @@ def apply_replacements(text: str, rules: List[ReplacementRule]) -> str:
     For example, if you want to replace all occurrences of "mate" with "buddy", it
     may be more convenient to do so with a ReplacementRule rather than search/replace
     directly in the audio file inventory.
+
+    Pass a seeded `rng` to make the random choices repeatable.
     """
+    rng = rng or random.Random()
     for rule in rules:
-        if re.search(rule.regex, text) and random.random() <= rule.probability:
+        if re.search(rule.regex, text) and rng.random() <= rule.probability:
             logging.info(
                 f"Replacing '{rule.regex}' with '{rule.replacement}' in '{text}'"
             )
@@ -704,6 +1630,19 @@ def prepare_arguments() -> argparse.Namespace:
     """Parse command-line arguments and prepare any derived values."""
     args = parse_arguments()
     args.voicepack_base_dir = f"{args.output_audio_dir}/{args.voice_name}"
+    args.autotune_file = args.autotune_file or f"{args.output_audio_dir}/.autotune.json"
+    # the coordinator generates no audio itself
+    if not (
+        args.autotune
+        or args.disable_autotuned_settings
+        or args.coordinator_port is not None
+    ):
+        apply_saved_tuned_settings(args)
+    if args.generation_streams is None:
+        args.generation_streams = 1
+    args.disable_deepspeed = bool(args.disable_deepspeed)
+    if args.cpu_threads is not None:
+        set_cpu_threads(args.cpu_threads)
     reference_speaker_wav_paths = glob.glob(
         f"{args.baseline_audio_dir}/{args.voice_name}/*.wav"
     )
@@ -717,10 +1656,19 @@ def prepare_arguments() -> argparse.Namespace:
         "use_deepspeed": (not args.disable_deepspeed) and (not args.cpu_only),
         "keep_invalid_files": args.keep_invalid_files,
         "max_invalid_attempts": args.max_invalid_attempts,
+        "adaptive_retries": not args.disable_adaptive_retries,
         "use_xtts_integrity": True if not args.simple_validity_check else False,
         "xtts_integrity_threshold": args.xtts_integrity_threshold,
+        "xtts_integrity_on_cpu": args.xtts_integrity_on_cpu,
+        "xtts_integrity_cpu_threads": args.xtts_integrity_cpu_threads,
+        "streaming_inference": not args.disable_streaming_inference,
+        "max_chunk_length": args.max_chunk_length,
     }
 
+    if args.coordinator_url:
+        # workers use the baseline recordings and settings of the coordinator
+        return args
+
     # verify the baseline recordings were found
     if len(reference_speaker_wav_paths) == 0:
         raise FileNotFoundError(
@@ -733,6 +1681,18 @@ def prepare_arguments() -> argparse.Namespace:
             f"Baseline folder contents: {os.listdir(args.baseline_audio_dir)}\n",
         )
 
+    # everything besides the text which determines how a generated file sounds, so that
+    # rebuilds regenerate the files affected by a change to any of it (the temperature
+    # is left out since it is picked at random for each run)
+    args.fingerprint_settings = {
+        "baseline": hash_files(reference_speaker_wav_paths),
+        "speed": args.xtts_speed,
+        "audio_effects": None if args.disable_audio_effects else AUDIO_EFFECTS,
+        "model": hash_text_file(f"{XTTS_MODEL_PATH}/config.json") or XTTS_MODEL_PATH,
+    }
+    # kept outside the voice pack folder so it is not shipped with the voice pack
+    args.manifest_path = f"{args.output_audio_dir}/.{args.voice_name}.manifest.sqlite"
+
     return args
 
 
@@ -759,7 +1719,13 @@ def write_attribution_file(args: argparse.Namespace) -> None:
     # Add the rest of the args to the end in a key/value format
     attribution_text += "Configuration:\n\n"
     for key, value in vars(args).items():
-        if key != "tts_args":  # only include user-specified arguments
+        # only include user-specified arguments
+        if key not in (
+            "tts_args",
+            "fingerprint_settings",
+            "manifest_path",
+            "autotune_file",
+        ):
             attribution_text += f"{key}: {value}\n"
 
     with open(attribution_filename, "w", encoding="utf-8") as f:
@@ -791,18 +1757,30 @@ def write_installation_instructions(args: argparse.Namespace) -> None:
     logging.info(f"Installation instructions written to {instructions_filename}.")
 
 
-def process_phrase_inventory(args: argparse.Namespace) -> None:
-    """Load and process the phrase inventory, generating audio files"""
-    entries = parse_phrase_inventory(args.phrase_inventory)
+def process_phrase_inventory(
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+    watcher: Optional["InventoryWatcher"] = None,
+) -> None:
+    """
+    Load and process the phrase inventory, generating audio files. With a `watcher`,
+    rows edited in the meantime are regenerated first, ahead of the remaining rows.
+    """
+    inventory = PhraseInventory.load(args.phrase_inventory)
 
-    if not entries:
+    if not inventory:
         logging.error("No entries found in the phrase inventory. Exiting.")
         return
 
     prepare_replacement_rules(args)
+    for entry in inventory:
+        filter_phrase_entry(entry, args)
+    if watcher is not None:
+        watcher.track(inventory)
 
-    if not args.original_inventory_order:
-        random.shuffle(entries)
+    # order a copy, keeping the inventory itself in its original order
+    entries = order_phrase_entries(inventory, args)
+    work_items = phrase_work_items(entries, args)
 
     # Expecting this many .wav files at the end (NOT including radio checks and other special files)
     total_wav_files = len(entries) * (1 + args.variation_count)
@@ -817,31 +1795,61 @@ def process_phrase_inventory(args: argparse.Namespace) -> None:
     previous_wav_count = initial_wav_count
     previous_time = start_time
 
-    for entry_idx, entry in enumerate(entries, 1):
-        logging.info(
-            f"Considering phrase {entry_idx} - '{entry.subtitle}' -> '{entry.text_for_tts}'"
-        )
+    # each of the --generation_streams threads works on one entry at a time; the files
+    # each is writing are kept so the watcher can wait for them before regenerating
+    in_flight: Dict[Future, List[str]] = {}
+    is_complete = True
+    with ThreadPoolExecutor(max_workers=args.generation_streams) as executor:
+        for item_idx, (entry, variant_ids) in enumerate(work_items, 1):
+            in_flight = wait_for_free_stream(in_flight, args.generation_streams)
+
+            if (
+                args.time_budget is not None
+                and time.time() - start_time >= args.time_budget * 60
+            ):
+                logging.warning(
+                    f"The time budget of {args.time_budget} minutes is used up, leaving {len(work_items) - item_idx + 1} of {len(work_items)} phrases (or their extra variants) for a later run."
+                )
+                is_complete = False
+                break
 
-        process_phrase_entry(entry, args)
+            if watcher is not None:
+                regenerate_changed_entries(watcher, args, manifest, in_flight)
+                # the row may have been edited or removed since the run started
+                entry = watcher.latest(entry)
+                if entry is None:
+                    continue
 
-        # Recount .wav files if it's time to update progress
-        current_time = time.time()
-        elapsed_since_last_update = current_time - last_update_time
+            logging.info(
+                f"Considering phrase {item_idx} - '{entry.subtitle}' -> '{entry.text_for_tts}'"
+            )
 
-        if elapsed_since_last_update >= next_update_interval:
-            current_wav_count = count_wav_files_in_tree(voicepack_voice_dir)
-            log_progress_string(
-                current_total=current_wav_count,
-                total=total_wav_files,
-                start_time=start_time,
-                current_time=current_time,
-                previous_total=previous_wav_count,
-                previous_time=previous_time,
-                initial_total=initial_wav_count,
+            future = executor.submit(
+                process_phrase_entry, entry, args, manifest, variant_ids
             )
-            last_update_time = current_time
-            previous_wav_count = current_wav_count
-            previous_time = current_time
+            output_keys = phrase_output_keys(entry, args)
+            in_flight[future] = [output_keys[variant_id] for variant_id in variant_ids]
+
+            # Recount .wav files if it's time to update progress
+            current_time = time.time()
+            elapsed_since_last_update = current_time - last_update_time
+
+            if elapsed_since_last_update >= next_update_interval:
+                current_wav_count = count_wav_files_in_tree(voicepack_voice_dir)
+                log_progress_string(
+                    current_total=current_wav_count,
+                    total=total_wav_files,
+                    start_time=start_time,
+                    current_time=current_time,
+                    previous_total=previous_wav_count,
+                    previous_time=previous_time,
+                    initial_total=initial_wav_count,
+                )
+                last_update_time = current_time
+                previous_wav_count = current_wav_count
+                previous_time = current_time
+
+        wait_for_free_stream(in_flight, 1)
 
     # Final progress update after processing all entries
     current_time = time.time()
@@ -856,33 +1864,384 @@ def process_phrase_inventory(args: argparse.Namespace) -> None:
         initial_total=initial_wav_count,
     )
 
-    logging.info(f"All entries in {args.phrase_inventory} have been generated.")
-    generate_subtitle_files(entries, args)
+    if is_complete:
+        logging.info(f"All entries in {args.phrase_inventory} have been generated.")
+
+    if watcher is not None:
+        inventory = watcher.inventory
+    finish_phrase_inventory(inventory, args, manifest)
+
+
+def load_priority_weights(priority_weights_file: str) -> Dict[str, float]:
+    """Read inventory priorities from a JSON file, see --priority_weights_file."""
+    with open(priority_weights_file, encoding="utf-8") as f:
+        return {pattern: float(weight) for pattern, weight in json.load(f).items()}
+
+
+def phrase_priority(
+    entry: CrewChiefAudioFile, priority_weights: Dict[str, float]
+) -> float:
+    """The weight of the first pattern matching the row, see DEFAULT_PRIORITY_WEIGHTS."""
+    row_path = f"{entry.audio_path}/{entry.audio_filename}"
+    for pattern, weight in priority_weights.items():
+        if fnmatch.fnmatchcase(row_path, pattern):
+            return weight
+    return DEFAULT_PRIORITY_WEIGHT
+
+
+def order_phrase_entries(
+    inventory: PhraseInventory, args: argparse.Namespace
+) -> List[CrewChiefAudioFile]:
+    """
+    The inventory entries in the order to generate them: highest priority first, and in
+    random order within each priority, so containers running in parallel still work on
+    different rows. With --original_inventory_order, simply in inventory order.
+    """
+    entries = list(inventory)
+    if args.original_inventory_order:
+        return entries
+
+    priority_weights = (
+        load_priority_weights(args.priority_weights_file)
+        if args.priority_weights_file
+        else DEFAULT_PRIORITY_WEIGHTS
+    )
+    random.shuffle(entries)
+    # the sort is stable, keeping the shuffled order within each priority
+    entries.sort(
+        key=lambda entry: phrase_priority(entry, priority_weights), reverse=True
+    )
+    return entries
+
+
+def phrase_work_items(
+    entries: List[CrewChiefAudioFile], args: argparse.Namespace
+) -> List[Tuple[CrewChiefAudioFile, range]]:
+    """
+    Split the generation of the entries into (entry, variant ids) items: the first
+    variant of every entry, followed by the extra variants of every entry, so the whole
+    inventory is covered as early as possible.
+    """
+    work_items = [(entry, range(0, 1)) for entry in entries]
+    if args.variation_count > 0:
+        work_items += [(entry, range(1, args.variation_count + 1)) for entry in entries]
+    return work_items
+
+
+def wait_for_free_stream(
+    in_flight: Dict[Future, List[str]], generation_streams: int
+) -> Dict[Future, List[str]]:
+    """
+    Wait until fewer than `generation_streams` futures are in flight, raising any error
+    from those finished, and return the ones still in flight with their output files.
+    """
+    while len(in_flight) >= generation_streams:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            future.result()
+        in_flight = {
+            future: output_keys
+            for future, output_keys in in_flight.items()
+            if future not in done
+        }
+    return in_flight
+
+
+def wait_for_output_keys(in_flight: Dict[Future, List[str]], output_keys: set) -> None:
+    """
+    Wait for the futures in flight writing any of the `output_keys`, raising any error
+    from them, and remove them from `in_flight`.
+    """
+    writing = [
+        future
+        for future, future_output_keys in in_flight.items()
+        if not output_keys.isdisjoint(future_output_keys)
+    ]
+    wait(writing)
+    for future in writing:
+        del in_flight[future]
+        future.result()
+
+
+def finish_phrase_inventory(
+    inventory: PhraseInventory, args: argparse.Namespace, manifest: BuildManifest
+) -> None:
+    """
+    List the audio files of phrases no longer in the inventory, deleting them with
+    --remove_orphaned_files, and write subtitles.
+    """
+    expected_outputs = {
+        output_key
+        for entry in inventory
+        for output_key in phrase_output_keys(entry, args)
+    }
+    orphan_count = remove_orphaned_outputs(
+        manifest,
+        args.voicepack_base_dir,
+        "phrase",
+        expected_outputs,
+        dry_run=not args.remove_orphaned_files,
+    )
+    if orphan_count and args.remove_orphaned_files:
+        logging.info(
+            f"Deleted {orphan_count} audio files no longer in {args.phrase_inventory}."
+        )
+    elif orphan_count:
+        logging.info(
+            f"Kept {orphan_count} audio files no longer in {args.phrase_inventory}, use --remove_orphaned_files to delete them."
+        )
+
+    generate_subtitle_files(inventory, args, manifest)
 
 
-def process_phrase_entry(entry: CrewChiefAudioFile, args: argparse.Namespace) -> None:
-    """Process a single phrase inventory entry"""
+class InventoryWatcher:
+    """
+    Watches the phrase inventory file (and --replacement_rules_file, if given) for
+    changes, for --watch mode. Each time they change, the inventory is reloaded and
+    compared with the previous version, to find the rows whose filtered text or
+    subtitle was edited, or which were added.
+
+    Checking for changes only costs a stat() call per file, so it is done before every
+    phrase generated, which lets edited rows jump ahead of the remaining work.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.inventory = PhraseInventory([])
+        self._entries_by_key: Dict[Tuple[str, str], CrewChiefAudioFile] = {}
+        # taken before the inventory is first loaded, so no edit can be missed
+        self._file_versions = self._watched_file_versions()
+
+    def _watched_file_versions(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        watched_files = [self.args.phrase_inventory]
+        if self.args.replacement_rules_file:
+            watched_files.append(self.args.replacement_rules_file)
+
+        file_versions: Dict[str, Optional[Tuple[int, int]]] = {}
+        for file_path in watched_files:
+            try:
+                stat = os.stat(file_path)
+                file_versions[file_path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                # ie briefly missing while an editor saves it
+                file_versions[file_path] = None
+        return file_versions
+
+    def track(self, inventory: PhraseInventory) -> None:
+        """Start from an already loaded (and filtered) inventory."""
+        self.inventory = inventory
+        self._entries_by_key = {
+            (entry.audio_path, entry.audio_filename): entry for entry in inventory
+        }
+
+    def latest(self, entry: CrewChiefAudioFile) -> Optional[CrewChiefAudioFile]:
+        """The current version of an inventory row, or None if it has been removed."""
+        return self._entries_by_key.get((entry.audio_path, entry.audio_filename))
+
+    def poll(self) -> List[CrewChiefAudioFile]:
+        """Return the rows added or changed since the last call, in inventory order."""
+        file_versions = self._watched_file_versions()
+        if file_versions == self._file_versions:
+            return []
+        self._file_versions = file_versions
+
+        try:
+            inventory = PhraseInventory.load(self.args.phrase_inventory)
+            prepare_replacement_rules(self.args)
+            for entry in inventory:
+                filter_phrase_entry(entry, self.args)
+        except (OSError, ValueError, TypeError, re.error, csv.Error) as e:
+            # ie a typo in a rule, or a file saved half-way, which is picked up again
+            # once the file is saved next
+            logging.warning(f"Unable to reload the changed files, ignoring: {e}")
+            return []
+
+        changed_entries = []
+        for entry in inventory:
+            previous_entry = self.latest(entry)
+            if (
+                previous_entry is None
+                or previous_entry.text_for_tts_filtered != entry.text_for_tts_filtered
+                or previous_entry.subtitle_filtered != entry.subtitle_filtered
+            ):
+                changed_entries.append(entry)
+
+        self.track(inventory)
+        return changed_entries
+
+
+def regenerate_changed_entries(
+    watcher: InventoryWatcher,
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+    in_flight: Optional[Dict[Future, List[str]]] = None,
+) -> bool:
+    """
+    Regenerate the rows changed since the watched files were last checked, logging
+    where each new audio file was saved. Returns True if anything changed.
+
+    The futures in flight writing the files of changed or removed rows are waited for
+    first, so they can't overwrite a regenerated file with the old text, or recreate
+    an orphaned one, and record their outdated fingerprint in the manifest.
+    """
+    changed_entries = watcher.poll()
+    if not changed_entries:
+        return False
+
+    if in_flight:
+        expected_outputs = {
+            output_key
+            for entry in watcher.inventory
+            for output_key in phrase_output_keys(entry, args)
+        }
+        affected_outputs = {
+            output_key
+            for entry in changed_entries
+            for output_key in phrase_output_keys(entry, args)
+        } | {
+            output_key
+            for output_keys in in_flight.values()
+            for output_key in output_keys
+            if output_key not in expected_outputs
+        }
+        wait_for_output_keys(in_flight, affected_outputs)
+
+    logging.info(f"Regenerating {len(changed_entries)} changed phrases...")
+    for entry in changed_entries:
+        process_phrase_entry(entry, args, manifest)
+        for output_key in phrase_output_keys(entry, args):
+            logging.info(
+                f"Changed phrase '{entry.text_for_tts_filtered}' is ready at {args.voicepack_base_dir}{output_key}"
+            )
+
+    # rows may have been removed as well, and changed subtitles need writing
+    finish_phrase_inventory(watcher.inventory, args, manifest)
+    return True
+
+
+def watch_phrase_inventory(
+    watcher: InventoryWatcher, args: argparse.Namespace, manifest: BuildManifest
+) -> None:
+    """Regenerate edited phrases as soon as they change, until interrupted."""
+    logging.info(
+        f"Watching {args.phrase_inventory} for changes, press Ctrl+C to stop..."
+    )
+    try:
+        while True:
+            if not regenerate_changed_entries(watcher, args, manifest):
+                time.sleep(args.watch_interval)
+    except KeyboardInterrupt:
+        logging.info("Stopped watching for changes.")
+
+
+def filter_phrase_entry(entry: CrewChiefAudioFile, args: argparse.Namespace) -> None:
+    """Fill in the *_filtered fields of an entry, applying text replacements and your name."""
+    # seed the random replacements from the entry itself, so that each run produces the
+    # same text and rebuilds don't mistake the phrase for an edited one
+    rng = random.Random(f"{entry.audio_path}/{entry.audio_filename}")
     entry.text_for_tts_filtered = (
         entry.text_for_tts
         if args.disable_text_replacements
-        else apply_replacements(entry.text_for_tts, args.replacement_rules)
+        else apply_replacements(entry.text_for_tts, args.replacement_rules, rng)
     ).replace("YOUR_NAME", args.your_name)
 
     entry.audio_path_filtered = entry.audio_path.replace("YOUR_NAME", args.your_name)
     entry.subtitle_filtered = entry.subtitle.replace("YOUR_NAME", args.your_name)
 
-    for variant_id in range(0, args.variation_count + 1):
-        variant_filename = generate_variant_filename(
-            entry, variant_id, args.variation_count
-        )
-        generate_speech(
-            **args.tts_args,
+
+def process_phrase_entry(
+    entry: CrewChiefAudioFile,
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+    variant_ids: Optional[range] = None,
+) -> None:
+    """Process a single phrase inventory entry, optionally only some of its variants"""
+    output_keys = phrase_output_keys(entry, args)
+    if variant_ids is not None:
+        output_keys = [output_keys[variant_id] for variant_id in variant_ids]
+    for output_key in output_keys:
+        generate_tracked_speech(
             text=entry.text_for_tts_filtered,
-            output_path=f"{args.voicepack_base_dir}{entry.audio_path_filtered}",
-            output_filename=variant_filename,
+            output_key=output_key,
+            kind="phrase",
+            args=args,
+            manifest=manifest,
         )
 
 
+def phrase_output_keys(
+    entry: CrewChiefAudioFile, args: argparse.Namespace
+) -> List[str]:
+    """Paths of the .wav files for each variant of a phrase, within the voice pack folder."""
+    return [
+        f"{entry.audio_path_filtered}/{generate_variant_filename(entry, variant_id, args.variation_count)}.wav"
+        for variant_id in range(0, args.variation_count + 1)
+    ]
+
+
+def generate_tracked_speech(
+    text: str,
+    output_key: str,
+    kind: str,
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+) -> None:
+    """
+    Generate the .wav file at `output_key` (a path within the voice pack folder) with
+    generate_speech, recording its inputs in the build manifest. An existing file is
+    regenerated if it was made from different inputs, ie the text was edited or the
+    baseline recordings, speed, audio effects or model changed since.
+    """
+    output_fingerprint = fingerprint(text, args.fingerprint_settings)
+    is_outdated = is_output_outdated(
+        output_key, kind, output_fingerprint, args, manifest
+    )
+
+    output_path, output_filename = os.path.split(
+        f"{args.voicepack_base_dir}{output_key}"
+    )
+    is_valid = generate_speech(
+        **{**args.tts_args, "overwrite": args.overwrite or is_outdated},
+        text=text,
+        output_path=output_path,
+        output_filename=output_filename.removesuffix(".wav"),
+        retry_history=manifest,
+    )
+    if is_valid and manifest.get(output_key) != output_fingerprint:
+        manifest.put(output_key, kind, output_fingerprint)
+
+
+def is_output_outdated(
+    output_key: str,
+    kind: str,
+    output_fingerprint: str,
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+) -> bool:
+    """
+    Return True if the file at `output_key` exists but was generated from different
+    inputs than `output_fingerprint` according to the build manifest.
+    """
+    file_path = f"{args.voicepack_base_dir}{output_key}"
+    if not os.path.isfile(file_path):
+        return False
+
+    recorded_fingerprint = manifest.get(output_key)
+    if recorded_fingerprint is None and not args.overwrite:
+        # generated before the manifest was introduced, so assume it is up to date
+        # (run once with --overwrite to rebuild these too)
+        logging.info(f"File exists, recording it in the build manifest: {file_path}")
+        manifest.put(output_key, kind, output_fingerprint)
+        return False
+
+    if recorded_fingerprint != output_fingerprint:
+        logging.info(
+            f"Inputs changed since the file was generated, regenerating: {file_path}"
+        )
+        return True
+    return False
+
+
 def generate_variant_filename(
     entry: CrewChiefAudioFile, variant_id: int, variation_count: int
 ) -> str:
@@ -895,66 +2254,124 @@ def generate_variant_filename(
 
 
 def generate_subtitle_files(
-    entries: List[CrewChiefAudioFile], args: argparse.Namespace
+    inventory: PhraseInventory, args: argparse.Namespace, manifest: BuildManifest
 ) -> None:
-    """Generate subtitles.csv files for each subfolder."""
-    subtitle_entries = group_entries_by_path(entries)
+    """
+    Generate subtitles.csv files for each subfolder, only rewriting those whose contents
+    changed, and delete those of folders no longer in the inventory.
+    """
+    subtitle_entries = group_entries_by_path(inventory)
 
+    expected_outputs = set()
     for subtitle_path, entry_details in subtitle_entries.items():
-        subtitle_filename = f"{args.voicepack_base_dir}{subtitle_path}/subtitles.csv"
-
-        if not args.overwrite and os.path.isfile(subtitle_filename):
-            logging.debug(f"Skipping subtitles.csv since it exists at {subtitle_path}")
+        output_key = f"{subtitle_path}/subtitles.csv"
+        expected_outputs.add(output_key)
+        subtitle_filename = f"{args.voicepack_base_dir}{output_key}"
+        subtitle_text = subtitle_file_text(entry_details, args.variation_count)
+
+        if read_text_file(subtitle_filename) == subtitle_text:
+            logging.debug(
+                f"Skipping subtitles.csv since it is unchanged at {subtitle_path}"
+            )
         else:
-            logging.debug(f"Creating subtitles.csv for {subtitle_path}")
-            write_subtitle_file(subtitle_filename, entry_details, args.variation_count)
+            logging.debug(f"Writing subtitles.csv for {subtitle_path}")
+            write_subtitle_file(subtitle_filename, subtitle_text)
+
+        output_fingerprint = fingerprint(subtitle_text)
+        if manifest.get(output_key) != output_fingerprint:
+            manifest.put(output_key, "subtitles", output_fingerprint)
+
+    remove_orphaned_outputs(
+        manifest,
+        args.voicepack_base_dir,
+        "subtitles",
+        expected_outputs,
+        dry_run=not args.remove_orphaned_files,
+    )
 
 
-def group_entries_by_path(entries: List[CrewChiefAudioFile]) -> dict:
-    """Group together phrase_inventory.csv rows from the same folder."""
+def group_entries_by_path(inventory: PhraseInventory) -> dict:
+    """
+    Group together phrase_inventory.csv rows from the same folder, in inventory order,
+    keyed by the folder path after text replacements.
+    """
     subtitle_entries: dict[Any, Any] = {}
-    for entry in entries:
-        if entry.audio_path_filtered not in subtitle_entries:
-            subtitle_entries[entry.audio_path_filtered] = []
-        subtitle_entries[entry.audio_path_filtered].append(
-            (entry.audio_filename, entry.subtitle_filtered)
+    for folder_entries in inventory.by_audio_path.values():
+        # every entry of a folder has the same filtered path
+        subtitle_entries.setdefault(folder_entries[0].audio_path_filtered, []).extend(
+            (entry.audio_filename, entry.subtitle_filtered) for entry in folder_entries
         )
     return subtitle_entries
 
 
-def write_subtitle_file(
-    filename: str, entry_details: List[tuple], variation_count: int
-) -> None:
-    """Create a subtitles.csv file at the given path, using the existing CrewChief convention."""
-    with open(filename, "w") as f:
-        for audio_filename, subtitle in entry_details:
-            for variant_id in range(0, variation_count + 1):
-                variant_tag = chr(variant_id + ord("a"))
-                f.write(f'{audio_filename}-{variant_tag}.wav,"{subtitle}"\n')
+def subtitle_file_text(entry_details: List[tuple], variation_count: int) -> str:
+    """Contents of a subtitles.csv file, using the existing CrewChief convention."""
+    lines = []
+    for audio_filename, subtitle in entry_details:
+        for variant_id in range(0, variation_count + 1):
+            variant_tag = chr(variant_id + ord("a"))
+            lines.append(f'{audio_filename}-{variant_tag}.wav,"{subtitle}"\n')
+    return "".join(lines)
 
 
-def generate_radio_checks(args: argparse.Namespace) -> None:
+def read_text_file(filename: str) -> Optional[str]:
+    """Return the contents of a text file, or None if it does not exist."""
+    try:
+        with open(filename, newline="") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_subtitle_file(filename: str, subtitle_text: str) -> None:
+    """Create a subtitles.csv file at the given path."""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w", newline="") as f:
+        f.write(subtitle_text)
+
+
+def generate_radio_checks(args: argparse.Namespace, manifest: BuildManifest) -> None:
     """Generate the radio check audio clips"""
     logging.info("Generating radio check audio clips...")
-    voice_name_tts = args.voice_name_tts or args.voice_name
-    radio_check_phrases = (
-        [args.radio_check_tts_text]
-        if args.radio_check_tts_text
-        else get_radio_check_phrases(voice_name_tts)
-    )
+    radio_checks = radio_check_outputs(args)
 
-    for radio_check_idx, radio_check_phrase in enumerate(radio_check_phrases, 1):
+    for radio_check_idx, (output_key, radio_check_phrase) in enumerate(
+        radio_checks.items(), 1
+    ):
         logging.info(
             f"Considering radio check audio clip {radio_check_idx} - {radio_check_phrase}..."
         )
-        generate_speech(
-            **args.tts_args,
+        generate_tracked_speech(
             text=radio_check_phrase,
-            output_path=f"{args.voicepack_base_dir}/radio_check_{args.voice_name}/test",
-            output_filename=f"{radio_check_idx}",
+            output_key=output_key,
+            kind="radio_check",
+            args=args,
+            manifest=manifest,
         )
     logging.info("All radio check audio clips have been generated.")
 
+    remove_orphaned_outputs(
+        manifest,
+        args.voicepack_base_dir,
+        "radio_check",
+        set(radio_checks),
+        dry_run=not args.remove_orphaned_files,
+    )
+
+
+def radio_check_outputs(args: argparse.Namespace) -> Dict[str, str]:
+    """The path within the voice pack folder and text of each radio check audio clip."""
+    voice_name_tts = args.voice_name_tts or args.voice_name
+    radio_check_phrases = (
+        [args.radio_check_tts_text]
+        if args.radio_check_tts_text
+        else get_radio_check_phrases(voice_name_tts)
+    )
+    return {
+        f"/radio_check_{args.voice_name}/test/{radio_check_idx}.wav": radio_check_phrase
+        for radio_check_idx, radio_check_phrase in enumerate(radio_check_phrases, 1)
+    }
+
 
 def get_radio_check_phrases(voice_name_tts: str) -> List[str]:
     """Return a list of radio check phrases"""
@@ -983,23 +2400,600 @@ def get_radio_check_phrases(voice_name_tts: str) -> List[str]:
     ]
 
 
+def generate_driver_names(args: argparse.Namespace, manifest: BuildManifest) -> None:
+    """
+    Generate the driver_names folder, in batches of --driver_names_batch_size clips
+    (see generate_speech_batch), skipping the clips already generated from the same
+    inputs by an earlier run.
+    """
+    logging.info("Generating driver name audio clips...")
+    driver_names = driver_name_outputs(args)
+    pending = [
+        (output_key, text)
+        for output_key, text in driver_names.items()
+        if needs_generation(output_key, "driver_name", text, args, manifest)
+    ]
+    logging.info(
+        f"{len(pending)} of {len(driver_names)} driver name audio clips need to be generated."
+    )
+
+    batch_size = max(1, args.driver_names_batch_size)
+    for batch_idx in range(0, len(pending), batch_size):
+        generate_speech_batch(
+            pending[batch_idx : batch_idx + batch_size], "driver_name", args, manifest
+        )
+        logging.info(
+            f"Driver names: {min(batch_idx + batch_size, len(pending))} of {len(pending)} audio clips processed."
+        )
+    logging.info("All driver name audio clips have been generated.")
+
+    remove_orphaned_outputs(
+        manifest,
+        args.voicepack_base_dir,
+        "driver_name",
+        set(driver_names),
+        dry_run=not args.remove_orphaned_files,
+    )
+
+
+def driver_name_outputs(args: argparse.Namespace) -> Dict[str, str]:
+    """
+    The path within the voice pack folder and text of each driver name audio clip,
+    applying the pronunciations from --driver_name_pronunciations_file. There is one
+    clip per name without any variants, since CrewChief only looks for the exact
+    `driver_names/<lowercase name>.wav`.
+    """
+    driver_names = [args.your_name]
+    if args.driver_names_file:
+        with open(args.driver_names_file, encoding="utf-8") as f:
+            driver_names = [
+                line.strip()
+                for line in f
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+
+    pronunciations = {}
+    if args.driver_name_pronunciations_file:
+        with open(args.driver_name_pronunciations_file, encoding="utf-8") as f:
+            pronunciations = {
+                driver_name.lower(): text for driver_name, text in json.load(f).items()
+            }
+
+    # CrewChief looks up driver names by their lowercase name
+    return {
+        f"/driver_names/{driver_name.lower()}.wav": pronunciations.get(
+            driver_name.lower(), driver_name
+        )
+        for driver_name in driver_names
+    }
+
+
+def generate_speech_batch(
+    items: List[Tuple[str, str]],
+    kind: str,
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+) -> None:
+    """
+    Generate the .wav files of the (output_key, text) items as one batch (see
+    generate_validated_batch), spread over the --generation_streams, recording the
+    valid files in the build manifest.
+
+    For many short clips this is much faster than generate_speech, whose time then goes
+    mostly to the per-file validity check.
+    """
+
+    def record_output(file_path: str, text: str) -> None:
+        manifest.put(
+            file_path[len(args.voicepack_base_dir) :],
+            kind,
+            fingerprint(text, args.fingerprint_settings),
+        )
+
+    failed_items = generate_validated_batch(
+        [
+            (f"{args.voicepack_base_dir}{output_key}", text)
+            for output_key, text in items
+        ],
+        args.tts_args,
+        on_valid=record_output,
+        max_workers=args.generation_streams,
+        retry_history=manifest,
+    )
+    for file_path, text in failed_items:
+        logging.error(
+            f"Failed to generate a valid .wav file from the text '{text}' after {args.tts_args['max_invalid_attempts']} attempts: {file_path}"
+        )
+
+
+def generate_validated_batch(
+    items: List[Tuple[str, str]],
+    tts_args: dict,
+    on_valid: Optional[Callable[[str, str], None]] = None,
+    max_workers: int = 1,
+    retry_history: Optional[BuildManifest] = None,
+) -> List[Tuple[str, str]]:
+    """
+    Generate the .wav files of the (file_path, text) items as one batch: all are
+    synthesized (on up to `max_workers` threads), then validated together, and the
+    invalid ones are regenerated together in the next round, up to max_invalid_attempts
+    rounds. `on_valid` is called with the file path and text of each valid file.
+
+    As in generate_speech, the retry settings of each item follow its generation
+    history in `retry_history`, which is updated with the outcome.
+
+    Returns the items for which no valid file could be generated.
+    """
+    remaining = list(items)
+    base_temperature, base_speed = tts_args["temperature"], tts_args["speed"]
+    text_keys = {file_path: normalize_text(text) for file_path, text in items}
+    histories = {
+        file_path: retry_history.phrase_history(text_key) if retry_history else None
+        for file_path, text_key in text_keys.items()
+    }
+    failures = dict.fromkeys(text_keys, 0)
+    scores: Dict[str, List[float]] = {file_path: [] for file_path in text_keys}
+
+    def record_attempts(file_path: str, attempt_count: int, passing_settings=None):
+        if retry_history is not None:
+            retry_history.record_phrase_attempts(
+                text_keys[file_path],
+                attempt_count,
+                failures[file_path],
+                scores[file_path],
+                (
+                    retry_offsets(passing_settings, base_temperature, base_speed)
+                    if passing_settings and failures[file_path]
+                    else None
+                ),
+            )
+
+    for attempt_idx in range(tts_args["max_invalid_attempts"]):
+        if not remaining:
+            break
+        attempt_settings = {
+            file_path: (
+                retry_settings(
+                    attempt_idx, base_temperature, base_speed, histories[file_path]
+                )
+                if tts_args["adaptive_retries"]
+                else (base_temperature, base_speed)
+            )
+            for file_path, _ in remaining
+        }
+
+        def synthesize(item: Tuple[str, str]) -> Optional[bool]:
+            file_path, text = item
+            temperature, speed = attempt_settings[file_path]
+            output_path, output_filename = os.path.split(file_path)
+            return generate_speech_coqui_xtts(
+                text=text,
+                output_path=output_path,
+                output_filename=output_filename.removesuffix(".wav"),
+                reference_speaker_wav_paths=tts_args["reference_speaker_wav_paths"],
+                temperature=temperature,
+                speed=speed,
+                overwrite=True,
+                cpu_only=tts_args["cpu_only"],
+                use_deepspeed=tts_args["use_deepspeed"],
+                enable_audio_effects=tts_args["enable_audio_effects"],
+                xtts_integrity_on_cpu=tts_args["xtts_integrity_on_cpu"],
+                streaming_inference=tts_args["streaming_inference"],
+            )
+
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                was_generated = list(executor.map(synthesize, remaining))
+        else:
+            was_generated = [synthesize(item) for item in remaining]
+        # abandoned runaway generations are simply tried again in the next round
+        generated_files = dict(
+            item for item, is_generated in zip(remaining, was_generated) if is_generated
+        )
+        remaining = [
+            item
+            for item, is_generated in zip(remaining, was_generated)
+            if not is_generated
+        ]
+        for file_path, _ in remaining:
+            failures[file_path] += 1
+
+        results = check_wav_files(generated_files, tts_args)
+        for file_path, text in generated_files.items():
+            is_invalid, score = results[file_path]
+            if score is not None:
+                scores[file_path].append(score)
+            if not is_invalid:
+                record_attempts(file_path, attempt_idx + 1, attempt_settings[file_path])
+                if on_valid is not None:
+                    on_valid(file_path, text)
+                continue
+
+            failures[file_path] += 1
+            if tts_args["keep_invalid_files"]:
+                # keep it around with a modified name
+                os.rename(
+                    file_path,
+                    f"{file_path.removesuffix('.wav')}.invalid-{attempt_idx}.wav",
+                )
+            else:
+                os.remove(file_path)
+            remaining.append((file_path, text))
+
+        if remaining:
+            logging.info(
+                f"Regenerating {len(remaining)} of {len(items)} audio files of the batch."
+            )
+
+    for file_path, _ in remaining:
+        record_attempts(file_path, tts_args["max_invalid_attempts"])
+    return remaining
+
+
+def check_wav_files(
+    file_texts: Dict[str, str], tts_args: dict
+) -> Dict[str, Tuple[bool, Optional[float]]]:
+    """
+    Run the validity check of is_invalid_wav_file on the .wav files (mapped to the text
+    they were generated from) in one batch, returning the (is_invalid, score) of each.
+    """
+    if not file_texts:
+        return {}
+    if (
+        tts_args["use_xtts_integrity"]
+        and tts_args["xtts_integrity_threshold"] is not None
+    ):
+        results = check_wav_files_xtts_integrity(
+            list(file_texts),
+            tts_args["xtts_integrity_threshold"],
+            tts_args["xtts_integrity_on_cpu"],
+            tts_args["xtts_integrity_cpu_threads"],
+        )
+        # a file the model could not score is regenerated
+        return {
+            file_path: results.get(file_path, (True, None)) for file_path in file_texts
+        }
+    return {
+        file_path: (is_invalid_wav_simple(file_path=file_path, tts_text=text), None)
+        for file_path, text in file_texts.items()
+    }
+
+
+def needs_generation(
+    output_key: str,
+    kind: str,
+    text: str,
+    args: argparse.Namespace,
+    manifest: BuildManifest,
+) -> bool:
+    """Return True if the file at `output_key` is missing or outdated, or --overwrite."""
+    output_fingerprint = fingerprint(text, args.fingerprint_settings)
+    return (
+        args.overwrite
+        or not os.path.isfile(f"{args.voicepack_base_dir}{output_key}")
+        or is_output_outdated(output_key, kind, output_fingerprint, args, manifest)
+    )
+
+
+def run_coordinator(args: argparse.Namespace, manifest: BuildManifest) -> None:
+    """
+    Work out which audio files of the voice pack are missing or outdated, and serve
+    them to workers on other machines (see --coordinator_port) until all are done.
+    """
+    inventory = PhraseInventory([])
+    outputs: Dict[str, Tuple[str, str]] = {}
+    if not args.skip_inventory:
+        inventory = PhraseInventory.load(args.phrase_inventory)
+        prepare_replacement_rules(args)
+        for entry in inventory:
+            filter_phrase_entry(entry, args)
+        # workers lease the units in this order, the most important phrases first
+        for entry, variant_ids in phrase_work_items(
+            order_phrase_entries(inventory, args), args
+        ):
+            output_keys = phrase_output_keys(entry, args)
+            for variant_id in variant_ids:
+                outputs[output_keys[variant_id]] = (
+                    "phrase",
+                    entry.text_for_tts_filtered,
+                )
+    radio_checks = {} if args.skip_radio_check else radio_check_outputs(args)
+    for output_key, radio_check_phrase in radio_checks.items():
+        outputs[output_key] = ("radio_check", radio_check_phrase)
+
+    units = []
+    for output_key, (kind, text) in outputs.items():
+        if needs_generation(output_key, kind, text, args, manifest):
+            units.append(WorkUnit(len(units), output_key, kind, text))
+    logging.info(
+        f"{len(units)} of {len(outputs)} audio files need to be generated by workers."
+    )
+
+    def record_output(unit: WorkUnit) -> None:
+        manifest.put(
+            unit.output_key,
+            unit.kind,
+            fingerprint(unit.text, args.fingerprint_settings),
+        )
+
+    coordinator = WorkCoordinator(
+        units,
+        output_dir=args.voicepack_base_dir,
+        # the settings affecting how the audio sounds are the coordinator's, so every
+        # worker generates the same voice pack
+        settings={
+            "tts_args": {
+                "speed": args.xtts_speed,
+                "enable_audio_effects": not args.disable_audio_effects,
+                "max_invalid_attempts": args.max_invalid_attempts,
+                "adaptive_retries": not args.disable_adaptive_retries,
+                "max_chunk_length": args.max_chunk_length,
+                "use_xtts_integrity": not args.simple_validity_check,
+                "xtts_integrity_threshold": args.xtts_integrity_threshold,
+            }
+        },
+        baseline_paths=args.tts_args["reference_speaker_wav_paths"],
+        on_complete=record_output,
+        lease_seconds=args.lease_seconds,
+    )
+    coordinator.serve(args.coordinator_port, args.progress_check_interval)
+
+    if not args.skip_inventory:
+        finish_phrase_inventory(inventory, args, manifest)
+    if not args.skip_radio_check:
+        remove_orphaned_outputs(
+            manifest,
+            args.voicepack_base_dir,
+            "radio_check",
+            set(radio_checks),
+            dry_run=not args.remove_orphaned_files,
+        )
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    """
+    Generate audio files for the coordinator at --coordinator_url, sending each one
+    back to it, until all the work is done.
+    """
+    worker_name = f"{socket.gethostname()}-{os.getpid()}"
+    client = CoordinatorClient(args.coordinator_url, worker_name)
+
+    try:
+        settings = client.settings()
+        with tempfile.TemporaryDirectory() as work_dir:
+            tts_args = {
+                **args.tts_args,
+                **settings["tts_args"],
+                "reference_speaker_wav_paths": client.download_baseline(
+                    settings["baseline_files"], f"{work_dir}/baseline"
+                ),
+                "overwrite": True,
+                "keep_invalid_files": False,
+            }
+            logging.info(
+                f"Worker {worker_name} connected to the coordinator at {args.coordinator_url}"
+            )
+            if args.generation_streams > 1:
+                prepare_generation_streams(tts_args, args.generation_streams)
+
+            # each of the --generation_streams threads leases and generates its own units
+            with ThreadPoolExecutor(max_workers=args.generation_streams) as executor:
+                for future in [
+                    executor.submit(generate_leased_units, client, tts_args, work_dir)
+                    for _ in range(args.generation_streams)
+                ]:
+                    future.result()
+
+        logging.info("Worker finished, the coordinator has no more work.")
+    except requests.exceptions.RequestException as e:
+        logging.error(
+            f"Lost the connection to the coordinator at {args.coordinator_url}: {e}"
+        )
+    finally:
+        client.close()
+
+
+def generate_leased_units(
+    client: CoordinatorClient, tts_args: dict, work_dir: str
+) -> None:
+    """Generate the units leased from the coordinator, until there are none left."""
+    while (unit := client.lease()) is not None:
+        logging.info(f"Considering {unit['output_key']} - '{unit['text']}'")
+        output_filename = f"unit-{unit['unit_id']}"
+        if not generate_speech(
+            **tts_args,
+            text=unit["text"],
+            output_path=work_dir,
+            output_filename=output_filename,
+        ):
+            client.fail(unit["unit_id"])
+            continue
+
+        with open(f"{work_dir}/{output_filename}.wav", "rb") as f:
+            audio = f.read()
+        os.remove(f"{work_dir}/{output_filename}.wav")
+        try:
+            client.complete(unit["unit_id"], audio)
+        except requests.exceptions.HTTPError as e:
+            # the coordinator will hand it out again once the lease expires
+            logging.error(f"The coordinator could not save {unit['output_key']}: {e}")
+
+
+def apply_saved_tuned_settings(args: argparse.Namespace) -> None:
+    """
+    Use the configuration saved by an earlier --autotune run on this machine, for the
+    options not given on the command line (still None, see parse_arguments).
+    """
+    if not os.path.isfile(args.autotune_file):
+        return
+    tuned_settings = load_tuned_settings(
+        args.autotune_file, host_key(describe_host(args.cpu_only))
+    )
+    if tuned_settings is None:
+        return
+
+    if args.generation_streams is None:
+        args.generation_streams = tuned_settings.generation_streams
+    if args.disable_deepspeed is None:
+        args.disable_deepspeed = not tuned_settings.use_deepspeed
+    if args.cpu_threads is None:
+        args.cpu_threads = tuned_settings.cpu_threads
+    logging.info(
+        f"Using the configuration tuned for this machine: {tuned_settings.describe()} "
+        f"(see {args.autotune_file})"
+    )
+
+
+def autotune_phrases(args: argparse.Namespace) -> List[str]:
+    """
+    Texts of evenly spread lengths from the phrase inventory, from the short
+    acknowledgements to the longest strategy calls, or the radio checks without one.
+    """
+    try:
+        inventory = PhraseInventory.load(args.phrase_inventory)
+    except FileNotFoundError:
+        inventory = PhraseInventory([])
+    texts = sorted({entry.text_for_tts for entry in inventory if entry.text_for_tts})
+    texts.sort(key=len)
+    if len(texts) <= AUTOTUNE_PHRASE_COUNT:
+        return texts or list(radio_check_outputs(args).values())
+    step = len(texts) / AUTOTUNE_PHRASE_COUNT
+    return [
+        texts[int((phrase_idx + 0.5) * step)]
+        for phrase_idx in range(AUTOTUNE_PHRASE_COUNT)
+    ]
+
+
+def benchmark_tuned_settings(
+    candidate: TunedSettings, phrases: List[str], tts_args: dict
+) -> Optional[float]:
+    """
+    Generate and validate the phrases with the candidate configuration, returning the
+    phrases per minute, or None if it ran out of GPU memory.
+
+    Extra streams add next to no GPU memory (see prepare_generation_streams), so that
+    is only a safety net, ie for DeepSpeed's own workspace; each candidate is simply
+    tried rather than estimated.
+    """
+    candidate_tts_args = {
+        **tts_args,
+        "use_deepspeed": candidate.use_deepspeed,
+        "overwrite": True,
+        "keep_invalid_files": False,
+        # the same few attempts for every configuration, so they are timed alike
+        "max_invalid_attempts": 3,
+        "adaptive_retries": False,
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            # loads the model and warms it up before the timing starts
+            measure_generation_memory(candidate_tts_args)
+
+            start_time = time.time()
+            with ThreadPoolExecutor(
+                max_workers=candidate.generation_streams
+            ) as executor:
+                for future in [
+                    executor.submit(
+                        generate_speech,
+                        **candidate_tts_args,
+                        text=phrase,
+                        output_path=work_dir,
+                        output_filename=f"phrase-{phrase_idx}",
+                    )
+                    for phrase_idx, phrase in enumerate(phrases)
+                ]:
+                    future.result()
+        except RuntimeError as e:
+            # torch.cuda.OutOfMemoryError
+            if "out of memory" not in str(e):
+                raise
+            import torch
+
+            torch.cuda.empty_cache()
+            return None
+        elapsed = time.time() - start_time
+    return len(phrases) * 60.0 / elapsed
+
+
+def run_autotune(args: argparse.Namespace) -> None:
+    """
+    Benchmark the candidate configurations for this machine (see --autotune), then use
+    the fastest for this run and save it for later runs.
+    """
+    phrases = autotune_phrases(args)
+    host_description = describe_host(args.cpu_only)
+    logging.info(
+        f"Autotune - Timing {len(phrases)} phrases with each configuration on: {host_description}"
+    )
+
+    def prepare_backend(use_deepspeed: bool, cpu_threads: Optional[int]) -> None:
+        release_xtts_model()
+        set_cpu_threads(cpu_threads)
+
+    tuned_settings = tune(
+        candidate_backends(args.cpu_only),
+        CPU_STREAM_COUNTS if args.cpu_only else GPU_STREAM_COUNTS,
+        prepare_backend=prepare_backend,
+        benchmark=lambda candidate: benchmark_tuned_settings(
+            candidate, phrases, args.tts_args
+        ),
+    )
+    release_xtts_model()
+    set_cpu_threads(args.cpu_threads)
+    if tuned_settings is None:
+        logging.error("Autotune - No configuration worked, keeping the given settings.")
+        return
+
+    save_tuned_settings(
+        args.autotune_file, host_key(host_description), host_description, tuned_settings
+    )
+    logging.info(
+        f"Autotune - Fastest: {tuned_settings.describe()} at {tuned_settings.phrases_per_minute:.1f} phrases per minute, saved to {args.autotune_file}"
+    )
+
+    args.generation_streams = tuned_settings.generation_streams
+    args.disable_deepspeed = not tuned_settings.use_deepspeed
+    args.cpu_threads = tuned_settings.cpu_threads
+    args.tts_args["use_deepspeed"] = tuned_settings.use_deepspeed
+    set_cpu_threads(args.cpu_threads)
+
+
 def main():
     """The main entry point for the script."""
     args = prepare_arguments()
+    if args.coordinator_url:
+        run_worker(args)
+        return
+
+    if args.autotune:
+        run_autotune(args)
     setup_directories_and_files(args)
+    if args.generation_streams > 1 and args.coordinator_port is None:
+        prepare_generation_streams(args.tts_args, args.generation_streams)
+    manifest = BuildManifest(args.manifest_path)
+    watcher = InventoryWatcher(args) if args.watch else None
 
-    if not args.skip_inventory:
-        process_phrase_inventory(args)
+    try:
+        if args.coordinator_port is not None:
+            run_coordinator(args, manifest)
 
-    if not args.skip_radio_check:
-        generate_radio_checks(args)
+        elif not args.skip_inventory:
+            process_phrase_inventory(args, manifest, watcher)
 
-    # TODO: generate subtitles.csv for the radio_check folder
+        if not args.skip_radio_check and args.coordinator_port is None:
+            generate_radio_checks(args, manifest)
 
-    # TODO: generate audio for the driver_names folder, optionally either including all the CrewChief names
-    #       (from a static JSON file in this repo) or just a single name based on args.your_name with a dozen variants
-    # if not args.skip_driver_names:
-    #     generate_driver_names(args)
+        if args.generate_driver_names:
+            generate_driver_names(args, manifest)
+
+        if watcher is not None:
+            watch_phrase_inventory(watcher, args, manifest)
+    finally:
+        manifest.close()
+
+    # TODO: generate subtitles.csv for the radio_check folder
 
     # TODO: generate optional spotter audio pack
     # if not args.skip_spotter:
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import marshal
+import os
+from functools import cached_property
+from typing import Callable, Dict, Iterator, List
+
+from utils import CrewChiefAudioFile, parse_phrase_inventory
+
+# Bump whenever the layout of the cached inventory file changes
+INVENTORY_CACHE_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    """Case and whitespace insensitive form of a phrase, for matching phrases loosely."""
+    return " ".join(text.lower().split())
+
+
+def content_hash(text: str) -> str:
+    """Short stable hash of the text spoken in an audio file (its text_for_tts)."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PhraseInventory:
+    """
+    The phrase inventory, loaded once and indexed for the lookups and grouping done by
+    the scripts in this repo.
+
+    Entries keep the order of the CSV file, and are also indexed by audio_path,
+    subtitle, normalized subtitle (see normalize_text) and content hash of their
+    text_for_tts (see content_hash). Each index maps to the matching entries in
+    inventory order.
+
+    The parsed CSV is cached in a small binary file next to it, which is reused as long
+    as the CSV file is unchanged, so repeated runs skip parsing it.
+    """
+
+    def __init__(self, entries: List[CrewChiefAudioFile]):
+        self.entries = entries
+
+    def _build_index(
+        self, key: Callable[[CrewChiefAudioFile], str]
+    ) -> Dict[str, List[CrewChiefAudioFile]]:
+        index: Dict[str, List[CrewChiefAudioFile]] = {}
+        for entry in self.entries:
+            index.setdefault(key(entry), []).append(entry)
+        return index
+
+    # each index is only built the first time it is used, since most scripts need one
+    # or two of them
+
+    @cached_property
+    def by_audio_path(self) -> Dict[str, List[CrewChiefAudioFile]]:
+        return self._build_index(lambda entry: entry.audio_path)
+
+    @cached_property
+    def by_subtitle(self) -> Dict[str, List[CrewChiefAudioFile]]:
+        return self._build_index(lambda entry: entry.subtitle)
+
+    @cached_property
+    def by_normalized_text(self) -> Dict[str, List[CrewChiefAudioFile]]:
+        return self._build_index(lambda entry: normalize_text(entry.subtitle))
+
+    @cached_property
+    def by_content_hash(self) -> Dict[str, List[CrewChiefAudioFile]]:
+        return self._build_index(lambda entry: content_hash(entry.text_for_tts))
+
+    @classmethod
+    def load(
+        cls, inventory_file_path: str, convert_slashes: bool = True
+    ) -> "PhraseInventory":
+        """
+        Load the phrase inventory CSV file, from its cached form if the file is unchanged.
+        `convert_slashes` swaps the Windows backslashes in audio_path for forward slashes.
+        """
+        rows = load_inventory_rows(inventory_file_path)
+
+        # audio paths repeat across many rows, so share a single copy of each
+        audio_paths: Dict[str, str] = {}
+        entries = []
+        for audio_path, audio_filename, subtitle, text_for_tts in rows:
+            if convert_slashes:
+                audio_path = audio_path.replace("\\", "/")
+            audio_path = audio_paths.setdefault(audio_path, audio_path)
+            entries.append(
+                CrewChiefAudioFile(audio_path, audio_filename, subtitle, text_for_tts)
+            )
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[CrewChiefAudioFile]:
+        return iter(self.entries)
+
+    def __getitem__(self, entry_idx: int) -> CrewChiefAudioFile:
+        return self.entries[entry_idx]
+
+    def with_audio_path(self, audio_path: str) -> List[CrewChiefAudioFile]:
+        return self.by_audio_path.get(audio_path, [])
+
+    def with_subtitle(self, subtitle: str) -> List[CrewChiefAudioFile]:
+        return self.by_subtitle.get(subtitle, [])
+
+    def matching_text(self, text: str) -> List[CrewChiefAudioFile]:
+        """Entries whose subtitle matches the text, ignoring case and whitespace."""
+        return self.by_normalized_text.get(normalize_text(text), [])
+
+    def with_content_hash(self, text_hash: str) -> List[CrewChiefAudioFile]:
+        return self.by_content_hash.get(text_hash, [])
+
+
+def inventory_cache_path(inventory_file_path: str) -> str:
+    directory, filename = os.path.split(inventory_file_path)
+    return os.path.join(directory, f".{filename}.cache")
+
+
+def load_inventory_rows(inventory_file_path: str) -> List[tuple]:
+    """
+    Return the (audio_path, audio_filename, subtitle, text_for_tts) rows of the
+    inventory, reading the cached copy if it was made from the same version of the CSV
+    file, otherwise parsing the CSV and refreshing the cache.
+    """
+    stat = os.stat(inventory_file_path)
+    cache_key = (INVENTORY_CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+    cache_path = inventory_cache_path(inventory_file_path)
+
+    # marshal only handles plain values, so unlike pickle a stray cache file can't
+    # run code when loaded
+    try:
+        with open(cache_path, "rb") as f:
+            cached_key, rows = marshal.loads(f.read())
+        if tuple(cached_key) == cache_key:
+            return rows
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    rows = [
+        (
+            entry.audio_path,
+            entry.audio_filename,
+            entry.subtitle,
+            entry.text_for_tts,
+        )
+        for entry in parse_phrase_inventory(inventory_file_path, convert_slashes=False)
+    ]
+
+    temporary_path = f"{cache_path}.tmp"
+    try:
+        with open(temporary_path, "wb") as f:
+            marshal.dump((cache_key, rows), f)
+        os.replace(temporary_path, cache_path)
+    except OSError as e:
+        # ie a read-only directory, the inventory simply isn't cached
+        logging.debug(f"Unable to cache the phrase inventory at {cache_path}: {e}")
+
+    return rows
@@ -0,0 +1,244 @@
+import json
+import logging
+import re
+from typing import Optional
+
+try:
+    from num2words import num2words
+except ImportError:
+    # without num2words, only numbers spelled out in the glossary itself are covered
+    num2words = None
+
+
+# Words which make a corner name descriptive rather than a proper name, ie
+# "The Left out of Duffus Dip" or "Brooklands Hairpin", so the name is translated by
+# the LLM instead of kept. Names made up of these words only, like "Last Corner", are
+# best given a fixed translation in the glossary's phrases.
+DESCRIPTIVE_CORNER_WORDS = {
+    # directions and the phrasing around them
+    "the",
+    "left",
+    "lehft",
+    "right",
+    "lefthander",
+    "righthander",
+    "hander",
+    "before",
+    "after",
+    "into",
+    "in",
+    "out",
+    "of",
+    "double",
+    "triple",
+    # kinds of corners, in English (and the phonetic 'chicayne' of the inventory)
+    "corner",
+    "corners",
+    "bend",
+    "bends",
+    "curve",
+    "curves",
+    "hairpin",
+    "chicane",
+    "chicayne",
+    "esses",
+    "kink",
+    "hook",
+    "elbow",
+    "sweep",
+    "complex",
+    "loop",
+    "carousel",
+    "corkscrew",
+    "horseshoe",
+    "uphill",
+    "downhill",
+    "oval",
+    "straight",
+    "bus",
+    "stop",
+    # which of several corners it is
+    "first",
+    "second",
+    "third",
+    "last",
+    "final",
+    "inner",
+    "outer",
+    "start",
+    "middle",
+    "end",
+    "old",
+}
+
+# phonetic spellings of the directions in the inventory, to help the TTS model
+PHONETIC_DIRECTIONS = {"lehft": "left"}
+
+
+class PhrasePretranslator:
+    """
+    Deterministic translation of the formulaic parts of the phrase inventory (numbers,
+    rally pacenotes such as "into 5 left", "Turn 3" and corner names), driven by a
+    per-language glossary file such as glossaries/de.json. Phrases the rules don't
+    cover are left to the LLM.
+
+    The glossary is a JSON object with these (all optional) keys:
+      - phrases: exact English phrases (case-insensitive) and their translations
+      - num2words_lang: language code passed to num2words to spell out numbers
+      - number_words: spelled out numbers, used in preference to num2words
+      - number_terms: translations of 'point', 'oh' and 'seconds' in numbers like
+        '59-point 5-seconds' or '1 oh 3'
+      - directions: translations of 'left' and 'right'
+      - corner_severities: translations of pacenote corner severities like 'hairpin'
+      - templates: 'severity_direction' ("5 left"), 'direction_severity' ("left 5"),
+        'into' ("into 5 left") and 'turn' ("Turn 3") formats
+      - keep_corner_names: keep proper corner names like "La Source" untranslated
+    """
+
+    def __init__(self, glossary: dict):
+        self.phrases = {
+            english_phrase.lower(): translated_phrase
+            for english_phrase, translated_phrase in glossary.get("phrases", {}).items()
+        }
+        self.num2words_lang = glossary.get("num2words_lang")
+        self.number_words = glossary.get("number_words", {})
+        self.number_terms = glossary.get("number_terms", {})
+        self.directions = glossary.get("directions", {})
+        self.corner_severities = glossary.get("corner_severities", {})
+        self.templates = glossary.get("templates", {})
+        self.keep_corner_names = glossary.get("keep_corner_names", False)
+
+        severities = "|".join(
+            [r"\d+"]
+            + [
+                re.escape(severity)
+                for severity in sorted(self.corner_severities, key=len, reverse=True)
+            ]
+        )
+        directions = "|".join(["left", "right", *PHONETIC_DIRECTIONS])
+        self._corner_pattern = re.compile(
+            rf"(?P<into>into )?(?:(?P<severity>{severities}) (?P<direction>{directions})"
+            rf"|(?P<reversed_direction>{directions}) (?P<reversed_severity>{severities}))"
+        )
+
+    @classmethod
+    def load(cls, glossary_path: str) -> "PhrasePretranslator":
+        with open(glossary_path, encoding="utf-8") as f:
+            glossary = json.load(f)
+        if num2words is None and glossary.get("num2words_lang"):
+            logging.warning(
+                f"num2words is not installed, so numbers not spelled out in {glossary_path} will be translated by the LLM"
+            )
+        return cls(glossary)
+
+    def spell_number(self, digits: str) -> Optional[str]:
+        """Spell out a whole number in the target language, or None if not possible."""
+        if digits in self.number_words:
+            return self.number_words[digits]
+        if num2words is None or not self.num2words_lang:
+            return None
+        try:
+            return num2words(int(digits), lang=self.num2words_lang)
+        except NotImplementedError:
+            return None
+
+    def translate_number(self, english_phrase: str) -> Optional[str]:
+        """
+        Translate a number phrase such as '59-point 5-seconds', 'point oh 5' or '2 51',
+        word by word, or return None if any of it is not covered by the glossary.
+        """
+        if not re.search(r"\d", english_phrase):
+            return None
+        translated_words = []
+        for word in re.split(r"[ -]+", english_phrase.strip()):
+            translated_word = (
+                self.spell_number(word)
+                if word.isdigit()
+                else self.number_terms.get(word.lower())
+            )
+            if translated_word is None:
+                return None
+            translated_words.append(translated_word)
+        return " ".join(translated_words)
+
+    def translate_corner(self, english_phrase: str) -> Optional[str]:
+        """
+        Translate a pacenote corner call such as '5 left' or 'into hairpin lehft' (a
+        phonetic spelling of 'left').
+        """
+        match = self._corner_pattern.fullmatch(english_phrase.lower())
+        if match is None:
+            return None
+
+        is_reversed = match.group("reversed_direction") is not None
+        severity = match.group("reversed_severity" if is_reversed else "severity")
+        english_direction = match.group(
+            "reversed_direction" if is_reversed else "direction"
+        )
+        direction = self.directions.get(
+            PHONETIC_DIRECTIONS.get(english_direction, english_direction)
+        )
+        translated_severity = (
+            self.spell_number(severity)
+            if severity.isdigit()
+            else self.corner_severities.get(severity)
+        )
+        template = self.templates.get(
+            "direction_severity" if is_reversed else "severity_direction"
+        )
+        if None in (direction, translated_severity, template):
+            return None
+
+        corner = template.format(severity=translated_severity, direction=direction)
+        if match.group("into"):
+            if "into" not in self.templates:
+                return None
+            corner = self.templates["into"].format(corner=corner)
+        return corner
+
+    def translate_corner_name(self, english_phrase: str) -> Optional[str]:
+        """
+        Translate the name of a corner from the corners folder. "Turn N" follows the
+        glossary template, proper names are kept as they are with any numbers spelled
+        out, and names with any DESCRIPTIVE_CORNER_WORDS (ie "Last Corner" or "Bus Stop")
+        are left to the LLM, unless the glossary's phrases translate them.
+        """
+        match = re.fullmatch(r"Turn (\d+)", english_phrase.strip())
+        if match is not None:
+            number = self.spell_number(match.group(1))
+            if number is None or "turn" not in self.templates:
+                return None
+            return self.templates["turn"].format(number=number)
+
+        if not self.keep_corner_names:
+            return None
+        words = english_phrase.split()
+        if any(
+            # "The Right-Hander" and "Tri-Oval" are descriptive too
+            part.lower().strip("'") in DESCRIPTIVE_CORNER_WORDS
+            for word in words
+            for part in word.split("-")
+        ) or any(re.search(r"\d", word) and not word.isdigit() for word in words):
+            return None
+        spelled_words = [
+            self.spell_number(word) if word.isdigit() else word for word in words
+        ]
+        if None in spelled_words:
+            return None
+        return " ".join(spelled_words)
+
+    def translate(self, english_phrase: str, audio_path: str) -> Optional[str]:
+        """
+        Return the rule-based translation of a phrase from the given inventory folder,
+        or None if the phrase should be translated by the LLM.
+        """
+        translated_phrase = self.phrases.get(english_phrase.strip().lower())
+        if translated_phrase is not None:
+            return translated_phrase
+
+        if "corners" in re.split(r"[\\/]", audio_path):
+            return self.translate_corner_name(english_phrase)
+
+        return self.translate_number(english_phrase) or self.translate_corner(
+            english_phrase
+        )
@@ -1,13 +1,36 @@
 # Usage example
 # python record_elevenlabs_voice.py --eleven_labs_api_key XXXXX --voice_id aTTiK3YzK3dXETpuDE2h --voice_name Leon_de --language de
+#
+# Every API response is cached in --cache_dir, so running the same command again (ie with
+# different --trim_* settings) does not download or bill anything. Use --seed to get a
+# different take of the same voice.
 
+import hashlib
+import json
 import os
 import random
-import subprocess
+import sys
+import time
+import wave
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import argparse
 
+ELEVENLABS_MODEL_ID = "eleven_multilingual_v2"  # from GET /v1/models
+ELEVENLABS_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.5,
+    "style": 0.6,
+    "use_speaker_boost": True,
+}
+# raw 16-bit mono PCM, so the audio is trimmed in memory without an mp3 decoding step
+ELEVENLABS_OUTPUT_FORMAT = "pcm_24000"
+ELEVENLABS_SAMPLE_RATE = 24000
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(
@@ -31,11 +54,56 @@ def parse_arguments():
         default="en",
         help="Language code, to choose the input phrases",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=3,
+        help="Number of samples requested from the API at once. Keep this within the concurrent request limit of your ElevenLabs plan, requests over the limit are retried after a delay.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=1,
+        help="Seed for the generated speech. The same seed, text and voice settings give the same (cached) recording, change it to get a different take.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default="elevenlabs_cache",
+        help="Directory where API responses are cached, so repeated runs don't download or bill the same recording again",
+    )
+    parser.add_argument(
+        "--api_base_url",
+        type=str,
+        default="https://api.elevenlabs.io",
+        help="Base URL of the ElevenLabs API, ie to test against a local server",
+    )
+    parser.add_argument(
+        "--trim_start_threshold",
+        type=float,
+        default=0.1,
+        help="Silence is trimmed from the start of each sample until the volume exceeds this percentage of full scale",
+    )
+    parser.add_argument(
+        "--trim_end_threshold",
+        type=float,
+        default=0.3,
+        help="Silence is trimmed from the end of each sample until the volume exceeds this percentage of full scale",
+    )
     return parser.parse_args()
 
 
 def generate_voice_baseline(
-    eleven_labs_api_key: str, voice_name: str, voice_id: str, language: str = "en"
+    eleven_labs_api_key: str,
+    voice_name: str,
+    voice_id: str,
+    language: str = "en",
+    concurrency: int = 3,
+    seed: int = 1,
+    cache_dir: str = "elevenlabs_cache",
+    api_base_url: str = "https://api.elevenlabs.io",
+    trim_start_threshold: float = 0.1,
+    trim_end_threshold: float = 0.3,
 ) -> None:
     # A high-quality alternative to finding, recording, and editing your own voices.
     #
@@ -124,133 +192,242 @@ def generate_voice_baseline(
     }[language]
 
     output_dir = f"baseline/{voice_name}"
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+    session = create_elevenlabs_session(eleven_labs_api_key, pool_size=concurrency)
 
-    for text_sample_idx, text_sample in enumerate(text_samples, 1):
-        # create and download the audio file (.mp3) via Eleven Labs API
-        generate_speech_elevenlabs(
-            eleven_labs_api_key=eleven_labs_api_key,
+    def record_sample(text_sample_idx: int, text_sample: str) -> Optional[str]:
+        # download the audio (or reuse the cached download) via Eleven Labs API
+        pcm_data = generate_speech_elevenlabs(
+            session=session,
             text=text_sample,
-            voice_name=voice_name,
             voice_id=voice_id,
-            output_dir=output_dir,
-            output_filename=f"{text_sample_idx}",
+            seed=seed + text_sample_idx,
+            cache_dir=cache_dir,
+            api_base_url=api_base_url,
         )
+        if pcm_data is None:
+            return None
 
-        # convert the audio file to .wav and trim silence from start and end
-        prefix = f"{output_dir}/{text_sample_idx}"
-        mp3_filename = f"{prefix}.mp3"
-        untrimmed_wav_filename = f"{prefix}_raw.wav"
-        trimmed_wav_filename = f"{prefix}.wav"
+        # trim silence from start and end, normalize, and save as .wav
+        samples = array("h")
+        samples.frombytes(pcm_data[: len(pcm_data) // 2 * 2])
+        if sys.byteorder == "big":
+            # the API returns little-endian samples
+            samples.byteswap()
+        samples = trim_silence(
+            samples,
+            ELEVENLABS_SAMPLE_RATE,
+            start_threshold=trim_start_threshold / 100,
+            end_threshold=trim_end_threshold / 100,
+        )
+        wav_filename = f"{output_dir}/{text_sample_idx}.wav"
+        write_wav(wav_filename, normalize(samples), ELEVENLABS_SAMPLE_RATE)
+        return wav_filename
 
-        convert_mp3_to_wav(mp3_filename, untrimmed_wav_filename)
-        trim_silence(untrimmed_wav_filename, trimmed_wav_filename)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [
+            executor.submit(record_sample, text_sample_idx, text_sample)
+            for text_sample_idx, text_sample in enumerate(text_samples, 1)
+        ]
+        for future in as_completed(futures):
+            wav_filename = future.result()
+            if wav_filename is not None:
+                print(f"Generated {wav_filename}")
 
-        # clean up interim files
-        remove_file(mp3_filename)
-        remove_file(untrimmed_wav_filename)
+    session.close()
+    print(f"Voice baseline generation complete for {voice_name} in {output_dir}")
 
-        print(f"Generated {trimmed_wav_filename}")
 
-    print(f"Voice baseline generation complete for {voice_name} in {output_dir}")
+def create_elevenlabs_session(
+    eleven_labs_api_key: str, pool_size: int
+) -> requests.Session:
+    """
+    Create a requests Session which keeps up to `pool_size` connections to the API open,
+    so concurrent samples reuse connections instead of opening a new one each time.
+    """
+    session = requests.Session()
+    session.headers.update(
+        {
+            "Content-Type": "application/json",
+            "xi-api-key": eleven_labs_api_key,
+        }
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def elevenlabs_cache_path(cache_dir: str, voice_id: str, payload: dict) -> str:
+    """
+    Path of the cached API response for a request, keyed by everything which affects
+    the generated audio (voice, text, model, voice settings, seed and output format).
+    """
+    cache_key = json.dumps(
+        {"voice_id": voice_id, "output_format": ELEVENLABS_OUTPUT_FORMAT, **payload},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    cache_hash = hashlib.sha256(cache_key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{cache_hash}.pcm")
 
 
 def generate_speech_elevenlabs(
-    eleven_labs_api_key: str,
+    session: requests.Session,
     text: str,
-    voice_name: str,
     voice_id: str,
-    output_dir: str,
-    output_filename: str,
-) -> None:
+    seed: int,
+    cache_dir: str,
+    api_base_url: str = "https://api.elevenlabs.io",
+    max_retries: int = 5,
+) -> Optional[bytes]:
     """
-    ElevenLabs API returns mp3 format data
+    ElevenLabs API returns raw 16-bit mono PCM data in ELEVENLABS_OUTPUT_FORMAT.
+    Responses are cached in `cache_dir`, so the same request is never billed twice.
+    Rate limited (429) and server errors are retried, honoring any Retry-After header.
+    Returns None if the audio could not be generated.
     """
-
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-
     payload = {
         "text": text,
-        "model_id": "eleven_multilingual_v2",  # from GET /v1/models
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.5,
-            "style": 0.6,
-            "use_speaker_boost": True,
-        },
-        "seed": random.randrange(1, 9999999),
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "xi-api-key": eleven_labs_api_key,
+        "model_id": ELEVENLABS_MODEL_ID,
+        "voice_settings": ELEVENLABS_VOICE_SETTINGS,
+        "seed": seed,
     }
 
-    response = requests.request("POST", url, json=payload, headers=headers)
+    cache_path = elevenlabs_cache_path(cache_dir, voice_id, payload)
+    if os.path.isfile(cache_path):
+        with open(cache_path, "rb") as f:
+            return f.read()
 
-    if response.status_code == 200:
-        # if needed, create output directory
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    url = f"{api_base_url}/v1/text-to-speech/{voice_id}"
+    for attempt_idx in range(max_retries + 1):
+        retry_after = None
+        try:
+            response = session.post(
+                url,
+                params={"output_format": ELEVENLABS_OUTPUT_FORMAT},
+                json=payload,
+                timeout=120,
+            )
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+        else:
+            if response.status_code == 200:
+                # write under a temporary name first, so an interrupted run never
+                # leaves a truncated recording in the cache
+                temporary_path = f"{cache_path}.tmp"
+                with open(temporary_path, "wb") as f:
+                    f.write(response.content)
+                os.replace(temporary_path, cache_path)
+                return response.content
 
-        full_output_filename = f"{output_dir}/{output_filename}.mp3"
-        with open(full_output_filename, "wb") as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
-    else:
-        print(f"Error from Eleven Labs API: {response.status_code} - {response.text}")
+            error = f"{response.status_code} - {response.text}"
+            retry_after = response.headers.get("Retry-After")
+            if response.status_code != 429 and response.status_code < 500:
+                break
 
+        if attempt_idx < max_retries:
+            delay_seconds = (
+                float(retry_after)
+                if retry_after and retry_after.isdigit()
+                else random.uniform(0, min(30.0, 2.0**attempt_idx))
+            )
+            print(
+                f"Error from Eleven Labs API: {error}, retrying in {delay_seconds:.1f}s"
+            )
+            time.sleep(delay_seconds)
 
-def convert_mp3_to_wav(input_file: str, output_file: str) -> None:
+    print(f"Error from Eleven Labs API: {error}")
+    return None
+
+
+def trim_silence(
+    samples: array,
+    sample_rate: int,
+    start_threshold: float = 0.001,
+    end_threshold: float = 0.003,
+    min_duration: float = 0.1,
+) -> array:
     """
-    Simple CLI conversion of mp3 to wav, requires ffmpeg
+    Trim silence from both sides of the audio, in the same way as
+    `sox silence 1 0.1 0.1% reverse silence 1 0.1 0.3% reverse`: audio is removed until
+    `min_duration` seconds in a row are louder than the threshold (a fraction of full
+    scale), measured as the RMS of 10ms frames.
     """
-    ffmpeg_command: list[str] = ["ffmpeg", "-y", "-i", input_file, output_file]
+    frame_length = max(1, sample_rate // 100)
+    frame_count = len(samples) // frame_length
+    frame_levels = [
+        (
+            sum(
+                sample * sample
+                for sample in samples[
+                    frame_idx * frame_length : (frame_idx + 1) * frame_length
+                ]
+            )
+            / frame_length
+        )
+        ** 0.5
+        / 32768
+        for frame_idx in range(frame_count)
+    ]
+    min_frames = max(1, round(min_duration * sample_rate / frame_length))
+
+    def first_loud_frame(frame_indexes: range, threshold: float) -> Optional[int]:
+        loud_frames = 0
+        for frame_idx in frame_indexes:
+            loud_frames = loud_frames + 1 if frame_levels[frame_idx] > threshold else 0
+            if loud_frames == min_frames:
+                return frame_idx
+        return None
+
+    start_frame = first_loud_frame(range(frame_count), start_threshold)
+    end_frame = first_loud_frame(range(frame_count - 1, -1, -1), end_threshold)
+    if start_frame is None or end_frame is None:
+        # nothing but silence
+        return array("h")
 
-    try:
-        subprocess.run(ffmpeg_command, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"An error occurred: {e}")
+    # the loud run was found after min_frames frames, so step back to where it started
+    start_sample = (start_frame - min_frames + 1) * frame_length
+    end_sample = (end_frame + min_frames) * frame_length
+    return samples[start_sample:end_sample]
 
 
-def trim_silence(input_file: str, output_file: str) -> None:
+def normalize(samples: array) -> array:
     """
-    Trim silence from both sides of file, requires sox
+    Scale the audio so its loudest sample is at full scale, like `sox norm`.
     """
-    sox_command: list[str] = [
-        "sox",
-        "-V1",
-        "-q",
-        input_file,
-        output_file,
-        "silence",
-        "1",
-        "0.1",
-        "0.1%",
-        "reverse",
-        "silence",
-        "1",
-        "0.1",
-        "0.3%",
-        "reverse",
-        "norm",
-    ]
-
-    try:
-        subprocess.run(sox_command, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"An error occurred: {e}")
+    peak = max((abs(sample) for sample in samples), default=0)
+    if peak == 0:
+        return samples
+    gain = 32767 / peak
+    return array("h", (round(sample * gain) for sample in samples))
 
 
-def remove_file(file_path: str) -> None:
+def write_wav(output_file: str, samples: array, sample_rate: int) -> None:
     """
-    Remove the file at the specified path.
+    Save 16-bit mono audio samples as a .wav file.
     """
-    path = Path(file_path)
-    path.unlink()
+    with wave.open(output_file, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
 
 
 if __name__ == "__main__":
     args = parse_arguments()
     print("Generating voice baseline using Eleven Labs API...")
     generate_voice_baseline(
-        args.eleven_labs_api_key, args.voice_name, args.voice_id, language=args.language
+        args.eleven_labs_api_key,
+        args.voice_name,
+        args.voice_id,
+        language=args.language,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        cache_dir=args.cache_dir,
+        api_base_url=args.api_base_url,
+        trim_start_threshold=args.trim_start_threshold,
+        trim_end_threshold=args.trim_end_threshold,
     )
@@ -2,13 +2,55 @@ import logging
 import argparse
 import csv
 import json
-from typing import List, Optional
+import fnmatch
+import os
+import random
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
-from utils import parse_phrase_inventory, CrewChiefAudioFile
+from pretranslation import PhrasePretranslator
+from translation_backends import OllamaBackendPool, parse_endpoint_spec
+from translation_memory import TranslationCheckpoint, TranslationMemory
+from inventory import PhraseInventory
+from utils import progress_string, CrewChiefAudioFile
 
 logging.basicConfig(level=logging.INFO)
 
+# Identifies the wording of the translation prompt in translate_phrase_ollama(). Remembered
+# translations are only reused for the same prompt version, so bump this whenever the
+# prompt changes enough that earlier translations should be redone.
+PROMPT_VERSION = "1"
+
+# Same as PROMPT_VERSION, for the multi-phrase prompt in translate_phrases_ollama_batch()
+# which is used when --batch_size is larger than 1.
+BATCH_PROMPT_VERSION = "batch-2"
+
+# Codes used for '{lang}' in output file names, ie phrase_inventory_de.csv for German.
+# These are the languages supported by the xtts model, others use their lowercase name.
+LANGUAGE_CODES = {
+    "english": "en",
+    "spanish": "es",
+    "french": "fr",
+    "german": "de",
+    "italian": "it",
+    "portuguese": "pt",
+    "polish": "pl",
+    "turkish": "tr",
+    "russian": "ru",
+    "dutch": "nl",
+    "czech": "cs",
+    "arabic": "ar",
+    "chinese": "zh-cn",
+    "japanese": "ja",
+    "hungarian": "hu",
+    "korean": "ko",
+    "hindi": "hi",
+}
+
 # Usage:
 # 1) Choose a capable multilingual LLM (such as qwen2.5:32B), install and start
 # the Ollama API server locally on all ip addresses (0.0.0.0)
@@ -45,12 +87,33 @@ logging.basicConfig(level=logging.INFO)
 #  ^^^ note the new 'xxx_pt.csv' file above where 'pt' is the language code for Portuguese
 #      this is not required, but helpful to keep things tidy with multiple languages
 #
+#  To translate into several languages in a single run, list them all and use '{lang}' in
+#  the output file name, which is replaced with each language code:
+#
+#  python3 translate_phrases.py --target_language Portuguese Spanish French --translated_phrase_inventory 'translated/phrase_inventory_{lang}.csv'
+#
+#  Add `--concurrency N` to keep N requests in flight at once, matching the server's
+#  OLLAMA_NUM_PARALLEL setting (ie, start the server with `OLLAMA_NUM_PARALLEL=4 ollama serve`)
+#  and `--batch_size 15` to translate related phrases from the same folder in a single request
+#
+#  If other machines with a GPU are available, run Ollama on each of them and list them all
+#  to share the work, optionally with a different model or relative weight for each, ie:
+#
+#    --ollama_host host.docker.internal:11434 192.168.1.20:11434 '192.168.1.21:11434,model=qwen2.5:14b,weight=0.5' --concurrency 12
+#
+#  Formulaic phrases (numbers, rally pacenotes like 'into 5 left', corner names) are filled
+#  in from the glossary for the target language, ie glossaries/de.json for German, without
+#  an LLM request. Copy one of those files to add rules for another language.
+#
 #    ... (example output)
-#    INFO:root:Translation 1: okay -> tá bom (is good)
-#    INFO:root:Translation 2: acknowledged -> confirmado (confirmed)
-#    INFO:root:Translation 3: acknowledged -> reconhecido (recognized)
-#    INFO:root:Translation 4: understood -> compreendido (understood)
-#    INFO:root:Translation 5: acknowledged -> reconhecido (recognized) ...
+#    INFO:root:Translation 1 (Portuguese): okay -> tá bom
+#    INFO:root:Translation 2 (Portuguese): acknowledged -> confirmado
+#    INFO:root:Translation 3 (Portuguese): understood -> compreendido
+#    INFO:root:Sanity check 1 (Portuguese): okay -> tá bom (is good)
+#    INFO:root:Translation 4 (Portuguese): okay, no more cut-track warnings -> tá bom, sem mais avisos de corte de pista ...
+#
+#  ^^^ a sample of the translations is translated back to English as a sanity check,
+#      see the `xxx_pt_sanity_check.csv` file written next to the output for the results
 
 # 4) After the translation script completes, you can find your new `phrase_inventory_XXX.csv` file in the `translated` directory on the host machine.
 #
@@ -72,74 +135,629 @@ logging.basicConfig(level=logging.INFO)
 #     [INFO] xtts_integrity validity check passed for ./output/Luis/voice/acknowledge/OK/5-a.wav with score 0.99
 #     ...
 
+
+# JSON schemas passed to Ollama as the "format" of the response, which constrains the
+# model's output to valid JSON of this shape (requires Ollama 0.5 or newer)
+TRANSLATION_SCHEMA = {
+    "type": "object",
+    "properties": {"translation": {"type": "string"}},
+    "required": ["translation"],
+}
+BATCH_TRANSLATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "translations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "translation": {"type": "string"},
+                },
+                "required": ["id", "translation"],
+            },
+        }
+    },
+    "required": ["translations"],
+}
+
+# How each successive attempt to translate a phrase is made when the previous attempt
+# returned an unusable response, as (temperature, prompt style). Attempts first become
+# more deterministic, then switch to a shorter prompt, then add randomness back in so
+# that further attempts don't just repeat the same failure. The last entry is used for
+# all remaining attempts.
+TRANSLATION_RETRY_SCHEDULE = [
+    (0.4, "standard"),
+    (0.2, "standard"),
+    (0.0, "standard"),
+    (0.0, "minimal"),
+    (0.3, "minimal"),
+    (0.6, "minimal"),
+]
+
+
+def parse_llm_json(text: str) -> Any:
+    """
+    Parse JSON returned by the LLM, repairing common near misses locally rather than
+    paying for another generation: Markdown code fences, notes or comments before or
+    after the JSON, "smart" quotes, and trailing commas.
+    Raises ValueError if the text can't be repaired into valid JSON.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    repaired_text = text.strip()
+
+    # remove Markdown code fences like ```json ... ```
+    fenced_match = re.search(r"```(?:json)?\s*(.*?)```", repaired_text, re.DOTALL)
+    if fenced_match:
+        repaired_text = fenced_match.group(1).strip()
+
+    # drop any prose around the outermost JSON object or array
+    start_candidates = [
+        idx for idx in (repaired_text.find("{"), repaired_text.find("[")) if idx >= 0
+    ]
+    if start_candidates:
+        start_idx = min(start_candidates)
+        end_idx = repaired_text.rfind("}" if repaired_text[start_idx] == "{" else "]")
+        if end_idx > start_idx:
+            repaired_text = repaired_text[start_idx : end_idx + 1]
+
+    # remove trailing commas before a closing bracket
+    repaired_text = re.sub(r",\s*([}\]])", r"\1", repaired_text)
+
+    try:
+        return json.loads(repaired_text)
+    except ValueError:
+        pass
+
+    # last resort since these may legitimately appear inside a translation,
+    # ie German „Anführungszeichen“
+    for smart_quote in "“”„‟":
+        repaired_text = repaired_text.replace(smart_quote, '"')
+    return json.loads(repaired_text)
+
+
 def translate_phrase_ollama(
     input_phrase: str,
     source_language_name: str,
     target_language_name: str,
-    ollama_host: str = "host.docker.internal:11434",
+    backends: OllamaBackendPool,
+    temperature: float = 0.4,
+    prompt_style: str = "standard",
 ) -> Optional[str]:
     """
     Translate an input phrase using a locally accessible Ollama API instance.
     See https://ollama.com/ to learn how to configure with the language model of your choice.
+    The request is sent to whichever server in `backends` is least loaded.
+    `prompt_style` is either "standard" or "minimal", a shorter prompt for retries.
+    Returns None if the request failed or the response was unusable.
     """
-    prompt = (
-        'Respond with JSON only using this format: { "translation": "" }.'
-        "DO NOT include any notes or comments or other human-readable text. JSON only."
-        f"Translate all Arabic numerals like 1, 2, 3 to their equivalent word form in {target_language_name}."
-        "Note that these phrases are related to the status of a race car on track, so use comparable terms.\n\n"
-        f"Translate this phrase from {source_language_name} to {target_language_name}:\n\n{input_phrase}"
+    data = request_phrase_translation(
+        input_phrase,
+        source_language_name,
+        target_language_name,
+        backends,
+        temperature,
+        prompt_style,
     )
+    if data is None:
+        return None
+    return parse_phrase_translation(data)
+
+
+def request_phrase_translation(
+    input_phrase: str,
+    source_language_name: str,
+    target_language_name: str,
+    backends: OllamaBackendPool,
+    temperature: float,
+    prompt_style: str,
+) -> Optional[str]:
+    """
+    Send the prompt translating one phrase, returning the raw response of the model,
+    or None if no server could be reached (after the retries of `backends`).
+    """
+    if prompt_style == "minimal":
+        prompt = (
+            f"Translate this race engineer's radio message from {source_language_name} to {target_language_name}, "
+            f'writing any numbers as words. Reply with only the JSON object {{ "translation": "" }}.\n\n'
+            f"{input_phrase}"
+        )
+    else:
+        prompt = (
+            'Respond with JSON only using this format: { "translation": "" }.'
+            "DO NOT include any notes or comments or other human-readable text. JSON only."
+            f"Translate all Arabic numerals like 1, 2, 3 to their equivalent word form in {target_language_name}."
+            "Note that these phrases are related to the status of a race car on track, so use comparable terms.\n\n"
+            f"Translate this phrase from {source_language_name} to {target_language_name}:\n\n{input_phrase}"
+        )
 
     options = {
-        "temperature": 0.4,
+        "temperature": temperature,
         #'max_tokens': 50,
         #'top_p': 1.0,
         #'num_predict': len(input_phrase) * 3
     }
 
-    try:
-        response = requests.post(
-            f"http://{ollama_host}/api/generate",
-            json={
-                "model": "qwen2.5:32b",
-                "prompt": prompt,
-                "options": options,
-                "stream": False,
-            },
-            timeout=20,
-        )
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error communicating with Ollama API: {e}")
-        return None
+    return backends.generate(
+        prompt,
+        options,
+        response_format=TRANSLATION_SCHEMA,
+    )
 
+
+def parse_phrase_translation(data: str) -> Optional[str]:
+    """
+    Return the translation in the model's response to request_phrase_translation, or
+    None if the response is unusable.
+    """
     # Attempt to parse the response as JSON
     try:
-        data = response.json().get("response", {})
-        json_payload = json.loads(data)
+        json_payload = parse_llm_json(data)
 
-        if "translation" not in json_payload:
-            raise json.JSONDecodeError(
+        if not isinstance(json_payload, dict) or not isinstance(
+            json_payload.get("translation"), str
+        ):
+            raise ValueError(
                 "Invalid LLM response, missing 'translation' key in JSON output."
             )
 
-        translated_phrase = json_payload.get("translation", "").strip()
+        translated_phrase = json_payload["translation"].strip()
+        if not translated_phrase:
+            raise ValueError("Invalid LLM response, empty translation.")
 
-    except json.JSONDecodeError:
-        logging.error(f"Failed to decode JSON response: {response.text}")
+    except ValueError:
+        logging.error(f"Failed to decode JSON response: {data}")
         return None
 
     return translated_phrase
 
 
-def main():
+def translate_phrases_ollama_batch(
+    input_phrases: List[str],
+    folder_context: str,
+    source_language_name: str,
+    target_language_name: str,
+    backends: OllamaBackendPool,
+) -> Optional[Dict[int, str]]:
+    """
+    Translate several related phrases in a single LLM request, sending them as a JSON
+    array so the instructions are only sent once and the model sees the phrases together.
+
+    Returns a dict mapping the position of each input phrase to its translation, for the
+    phrases which came back valid. Phrases missing from the dict should be retried. Returns
+    None if the response as a whole was unusable (API error, not a JSON array, or not
+    one result per input phrase).
+    """
+    numbered_phrases = [
+        {"id": phrase_idx, "text": input_phrase}
+        for phrase_idx, input_phrase in enumerate(input_phrases, 1)
+    ]
+    prompt = (
+        'Respond with JSON only using this format: { "translations": [ { "id": 1, "translation": "" } ] }, '
+        "where the translations array contains exactly one object per input phrase, in the same order."
+        "DO NOT include any notes or comments or other human-readable text. JSON only."
+        f"Translate all Arabic numerals like 1, 2, 3 to their equivalent word form in {target_language_name}."
+        "Note that these phrases are related to the status of a race car on track, so use comparable terms."
+        f"All of these phrases are spoken by a race engineer in the same situation ({folder_context}), "
+        "so translate them consistently with each other.\n\n"
+        f"Translate the 'text' of each phrase in this JSON array from {source_language_name} to {target_language_name}:\n\n"
+        f"{json.dumps(numbered_phrases, ensure_ascii=False)}"
+    )
+
+    options = {
+        "temperature": 0.4,
+    }
+
+    data = backends.generate(
+        prompt,
+        options,
+        # more output to generate than for a single phrase
+        timeout=20 + 5 * len(input_phrases),
+        response_format=BATCH_TRANSLATION_SCHEMA,
+    )
+    if data is None:
+        return None
+
+    try:
+        json_payload = parse_llm_json(data)
+    except ValueError:
+        logging.error(f"Failed to decode JSON response for batch: {data}")
+        return None
+
+    # accept a bare array as well, in case the model ignores the requested wrapper object
+    if isinstance(json_payload, dict):
+        json_payload = json_payload.get("translations")
+
+    if not isinstance(json_payload, list) or len(json_payload) != len(input_phrases):
+        logging.error(
+            f"Invalid LLM response for batch, expected a JSON array of {len(input_phrases)} translations: {data}"
+        )
+        return None
+
+    translations: Dict[int, str] = {}
+    for item in json_payload:
+        if not isinstance(item, dict):
+            continue
+        phrase_id = item.get("id")
+        translation = item.get("translation")
+        if (
+            isinstance(phrase_id, int)
+            and 1 <= phrase_id <= len(input_phrases)
+            and isinstance(translation, str)
+            and translation.strip()
+        ):
+            translations[phrase_id - 1] = translation.strip()
+
+    return translations
+
+
+def translate_phrase(
+    english_phrase: str,
+    target_language: str,
+    args: argparse.Namespace,
+    backends: OllamaBackendPool,
+) -> Optional[str]:
+    """
+    Translate a single English phrase, retrying the LLM until it returns a usable
+    response (or max retries). Each retry follows TRANSLATION_RETRY_SCHEDULE rather
+    than repeating the request that just failed. A request which fails at the network
+    level is not retried here, since `backends` already retried it on every server.
+    Returns None if the phrase could not be translated.
+    """
+    logging.debug(f"Translating input phrase '{english_phrase}'...")
+
+    # run translate in a loop until it returns a valid value (or reach max retries)
+    translated_phrase: Optional[str] = None
+    num_retries = 0
+    while translated_phrase is None and num_retries < args.max_retries:
+        temperature, prompt_style = TRANSLATION_RETRY_SCHEDULE[
+            min(num_retries, len(TRANSLATION_RETRY_SCHEDULE) - 1)
+        ]
+        data = request_phrase_translation(
+            english_phrase,
+            source_language_name="English",
+            target_language_name=target_language,
+            backends=backends,
+            temperature=temperature,
+            prompt_style=prompt_style,
+        )
+        if data is None:
+            # the schedule is for unusable answers, not for servers which can't answer
+            logging.error(
+                f"Failed to translate input phrase '{english_phrase}', no Ollama server could be reached."
+            )
+            return None
+
+        translated_phrase = parse_phrase_translation(data)
+        if translated_phrase is None:
+            logging.error(
+                f"Failed to translate input phrase '{english_phrase}'. Retrying (#{num_retries}/{args.max_retries})."
+            )
+            num_retries += 1
+
+    return translated_phrase
+
+
+def translate_phrase_batch(
+    english_phrases: List[str],
+    folder_context: str,
+    target_language: str,
+    args: argparse.Namespace,
+    backends: OllamaBackendPool,
+) -> List[Optional[str]]:
+    """
+    Translate a group of English phrases with as few LLM calls as possible. Phrases that
+    the batched response got wrong are retried in smaller batches, down to single-phrase
+    requests, while the phrases it got right are kept.
+    Returns one translation (or None if it failed) per input phrase.
+    """
+    if len(english_phrases) == 1:
+        return [translate_phrase(english_phrases[0], target_language, args, backends)]
+
+    batch_translations = translate_phrases_ollama_batch(
+        english_phrases,
+        folder_context=folder_context,
+        source_language_name="English",
+        target_language_name=target_language,
+        backends=backends,
+    )
+
+    if batch_translations is None:
+        # the response was unusable as a whole, so split the batch in half and retry
+        logging.warning(
+            f"Retrying batch of {len(english_phrases)} phrases ({folder_context}) as two smaller batches."
+        )
+        midpoint = len(english_phrases) // 2
+        return translate_phrase_batch(
+            english_phrases[:midpoint], folder_context, target_language, args, backends
+        ) + translate_phrase_batch(
+            english_phrases[midpoint:], folder_context, target_language, args, backends
+        )
+
+    translated_phrases: List[Optional[str]] = [
+        batch_translations.get(phrase_idx) for phrase_idx in range(len(english_phrases))
+    ]
+
+    # retry only the phrases which were missing or invalid in the response
+    failed_indices = [
+        phrase_idx
+        for phrase_idx, translated_phrase in enumerate(translated_phrases)
+        if translated_phrase is None
+    ]
+    if failed_indices:
+        logging.warning(
+            f"Retrying {len(failed_indices)} of {len(english_phrases)} phrases from batch ({folder_context})."
+        )
+        retried_phrases = translate_phrase_batch(
+            [english_phrases[phrase_idx] for phrase_idx in failed_indices],
+            folder_context,
+            target_language,
+            args,
+            backends,
+        )
+        for phrase_idx, retried_phrase in zip(failed_indices, retried_phrases):
+            translated_phrases[phrase_idx] = retried_phrase
+
+    return translated_phrases
+
+
+def translate_inventory_batch(
+    batch: List[Tuple[int, str]],
+    audio_path: str,
+    target_language: str,
+    args: argparse.Namespace,
+    backends: OllamaBackendPool,
+    translation_memory: Optional[TranslationMemory],
+) -> Dict[str, str]:
+    """
+    Translate a batch of distinct (phrase number, English phrase) pairs from the same
+    inventory folder into the target language and remember the successful translations.
+    Returns a dict of English phrase to translated phrase.
+    This is called from worker threads, so it must not touch shared state other than
+    the thread-safe `backends` and `translation_memory`.
+    """
+    english_phrases = [english_phrase for _, english_phrase in batch]
+    translated_phrases = translate_phrase_batch(
+        english_phrases,
+        describe_inventory_folder(audio_path),
+        target_language,
+        args,
+        backends,
+    )
+
+    translations: Dict[str, str] = {}
+    for (phrase_idx, english_phrase), translated_phrase in zip(
+        batch, translated_phrases
+    ):
+        if translated_phrase is not None and translation_memory is not None:
+            translation_memory.put(
+                english_phrase,
+                target_language,
+                args.model_key,
+                args.prompt_version,
+                translated_phrase,
+            )
+
+        translated_phrase = translated_phrase or "TRANSLATION_FAILED"
+        logging.info(
+            f"Translation {phrase_idx} ({target_language}): {english_phrase} -> {translated_phrase}"
+        )
+        translations[english_phrase] = translated_phrase
+
+    return translations
+
+
+def is_selected_for_sanity_check(
+    english_phrase: str, audio_path: str, args: argparse.Namespace
+) -> bool:
+    """
+    Decide whether a translated phrase should be sanity checked: always for phrases
+    from folders matching --sanity_check_folders, otherwise for a --sanity_check_rate
+    sample of phrases. The sample is based on a hash of the phrase, so the same
+    phrases are selected every time the same inventory is translated.
+    """
+    if not args.sanity_check:
+        return False
+    if any(
+        fnmatch.fnmatch(audio_path, folder_pattern)
+        for folder_pattern in args.sanity_check_folders
+    ):
+        return True
+    phrase_hash = zlib.crc32(english_phrase.encode("utf-8")) % 10000
+    return phrase_hash < args.sanity_check_rate * 10000
+
+
+def sanity_check_translation(
+    phrase_idx: int,
+    english_phrase: str,
+    translated_phrase: str,
+    target_language: str,
+    args: argparse.Namespace,
+    backends: OllamaBackendPool,
+    translation_memory: Optional[TranslationMemory],
+) -> Tuple[int, str, str, str]:
+    """
+    Sanity check a translation by translating it back to English, so an observer can
+    gain confidence that the translation is accurate.
+    Returns a (phrase number, English phrase, translated phrase, back-translation) row
+    for the sanity check report.
+    This is called from worker threads, so it must not touch shared state other than
+    the thread-safe `backends` and `translation_memory`.
+    """
+    memory_key = (translated_phrase, "English", args.model_key, PROMPT_VERSION)
+    retranslated_phrase = (
+        translation_memory.get(*memory_key) if translation_memory is not None else None
+    )
+
+    if retranslated_phrase is None:
+        retranslated_phrase = translate_phrase_ollama(
+            translated_phrase,
+            source_language_name=target_language,
+            target_language_name="English",
+            backends=backends,
+        )
+        if retranslated_phrase is not None and translation_memory is not None:
+            translation_memory.put(*memory_key, retranslated_phrase)
+
+    retranslated_phrase = retranslated_phrase or "[Sanity check LLM call failed]"
+    logging.info(
+        f"Sanity check {phrase_idx} ({target_language}): {english_phrase} -> {translated_phrase} ({retranslated_phrase})"
+    )
+
+    return phrase_idx, english_phrase, translated_phrase, retranslated_phrase
+
+
+def write_sanity_check_report(
+    report_path: str, sanity_check_rows: List[Tuple[int, str, str, str]]
+) -> None:
+    """
+    Write the sanity check results to a CSV file for review, ordered by the position
+    of each phrase in the phrase inventory.
+    """
+    with open(report_path, "w", newline="", encoding="utf-8") as csvfile_out:
+        csvwriter = csv.writer(csvfile_out)
+        csvwriter.writerow(
+            ["phrase_number", "original_english", "translation", "back_translation"]
+        )
+        csvwriter.writerows(sorted(sanity_check_rows))
+
+    logging.info(
+        f"Sanity check results for {len(sanity_check_rows)} phrases written to {report_path}"
+    )
+
+
+def describe_inventory_folder(audio_path: str) -> str:
+    """
+    Turn an inventory folder like '\\voice\\penalties\\cut_track_in_race' into a short
+    human-readable description like 'penalties, cut track in race' for use in prompts.
+    """
+    folder_names = [
+        folder_name.replace("_", " ")
+        for folder_name in audio_path.replace("\\", "/").split("/")
+        if folder_name and folder_name != "voice"
+    ]
+    return ", ".join(folder_names)
+
+
+def group_phrases_into_batches(
+    unique_phrases: List[Tuple[int, str, str]], batch_size: int
+) -> List[Tuple[List[Tuple[int, str]], str]]:
+    """
+    Split the (phrase number, English phrase, audio_path) list into consecutive batches
+    of up to `batch_size` phrases which all come from the same inventory folder.
+    Returns a list of (batch, audio_path) pairs.
+    """
+    batches: List[Tuple[List[Tuple[int, str]], str]] = []
+    for phrase_idx, english_phrase, audio_path in unique_phrases:
+        if (
+            batches
+            and batches[-1][1] == audio_path
+            and len(batches[-1][0]) < batch_size
+        ):
+            batches[-1][0].append((phrase_idx, english_phrase))
+        else:
+            batches.append(([(phrase_idx, english_phrase)], audio_path))
+    return batches
+
+
+def invalidate_translation_memory(
+    translation_memory: TranslationMemory,
+    inventory: PhraseInventory,
+    target_language: str,
+    args: argparse.Namespace,
+) -> None:
+    """
+    Forget remembered translations selected with --invalidate_phrases and
+    --invalidate_folders for the target language and current model, so that they are
+    translated again by the LLM during this run.
+    """
+    scope = {"target_language": target_language, "model": args.model_key}
+    removed_count = 0
+
+    for phrase_pattern in args.invalidate_phrases:
+        removed_count += translation_memory.invalidate(
+            source_text_pattern=phrase_pattern, **scope
+        )
+
+    folder_phrases = {
+        entry.subtitle
+        for audio_path, folder_entries in inventory.by_audio_path.items()
+        if any(
+            fnmatch.fnmatch(audio_path, folder_pattern)
+            for folder_pattern in args.invalidate_folders
+        )
+        for entry in folder_entries
+    }
+    for english_phrase in folder_phrases:
+        removed_count += translation_memory.invalidate(
+            source_text=english_phrase, **scope
+        )
+
+    if args.invalidate_phrases or args.invalidate_folders:
+        logging.info(
+            f"Removed {removed_count} remembered {target_language} translations from {translation_memory.database_path}"
+        )
+
+
+def write_output_row(
+    csvwriter: Any, entry: CrewChiefAudioFile, translated_phrase: str
+) -> None:
+    """Write the translated entry to the output CSV"""
+    csvwriter.writerow(
+        [
+            entry.audio_path,
+            f"{entry.audio_filename}.wav",
+            translated_phrase,  # subtitle field
+            translated_phrase,  # text_for_tts field
+            entry.subtitle,  # not used, for comparison only, original English subtitle
+        ]
+    )
+
+
+def write_translated_phrase_inventory(
+    output_path: str,
+    inventory: PhraseInventory,
+    translations: Dict[str, str],
+) -> None:
+    """
+    Write the complete translated phrase inventory CSV, with rows in the same order as
+    the input inventory. The file is written under a temporary name and then renamed,
+    so an interruption never leaves a partially written CSV behind.
+    """
+    temporary_path = f"{output_path}.tmp"
+    with open(temporary_path, "w", newline="", encoding="utf-8") as csvfile_out:
+        csvwriter = csv.writer(csvfile_out)
+
+        # Write header row
+        csvwriter.writerow(
+            [
+                "audio_path",
+                "audio_filename",
+                "subtitle",
+                "text_for_tts",
+                "original_english",
+            ]
+        )
+
+        for entry in inventory:
+            write_output_row(csvwriter, entry, translations[entry.subtitle])
+
+    os.replace(temporary_path, output_path)
+
+
+def parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
-        description="Translate crew-chief-autovoicepack phrase text from English to the language of your choosing, using a local LLM API, with initial support for Ollama. Expect this process to take at least several hours, since it's not at all optimized for speed or efficiency (slow model, no batching, no caching, slow sanity check, etc)."
+        description="Translate crew-chief-autovoicepack phrase text from English to the language of your choosing, using a local LLM API, with initial support for Ollama. Expect this process to take a few hours with a large model, depending mostly on how many requests the Ollama server can run in parallel (see --concurrency)."
     )
     parser.add_argument(
         "--target_language",
-        default="German",
-        help="The English name of the target language to translate to, i.e. 'German', 'Spanish', 'Japanese'. Feel free to experiment if there is a certain dialect or other nuance that you think would help, this wording is being fed directly to the LLM as part of the translation request.",
+        nargs="+",
+        default=["German"],
+        help="The English name of the target language to translate to, i.e. 'German', 'Spanish', 'Japanese'. Feel free to experiment if there is a certain dialect or other nuance that you think would help, this wording is being fed directly to the LLM as part of the translation request. List several languages to translate into all of them in a single run, sharing the same LLM requests budget.",
     )
     parser.add_argument(
         "--phrase_inventory",
@@ -148,102 +766,518 @@ def main():
     )
     parser.add_argument(
         "--translated_phrase_inventory",
-        help="Path to the output CSV file to save translated phrases, i.e. you may want 'phrase_inventory_de.csv' for German",
-        default="phrase_inventory_translated.csv",
+        help="Path to the output CSV file to save translated phrases, i.e. you may want 'phrase_inventory_de.csv' for German. Any '{lang}' is replaced by the language code (or lowercase name, for languages without a known code) of the target language, which is required when translating into several languages. Defaults to 'phrase_inventory_translated_{lang}.csv'.",
+        # not 'phrase_inventory_{lang}.csv', which would overwrite the shipped phrase_inventory_de.csv
+        default="phrase_inventory_translated_{lang}.csv",
     )
     parser.add_argument(
         "--max_retries",
-        help="Maximum number of retries to attempt for each phrase translation. Used when the LLM returns an incompatible response.",
-        default=100,
+        type=int,
+        help="Maximum number of retries to attempt for each phrase translation. Used when the LLM returns an incompatible response. Retries gradually lower the temperature and then switch to a simpler prompt, so a handful is usually enough. Network errors are retried separately, with backoff.",
+        default=10,
     )
     parser.add_argument(
         "--sanity_check",
-        help="If True, translate the LLM response back to English and display the result in the logs. This will help an observer gain confidence that the translation is accurate, but will slow down the process by approximately half since it requires an extra call to the LLM.",
+        type=lambda x: x.lower() not in ("false", "no", "0", ""),
+        help="If True, translate a sample of the LLM responses back to English and save the results in a separate report CSV file (and the logs). This will help an observer gain confidence that the translation is accurate. The extra LLM calls run alongside the main translation with their own, smaller, concurrency limit so they do not hold it up.",
         default=True,
     )
+    parser.add_argument(
+        "--sanity_check_rate",
+        type=float,
+        help="Fraction of the distinct translated phrases to sanity check, between 0 and 1. The same phrases are chosen on every run.",
+        default=0.1,
+    )
+    parser.add_argument(
+        "--sanity_check_folders",
+        nargs="+",
+        default=[],
+        metavar="PATTERN",
+        help="Always sanity check the phrases in inventory folders matching these glob patterns, ie '*penalties*', in addition to the --sanity_check_rate sample.",
+    )
+    parser.add_argument(
+        "--sanity_check_concurrency",
+        type=int,
+        help="Maximum number of sanity check requests in flight at once, on top of --concurrency. Keep this low so the sanity check does not slow down the translation itself.",
+        default=1,
+    )
+    parser.add_argument(
+        "--sanity_check_report",
+        help="Path to the CSV file where the sanity check results are saved. Defaults to the output CSV file name with a '_sanity_check' suffix. Any '{lang}' is replaced as in --translated_phrase_inventory.",
+        default=None,
+    )
+    parser.add_argument(
+        "--ollama_host",
+        nargs="+",
+        type=parse_endpoint_spec,
+        help="Host and port of the Ollama API server. List several servers to spread the translation across them, each optionally followed by its own model and relative weight, ie '192.168.1.20:11434,model=qwen2.5:14b,weight=0.5'. Requests go to the least loaded server, and servers which time out or fail are skipped for a while.",
+        default=[parse_endpoint_spec("host.docker.internal:11434")],
+    )
+    parser.add_argument(
+        "--model",
+        help="Name of the Ollama model used for translation, as shown by `ollama list`. Used by every server in --ollama_host which doesn't name its own model.",
+        default="qwen2.5:32b",
+    )
+    parser.add_argument(
+        "--endpoint_eject_seconds",
+        type=float,
+        default=30.0,
+        help="How long an Ollama server is skipped after it times out or fails, doubling with every further consecutive failure (up to 10 minutes).",
+    )
+    parser.add_argument(
+        "--translation_memory",
+        help="Path to the translation memory file, which remembers every successful translation (per phrase, target language, model and prompt version) so that repeated phrases and reruns do not call the LLM again. Defaults to 'translation_memory.sqlite' next to the output CSV file.",
+        default=None,
+    )
+    parser.add_argument(
+        "--disable_translation_memory",
+        action="store_true",
+        help="Neither read nor update the translation memory, sending every distinct phrase to the LLM.",
+    )
+    parser.add_argument(
+        "--invalidate_phrases",
+        nargs="+",
+        default=[],
+        metavar="PATTERN",
+        help="Forget remembered translations (for the target languages and model) of English phrases matching these case-sensitive glob patterns, ie 'into hairpin*', so they are translated again.",
+    )
+    parser.add_argument(
+        "--invalidate_folders",
+        nargs="+",
+        default=[],
+        metavar="PATTERN",
+        help="Forget remembered translations (for the target languages and model) of all phrases in inventory folders matching these glob patterns, ie '*corners*', so they are translated again.",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of phrases from the same inventory folder to translate in a single LLM request. Values around 10-20 greatly reduce the number of requests and help keep related phrases consistent, at the cost of occasionally retrying a batch whose response was incomplete. The default of 1 sends each phrase separately.",
+        default=1,
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Maximum number of translation requests in flight at once. Ollama serves several requests in parallel (see OLLAMA_NUM_PARALLEL on the server), so a value matching the server setting keeps the model busy.",
+        default=4,
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint left behind by an interrupted or partly failed run and start over. By default, such a run is resumed and only the missing or failed (TRANSLATION_FAILED) phrases are translated again.",
+    )
+    parser.add_argument(
+        "--glossary_dir",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "glossaries"),
+        help="Directory of per-language glossary files, named by language code (ie 'de.json' for German). Formulaic phrases such as numbers, rally pacenotes and corner names are translated with the glossary rules instead of the LLM, for languages which have a glossary.",
+    )
+    parser.add_argument(
+        "--disable_pretranslation",
+        action="store_true",
+        help="Send every phrase to the LLM, even those covered by the glossary rules.",
+    )
+    parser.add_argument(
+        "--progress_check_interval",
+        type=float,
+        default=30.0,
+        help="Interval in seconds between progress updates for each target language.",
+    )
     args = parser.parse_args()
 
-    entries: List[CrewChiefAudioFile] = parse_phrase_inventory(
-        args.phrase_inventory, convert_slashes=False
+    if (
+        len(args.target_language) > 1
+        and "{lang}" not in args.translated_phrase_inventory
+    ):
+        parser.error(
+            "--translated_phrase_inventory must contain '{lang}' when translating into several languages."
+        )
+
+    return args
+
+
+@dataclass
+class LanguageTranslation:
+    """
+    The state of the translation of the phrase inventory into one target language, for
+    runs which translate into several languages at once.
+    """
+
+    target_language: str
+    output_path: str
+    sanity_check_report_path: str
+    checkpoint: TranslationCheckpoint
+    translations: Dict[str, str]
+    resumed: bool
+    remaining_batches: int = 0
+    sanity_check_futures: List[Any] = field(default_factory=list)
+    start_time: float = field(default_factory=time.time)
+    initial_total: int = 0
+    previous_total: int = 0
+    previous_time: float = field(default_factory=time.time)
+
+
+def language_output_path(path_template: str, target_language: str) -> str:
+    """
+    Replace '{lang}' in an output path with the code of the target language,
+    ie 'phrase_inventory_{lang}.csv' -> 'phrase_inventory_de.csv' for German.
+    """
+    lang = LANGUAGE_CODES.get(
+        target_language.lower(), target_language.lower().replace(" ", "_")
+    )
+    return path_template.replace("{lang}", lang)
+
+
+def load_pretranslator(
+    target_language: str, args: argparse.Namespace
+) -> Optional[PhrasePretranslator]:
+    """
+    Load the glossary rules for the target language, or return None if pre-translation
+    is disabled or there is no glossary for the language.
+    """
+    if args.disable_pretranslation:
+        return None
+
+    glossary_path = language_output_path(
+        os.path.join(args.glossary_dir, "{lang}.json"), target_language
     )
+    if not os.path.isfile(glossary_path):
+        logging.info(
+            f"{target_language}: no glossary found at {glossary_path}, all phrases will be translated by the LLM."
+        )
+        return None
+
+    return PhrasePretranslator.load(glossary_path)
+
+
+def prepare_language_translation(
+    target_language: str,
+    first_audio_paths: Dict[str, str],
+    args: argparse.Namespace,
+    translation_memory: Optional[TranslationMemory],
+) -> Tuple[LanguageTranslation, List[Tuple[int, str, str]]]:
+    """
+    Set up the translation into one target language, filling formulaic phrases from the
+    language's glossary, resuming an interrupted run from its checkpoint and reusing
+    translations from the translation memory where possible.
+    Returns the new LanguageTranslation and the (phrase number, English phrase,
+    audio_path) list of phrases which still need to be translated.
+    """
+    output_path = language_output_path(
+        args.translated_phrase_inventory, target_language
+    )
+
+    # resume an interrupted run from its checkpoint, retrying phrases which failed
+    checkpoint = TranslationCheckpoint(
+        f"{output_path}.checkpoint.jsonl",
+        run_settings={
+            "phrase_inventory": os.path.abspath(args.phrase_inventory),
+            "target_language": target_language,
+            "model": args.model_key,
+            "prompt_version": args.prompt_version,
+        },
+    )
+    checkpoint_translations = {} if args.restart else checkpoint.load()
+    resumed_translations = {
+        english_phrase: translated_phrase
+        for english_phrase, translated_phrase in checkpoint_translations.items()
+        if translated_phrase != "TRANSLATION_FAILED"
+    }
+    if checkpoint_translations:
+        logging.info(
+            f"Resuming from {checkpoint.checkpoint_path} with {len(resumed_translations)} completed phrases "
+            f"({len(checkpoint_translations) - len(resumed_translations)} failed phrases will be retried)."
+        )
+
+    pretranslator = load_pretranslator(target_language, args)
+
+    # rule-based translations take precedence, so glossary changes apply immediately,
+    # then reuse translations from the checkpoint or translation memory where possible
+    translations: Dict[str, str] = {}
+    unique_phrases: List[Tuple[int, str, str]] = []
+    pretranslated_count = 0
+    for phrase_idx, (english_phrase, audio_path) in enumerate(
+        first_audio_paths.items(), 1
+    ):
+        if pretranslator is not None:
+            pretranslated_phrase = pretranslator.translate(english_phrase, audio_path)
+            if pretranslated_phrase is not None:
+                translations[english_phrase] = pretranslated_phrase
+                pretranslated_count += 1
+                continue
+
+        remembered_phrase = resumed_translations.get(english_phrase) or (
+            translation_memory.get(
+                english_phrase, target_language, args.model_key, args.prompt_version
+            )
+            if translation_memory is not None
+            else None
+        )
+        if remembered_phrase is not None:
+            translations[english_phrase] = remembered_phrase
+        else:
+            unique_phrases.append((phrase_idx, english_phrase, audio_path))
+
+    logging.info(
+        f"{target_language}: translating {len(unique_phrases)} distinct phrases "
+        f"({pretranslated_count} more distinct phrases translated by glossary rules, "
+        f"{len(translations) - pretranslated_count} already translated)."
+    )
+
+    language_translation = LanguageTranslation(
+        target_language=target_language,
+        output_path=output_path,
+        sanity_check_report_path=(
+            language_output_path(args.sanity_check_report, target_language)
+            if args.sanity_check_report
+            else f"{os.path.splitext(output_path)[0]}_sanity_check.csv"
+        ),
+        checkpoint=checkpoint,
+        translations=translations,
+        resumed=bool(checkpoint_translations),
+        initial_total=len(translations),
+        previous_total=len(translations),
+    )
+    return language_translation, unique_phrases
+
+
+def log_language_progress(
+    language_translation: LanguageTranslation, total: int
+) -> None:
+    """Log the translation progress for one target language."""
+    current_time = time.time()
+    current_total = len(language_translation.translations)
+    progress = progress_string(
+        current_total=current_total,
+        total=total,
+        start_time=language_translation.start_time,
+        current_time=current_time,
+        previous_total=language_translation.previous_total,
+        previous_time=language_translation.previous_time,
+        initial_total=language_translation.initial_total,
+    )
+    logging.info(f"{language_translation.target_language}: {progress}")
+    language_translation.previous_total = current_total
+    language_translation.previous_time = current_time
+
+
+def finish_language_translation(
+    language_translation: LanguageTranslation,
+    inventory: PhraseInventory,
+    args: argparse.Namespace,
+) -> None:
+    """
+    Write the translated phrase inventory for a language once all of its phrases are
+    done, and remove its checkpoint unless some phrases failed.
+    """
+    # rows are written in inventory order, so the output is the same regardless of
+    # how many times the run was interrupted and resumed
+    write_translated_phrase_inventory(
+        language_translation.output_path, inventory, language_translation.translations
+    )
+
+    # keep the checkpoint around if any phrases failed, so they are retried next time
+    failed_count = sum(
+        translated_phrase == "TRANSLATION_FAILED"
+        for translated_phrase in language_translation.translations.values()
+    )
+    language_translation.checkpoint.close(remove=failed_count == 0)
+
+    logging.info(
+        f"{language_translation.target_language}: all entries in {args.phrase_inventory} have been translated, "
+        f"with {failed_count} failed phrases. Translation is available at {language_translation.output_path}"
+    )
+    if failed_count:
+        logging.warning(
+            f"{language_translation.target_language}: {failed_count} distinct phrases could not be translated and are marked TRANSLATION_FAILED. "
+            "Run the same command again to retry only those phrases."
+        )
+
+
+def main():
+    args = parse_arguments()
 
-    if not entries:
+    inventory = PhraseInventory.load(args.phrase_inventory, convert_slashes=False)
+
+    if not inventory:
         logging.error("No entries found in the phrase inventory. Exiting.")
         return
 
-    # Open output CSV file for writing
-    with open(
-        args.translated_phrase_inventory, "w", newline="", encoding="utf-8"
-    ) as csvfile_out:
-        csvwriter = csv.writer(csvfile_out)
+    concurrency = max(1, args.concurrency)
+    sanity_check_concurrency = max(1, args.sanity_check_concurrency)
+    for endpoint in args.ollama_host:
+        endpoint.model = endpoint.model or args.model
+    backends = OllamaBackendPool(
+        args.ollama_host,
+        pool_size=concurrency + sanity_check_concurrency,
+        eject_seconds=args.endpoint_eject_seconds,
+    )
 
-        # Write header row
-        csvwriter.writerow(
-            [
-                "audio_path",
-                "audio_filename",
-                "subtitle",
-                "text_for_tts",
-                "original_english",
-            ]
+    # remembered translations are only reused for the same model(s) and prompt
+    args.model_key = backends.model_key
+    args.prompt_version = (
+        PROMPT_VERSION if args.batch_size <= 1 else BATCH_PROMPT_VERSION
+    )
+
+    translation_memory: Optional[TranslationMemory] = None
+    if not args.disable_translation_memory:
+        translation_memory = TranslationMemory(
+            args.translation_memory
+            or os.path.join(
+                os.path.dirname(args.translated_phrase_inventory),
+                "translation_memory.sqlite",
+            )
         )
+        for target_language in args.target_language:
+            invalidate_translation_memory(
+                translation_memory, inventory, target_language, args
+            )
 
-        for entry_idx, entry in enumerate(entries, 1):
-            english_phrase = entry.subtitle
+    # many rows share the same English subtitle, so only translate each distinct phrase
+    # once, keeping them in order of first appearance in the inventory (along with the
+    # folder where it first appears)
+    first_audio_paths: Dict[str, str] = {
+        english_phrase: phrase_entries[0].audio_path
+        for english_phrase, phrase_entries in inventory.by_subtitle.items()
+    }
+    phrase_numbers = {
+        english_phrase: phrase_idx
+        for phrase_idx, english_phrase in enumerate(first_audio_paths, 1)
+    }
 
-            logging.debug(
-                f"Translating input phrase {entry_idx} - '{english_phrase}'..."
-            )
+    logging.info(
+        f"Translating {len(first_audio_paths)} distinct phrases for {len(inventory)} inventory entries "
+        f"into {', '.join(args.target_language)}."
+    )
 
-            # run translate in a loop until it returns a valid value (or reach max retries)
-            translated_phrase: Optional[str] = None
-            num_retries = 0
-            while translated_phrase is None and num_retries < args.max_retries:
-                translated_phrase = translate_phrase_ollama(
-                    english_phrase,
-                    source_language_name="English",
-                    target_language_name=args.target_language,
-                )
-                if translated_phrase is None:
-                    logging.error(
-                        f"Failed to translate input phrase '{english_phrase}'. Retrying (#{num_retries}/{args.max_retries})."
-                    )
-                    num_retries += 1
+    # all (batch, language) pairs share the same pool of workers
+    language_translations: List[LanguageTranslation] = []
+    batches: List[Tuple[LanguageTranslation, List[Tuple[int, str]], str]] = []
+    for target_language in args.target_language:
+        language_translation, unique_phrases = prepare_language_translation(
+            target_language, first_audio_paths, args, translation_memory
+        )
+        language_translations.append(language_translation)
+        for batch, audio_path in group_phrases_into_batches(
+            unique_phrases, max(1, args.batch_size)
+        ):
+            batches.append((language_translation, batch, audio_path))
+            language_translation.remaining_batches += 1
 
-            translated_phrase = translated_phrase or "TRANSLATION_FAILED"
+    # sanity checks run in their own, smaller, pool of workers, so they never delay the
+    # translations themselves and simply catch up once the translation is complete
+    sanity_check_executor = ThreadPoolExecutor(max_workers=sanity_check_concurrency)
 
-            # sanity check by translating it back to English
-            retranslated_phrase = (
-                (
-                    translate_phrase_ollama(
+    def queue_sanity_checks(
+        language_translation: LanguageTranslation, new_translations: Dict[str, str]
+    ) -> None:
+        for english_phrase, translated_phrase in new_translations.items():
+            if (
+                translated_phrase != "TRANSLATION_FAILED"
+                and is_selected_for_sanity_check(
+                    english_phrase, first_audio_paths[english_phrase], args
+                )
+            ):
+                language_translation.sanity_check_futures.append(
+                    sanity_check_executor.submit(
+                        sanity_check_translation,
+                        phrase_numbers[english_phrase],
+                        english_phrase,
                         translated_phrase,
-                        source_language_name=args.target_language,
-                        target_language_name="English",
+                        language_translation.target_language,
+                        args,
+                        backends,
+                        translation_memory,
                     )
-                    or "[Sanity check LLM call failed]"
                 )
-                if args.sanity_check
-                else "..."
-            )
 
+    for language_translation in language_translations:
+        queue_sanity_checks(language_translation, language_translation.translations)
+        language_translation.checkpoint.start(resume=language_translation.resumed)
+        if language_translation.remaining_batches == 0:
+            finish_language_translation(language_translation, inventory, args)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        # run up to `concurrency` batches at a time, recording each in the checkpoint
+        # of its language as soon as it completes, whatever order that happens in
+        batch_futures = {
+            executor.submit(
+                translate_inventory_batch,
+                batch,
+                audio_path,
+                language_translation.target_language,
+                args,
+                backends,
+                translation_memory,
+            ): language_translation
+            for language_translation, batch, audio_path in batches
+        }
+        last_progress_time = time.time()
+        for batch_future in as_completed(batch_futures):
+            language_translation = batch_futures[batch_future]
+            batch_translations = batch_future.result()
+            language_translation.checkpoint.record(batch_translations)
+            language_translation.translations.update(batch_translations)
+            queue_sanity_checks(language_translation, batch_translations)
+
+            language_translation.remaining_batches -= 1
+            if language_translation.remaining_batches == 0:
+                finish_language_translation(language_translation, inventory, args)
+
+            if time.time() - last_progress_time >= args.progress_check_interval:
+                for language_translation in language_translations:
+                    if language_translation.remaining_batches > 0:
+                        log_language_progress(
+                            language_translation, len(first_audio_paths)
+                        )
+                if len(backends.endpoints) > 1:
+                    for endpoint_summary in backends.throughput_summary():
+                        logging.info(f"Endpoint {endpoint_summary}")
+                last_progress_time = time.time()
+
+        for language_translation in language_translations:
+            if not language_translation.sanity_check_futures:
+                continue
             logging.info(
-                f"Translation {entry_idx}: {entry.subtitle} -> {translated_phrase} ({retranslated_phrase})\n"
+                f"{language_translation.target_language}: waiting for the sanity check of "
+                f"{len(language_translation.sanity_check_futures)} translated phrases to complete..."
             )
-
-            # Write the translated entry to the output CSV
-            csvwriter.writerow(
+            write_sanity_check_report(
+                language_translation.sanity_check_report_path,
                 [
-                    entry.audio_path,
-                    f"{entry.audio_filename}.wav",
-                    translated_phrase,  # subtitle field
-                    translated_phrase,  # text_for_tts field
-                    english_phrase,  # not used, for comparison only, original English subtitle
-                ]
+                    sanity_check_future.result()
+                    for sanity_check_future in language_translation.sanity_check_futures
+                ],
             )
+    except BaseException:
+        # ie Ctrl-C, don't wait for the remaining batches before exiting
+        executor.shutdown(wait=False, cancel_futures=True)
+        sanity_check_executor.shutdown(wait=False, cancel_futures=True)
+        for language_translation in language_translations:
+            language_translation.checkpoint.close()
+        logging.error(
+            "Translation interrupted, progress is saved in the checkpoint file next to each output CSV file. "
+            "Run the same command again to resume."
+        )
+        raise
+    executor.shutdown()
+    sanity_check_executor.shutdown()
 
-    logging.info(
-        f"All entries in {args.phrase_inventory} have been translated. Translation is available at {args.translated_phrase_inventory}"
-    )
+    for endpoint_summary in backends.throughput_summary():
+        logging.info(f"Endpoint {endpoint_summary}")
+    backends.close()
+    if translation_memory is not None:
+        translation_memory.close()
+
+    for language_translation in language_translations:
+        failed_count = sum(
+            translated_phrase == "TRANSLATION_FAILED"
+            for translated_phrase in language_translation.translations.values()
+        )
+        logging.info(
+            f"{language_translation.target_language}: {len(first_audio_paths) - failed_count} of "
+            f"{len(first_audio_paths)} distinct phrases translated, {failed_count} failed, "
+            f"see {language_translation.output_path}"
+        )
 
 
 if __name__ == "__main__":
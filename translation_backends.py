@@ -0,0 +1,290 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class OllamaEndpoint:
+    """
+    One Ollama API server available for translation, ie a workstation with a spare GPU.
+    Requests are shared between endpoints in proportion to their `weight`.
+    """
+
+    host: str
+    model: Optional[str] = None
+    weight: float = 1.0
+
+    # dispatch state, only changed by OllamaBackendPool while holding its lock
+    in_flight: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+
+    # throughput statistics
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+    busy_seconds: float = 0.0
+    eval_tokens: int = 0
+    eval_seconds: float = 0.0
+    first_request_time: Optional[float] = field(default=None)
+
+    @property
+    def name(self) -> str:
+        return f"{self.host} ({self.model})"
+
+
+def parse_endpoint_spec(endpoint_spec: str) -> OllamaEndpoint:
+    """
+    Parse an endpoint given on the command line as HOST:PORT, optionally followed by
+    comma-separated model and weight settings, ie '192.168.1.20:11434,model=qwen2.5:14b,weight=0.5'.
+    The model is left as None when not given, to be filled in with the default model.
+    """
+    host, *settings = endpoint_spec.split(",")
+    if not host:
+        raise ValueError(f"missing host in endpoint '{endpoint_spec}'")
+
+    endpoint = OllamaEndpoint(host=host.strip())
+    for setting in settings:
+        key, separator, value = setting.partition("=")
+        key = key.strip()
+        if not separator or not value.strip():
+            raise ValueError(f"expected key=value, got '{setting}'")
+        if key == "model":
+            endpoint.model = value.strip()
+        elif key == "weight":
+            endpoint.weight = float(value)
+            if endpoint.weight <= 0:
+                raise ValueError(f"weight must be positive, got '{value}'")
+        else:
+            raise ValueError(f"unknown endpoint setting '{key}'")
+    return endpoint
+
+
+class OllamaBackendPool:
+    """
+    A load-balanced pool of Ollama API servers, so that translation can be spread across
+    several machines.
+
+    Each request is sent to the healthy endpoint with the fewest requests in flight
+    relative to its weight. An endpoint which times out, refuses connections or returns
+    server errors is ejected for `eject_seconds` (doubling with every further consecutive
+    failure, up to `max_eject_seconds`), and its requests go to the other endpoints in
+    the meantime. If every endpoint is ejected, the one due back first is tried anyway.
+
+    The pool owns the HTTP session used for all endpoints, and is safe to share between
+    threads.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[OllamaEndpoint],
+        pool_size: int = 1,
+        eject_seconds: float = 30.0,
+        max_eject_seconds: float = 600.0,
+    ):
+        if not endpoints:
+            raise ValueError("at least one Ollama endpoint is required")
+        self.endpoints = endpoints
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._lock = threading.Lock()
+
+        # keep up to `pool_size` connections open to each endpoint, so connections are
+        # reused between phrases instead of being opened and torn down for every call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(endpoints), pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def model_key(self) -> str:
+        """
+        Identifies the model(s) producing translations, for the translation memory and
+        checkpoints. This is the model name itself unless endpoints run different models.
+        """
+        return "+".join(sorted({endpoint.model or "" for endpoint in self.endpoints}))
+
+    def acquire(self) -> OllamaEndpoint:
+        """Choose the endpoint for the next request and count it as in flight."""
+        with self._lock:
+            now = time.time()
+            healthy_endpoints = [
+                endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now
+            ]
+            if healthy_endpoints:
+                endpoint = min(
+                    healthy_endpoints,
+                    key=lambda endpoint: (
+                        (endpoint.in_flight + 1) / endpoint.weight,
+                        random.random(),
+                    ),
+                )
+            else:
+                endpoint = min(
+                    self.endpoints, key=lambda endpoint: endpoint.ejected_until
+                )
+            endpoint.in_flight += 1
+            if endpoint.first_request_time is None:
+                endpoint.first_request_time = now
+            return endpoint
+
+    def release(
+        self,
+        endpoint: OllamaEndpoint,
+        elapsed_seconds: float,
+        success: bool,
+        eval_tokens: int = 0,
+        eval_seconds: float = 0.0,
+    ) -> None:
+        """Record the outcome of a request, ejecting the endpoint if it failed."""
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            endpoint.busy_seconds += elapsed_seconds
+            endpoint.eval_tokens += eval_tokens
+            endpoint.eval_seconds += eval_seconds
+            if success:
+                endpoint.consecutive_failures = 0
+                return
+
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            eject_seconds = min(
+                self.max_eject_seconds,
+                self.eject_seconds * 2 ** (endpoint.consecutive_failures - 1),
+            )
+            endpoint.ejected_until = time.time() + eject_seconds
+            endpoint.ejections += 1
+
+        if len(self.endpoints) > 1:
+            logging.warning(
+                f"Ejecting Ollama endpoint {endpoint.name} for {eject_seconds:.0f}s after "
+                f"{endpoint.consecutive_failures} consecutive failures."
+            )
+
+    def generate(
+        self,
+        prompt: str,
+        options: dict,
+        timeout: float = 20,
+        response_format: Optional[dict] = None,
+        max_transport_retries: int = 5,
+    ) -> Optional[str]:
+        """
+        Send a single non-streaming prompt to the /api/generate endpoint of one of the
+        servers and return the raw text of the model's response, or None if the API call
+        failed.
+
+        Connection errors, timeouts and server errors are retried on the next endpoint
+        chosen by the pool, with exponential backoff and jitter so a busy or restarting
+        server is not hammered by every worker at once. Client errors (ie, a malformed
+        request) are not retried, except for 404 which Ollama returns when the model is
+        not installed on that particular server.
+        """
+        for attempt_idx in range(max_transport_retries + 1):
+            endpoint = self.acquire()
+            request_json = {
+                "model": endpoint.model,
+                "prompt": prompt,
+                "options": options,
+                "stream": False,
+            }
+            if response_format is not None:
+                request_json["format"] = response_format
+
+            start_time = time.time()
+            try:
+                response = self.session.post(
+                    f"http://{endpoint.host}/api/generate",
+                    json=request_json,
+                    timeout=timeout,
+                )
+                response.raise_for_status()
+                response_json = response.json()
+            except requests.exceptions.HTTPError as e:
+                status_code = e.response.status_code if e.response is not None else 500
+                retryable = status_code >= 500 or status_code == 404
+                self.release(endpoint, time.time() - start_time, success=not retryable)
+                if not retryable:
+                    logging.error(
+                        f"Error communicating with Ollama API at {endpoint.name}: {e}"
+                    )
+                    return None
+                error: Exception = e
+            except ValueError as e:
+                # before RequestException, since requests' JSONDecodeError is both: the
+                # endpoint answered, so it is not ejected as if it were unreachable
+                self.release(endpoint, time.time() - start_time, success=True)
+                logging.error(
+                    f"Error decoding Ollama API response from {endpoint.name}: {e}"
+                )
+                return None
+            except requests.exceptions.RequestException as e:
+                self.release(endpoint, time.time() - start_time, success=False)
+                error = e
+            else:
+                self.release(
+                    endpoint,
+                    time.time() - start_time,
+                    success=True,
+                    eval_tokens=response_json.get("eval_count", 0),
+                    eval_seconds=response_json.get("eval_duration", 0) / 1e9,
+                )
+                return response_json.get("response", "")
+
+            if attempt_idx < max_transport_retries:
+                backoff_seconds = random.uniform(0, min(30.0, 2.0**attempt_idx))
+                logging.warning(
+                    f"Error communicating with Ollama API at {endpoint.name}: {error}. Retrying in {backoff_seconds:.1f}s."
+                )
+                time.sleep(backoff_seconds)
+
+        logging.error(
+            f"Error communicating with Ollama API after {max_transport_retries + 1} attempts: {error}"
+        )
+        return None
+
+    def throughput_summary(self) -> List[str]:
+        """Describe the throughput of each endpoint so far, one line per endpoint."""
+        now = time.time()
+        lines = []
+        with self._lock:
+            for endpoint in self.endpoints:
+                elapsed_minutes = (
+                    (now - endpoint.first_request_time) / 60
+                    if endpoint.first_request_time is not None
+                    else 0.0
+                )
+                requests_per_minute = (
+                    endpoint.requests / elapsed_minutes if elapsed_minutes > 0 else 0.0
+                )
+                average_seconds = (
+                    endpoint.busy_seconds / endpoint.requests
+                    if endpoint.requests
+                    else 0.0
+                )
+                tokens_per_second = (
+                    endpoint.eval_tokens / endpoint.eval_seconds
+                    if endpoint.eval_seconds > 0
+                    else 0.0
+                )
+                status = (
+                    f", ejected for another {endpoint.ejected_until - now:.0f}s"
+                    if endpoint.ejected_until > now
+                    else ""
+                )
+                lines.append(
+                    f"{endpoint.name}: {endpoint.requests} requests ({requests_per_minute:.1f}/min, "
+                    f"{average_seconds:.1f}s average, {tokens_per_second:.1f} tokens/sec), "
+                    f"{endpoint.failures} failures, ejected {endpoint.ejections} times{status}"
+                )
+        return lines
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,251 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class TranslationMemory:
+    """
+    A persistent cache of LLM translations, stored in a small SQLite database file.
+
+    Each translation is keyed by (source_text, target_language, model, prompt_version),
+    so rerunning translate_phrases.py after a crash, for another language, or after
+    changing the prompt only sends the phrases the LLM has not already translated under
+    exactly the same conditions. Bump PROMPT_VERSION in translate_phrases.py whenever the
+    prompt wording changes in a way that should invalidate previous results.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " source_text TEXT NOT NULL,"
+            " target_language TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " prompt_version TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (source_text, target_language, model, prompt_version))"
+        )
+        self._connection.commit()
+
+    def get(
+        self, source_text: str, target_language: str, model: str, prompt_version: str
+    ) -> Optional[str]:
+        """Return the remembered translation, or None if it has not been translated yet."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT translation FROM translations WHERE source_text = ?"
+                " AND target_language = ? AND model = ? AND prompt_version = ?",
+                (source_text, target_language, model, prompt_version),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self,
+        source_text: str,
+        target_language: str,
+        model: str,
+        prompt_version: str,
+        translation: str,
+    ) -> None:
+        """Remember a successful translation, replacing any previous value for the key."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    source_text,
+                    target_language,
+                    model,
+                    prompt_version,
+                    translation,
+                    time.time(),
+                ),
+            )
+            self._connection.commit()
+
+    def invalidate(
+        self,
+        source_text: Optional[str] = None,
+        source_text_pattern: Optional[str] = None,
+        target_language: Optional[str] = None,
+        model: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+    ) -> int:
+        """
+        Forget remembered translations matching all of the given criteria, so they are
+        sent to the LLM again. `source_text` must match exactly, while
+        `source_text_pattern` is a case-sensitive glob pattern such as 'into hairpin*'.
+        Criteria left as None match everything.
+        Returns the number of translations removed.
+        """
+        conditions = []
+        params = []
+        if source_text is not None:
+            conditions.append("source_text = ?")
+            params.append(source_text)
+        if source_text_pattern is not None:
+            conditions.append("source_text GLOB ?")
+            params.append(source_text_pattern)
+        if target_language is not None:
+            conditions.append("target_language = ?")
+            params.append(target_language)
+        if model is not None:
+            conditions.append("model = ?")
+            params.append(model)
+        if prompt_version is not None:
+            conditions.append("prompt_version = ?")
+            params.append(prompt_version)
+
+        where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            cursor = self._connection.execute(
+                f"DELETE FROM translations{where_clause}", params
+            )
+            self._connection.commit()
+
+        logging.debug(
+            f"Removed {cursor.rowcount} remembered translations from {self.database_path}"
+        )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class TranslationCheckpoint:
+    """
+    An append-only journal of the translations completed so far by one run of
+    translate_phrases.py, stored as JSON lines next to the output CSV file.
+
+    Every completed batch is flushed to disk immediately, so an interrupted run can be
+    restarted and only translate the phrases which are missing (or which previously
+    failed). The first line records the settings of the run, and a checkpoint written
+    with different settings is ignored rather than resumed.
+    """
+
+    def __init__(self, checkpoint_path: str, run_settings: dict):
+        self.checkpoint_path = checkpoint_path
+        self.run_settings = run_settings
+        self._lock = threading.Lock()
+        self._file: Optional[Any] = None
+
+    def load(self) -> Dict[str, str]:
+        """
+        Return the {source_text: translation} pairs recorded by a previous run with the
+        same settings, or an empty dict if there is nothing to resume.
+        """
+        if not os.path.isfile(self.checkpoint_path):
+            return {}
+
+        translations: Dict[str, str] = {}
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line_idx, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # most likely the last line, cut short when the run was interrupted
+                    logging.warning(
+                        f"Ignoring unreadable line {line_idx + 1} in {self.checkpoint_path}"
+                    )
+                    if line_idx == 0:
+                        # without the settings there is no telling what it would resume
+                        return {}
+                    continue
+
+                if line_idx == 0:
+                    if record != self.run_settings:
+                        logging.warning(
+                            f"Ignoring checkpoint {self.checkpoint_path} since it was created with different settings: {record}"
+                        )
+                        return {}
+                    continue
+
+                if (
+                    isinstance(record, dict)
+                    and isinstance(record.get("source_text"), str)
+                    and isinstance(record.get("translation"), str)
+                ):
+                    translations[record["source_text"]] = record["translation"]
+                else:
+                    logging.warning(
+                        f"Ignoring damaged line {line_idx + 1} in {self.checkpoint_path}"
+                    )
+
+        return translations
+
+    def start(self, resume: bool) -> None:
+        """
+        Open the checkpoint for appending, keeping the existing records if resuming,
+        otherwise starting a new checkpoint.
+        """
+        if resume and os.path.isfile(self.checkpoint_path):
+            has_records = self._truncate_partial_line()
+            self._file = open(self.checkpoint_path, "a", encoding="utf-8")
+            if not has_records:
+                self._write_lines([self.run_settings])
+            return
+
+        self._file = open(self.checkpoint_path, "w", encoding="utf-8")
+        self._write_lines([self.run_settings])
+
+    def record(self, translations: Dict[str, str]) -> None:
+        """Durably append completed {source_text: translation} pairs to the checkpoint."""
+        with self._lock:
+            self._write_lines(
+                [
+                    {"source_text": source_text, "translation": translation}
+                    for source_text, translation in translations.items()
+                ]
+            )
+
+    def close(self, remove: bool = False) -> None:
+        """Close the checkpoint, and delete it if it is no longer needed."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if remove and os.path.isfile(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+
+    def _truncate_partial_line(self) -> bool:
+        """
+        Cut off the last line if an interrupted run left it incomplete, so the records
+        appended next start on a line of their own rather than being glued to it.
+        Returns False if nothing was left, not even the settings line.
+        """
+        with open(self.checkpoint_path, "rb+") as f:
+            file_size = f.seek(0, os.SEEK_END)
+            line_end = file_size
+            # look for the last newline a block at a time, from the end of the file
+            while line_end > 0:
+                block_start = max(0, line_end - 4096)
+                f.seek(block_start)
+                newline_idx = f.read(line_end - block_start).rfind(b"\n")
+                if newline_idx >= 0:
+                    line_end = block_start + newline_idx + 1
+                    break
+                line_end = block_start
+
+            if line_end < file_size:
+                logging.warning(
+                    f"Removing the incomplete last line of {self.checkpoint_path}"
+                )
+                f.truncate(line_end)
+        return line_end > 0
+
+    def _write_lines(self, records: List[dict]) -> None:
+        assert self._file is not None
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
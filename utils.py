@@ -6,26 +6,21 @@ import csv
 import logging
 
 
-@dataclass
+@dataclass(slots=True)
 class CrewChiefAudioFile:
     """
     A simple data structure aligned to the contents of the audio file inventory.
+    The *_filtered fields hold the values after text replacements, filled in when
+    the audio is generated.
     """
 
-    def __init__(
-        self,
-        audio_path: str,
-        audio_filename: str,
-        subtitle: str,
-        text_for_tts: str,
-    ):
-        self.audio_path = audio_path
-        self.audio_filename = audio_filename
-        self.subtitle = subtitle
-        self.text_for_tts = text_for_tts
-        self.audio_path_filtered = ""
-        self.subtitle_filtered = ""
-        self.text_for_tts_filtered = ""
+    audio_path: str
+    audio_filename: str
+    subtitle: str
+    text_for_tts: str
+    audio_path_filtered: str = ""
+    subtitle_filtered: str = ""
+    text_for_tts_filtered: str = ""
 
 
 def parse_phrase_inventory(
@@ -33,6 +28,7 @@ def parse_phrase_inventory(
 ) -> List[CrewChiefAudioFile]:
     """
     Read the audio file inventory into a list of CrewChiefAudioFile objects.
+    Prefer inventory.PhraseInventory, which caches and indexes the result.
     """
     entries: List[CrewChiefAudioFile] = []
 